@@ -3,8 +3,12 @@ import pandas as pd
 from pathlib import Path
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
+import threading
 import streamlit as st
-from functools import lru_cache
+from utils.llm_cache import get_llm_cache
+from utils.defect_index import defect_index
+from utils.llm_campaign import LLMCampaign, chat_model_generator
+from utils.message_templates import DEFAULT_TONE, fill, message_templates
 
 # ==================== SAFE .ENV LOADING ====================
 ENV_PATH = Path(__file__).parent.parent / ".env"
@@ -16,14 +20,11 @@ if not OPENAI_API_KEY:
 
 print("OPENAI_API_KEY loaded successfully!")
 
+RECOMMENDATION_MODEL = "gpt-4o-mini"
+RECOMMENDATION_TEMPERATURE = 0.7
 
-# ==================== DATA LOADERS ====================
-def load_defects(path=os.path.join("data", "defects.csv")):
-    try:
-        return pd.read_csv(path)
-    except FileNotFoundError:
-        return pd.DataFrame()
 
+# ==================== DATA LOADERS ====================
 def load_vehicles(path=os.path.join("data", "vehicles.csv")):
     try:
         return pd.read_csv(path)
@@ -37,29 +38,47 @@ def load_feedback(path=os.path.join("data", "feedback.csv")):
         return pd.DataFrame()
 
 
+# ==================== SHARED LLM CLIENT ====================
+_shared_model = None
+_shared_lock = threading.Lock()
+
+
+def get_recommendation_model() -> ChatOpenAI:
+    """Process-wide ChatOpenAI client, so every agent and call reuses one HTTP connection pool."""
+    global _shared_model
+    if _shared_model is None:
+        with _shared_lock:
+            if _shared_model is None:
+                _shared_model = ChatOpenAI(model=RECOMMENDATION_MODEL, temperature=RECOMMENDATION_TEMPERATURE)
+    return _shared_model
+
+
+def _complete(prompt: str) -> str:
+    return get_recommendation_model().invoke(prompt).content.strip()
+
+
 # ==================== MAIN AGENT CLASS ====================
 class CustomerEngagementAgent:
     def __init__(self):
-        self.model = ChatOpenAI(model="gpt-4o-mini", temperature=0.7)
-        self.defects = load_defects()
+        self.model = get_recommendation_model()
+        self.defect_index = defect_index
         self.vehicles = load_vehicles()
 
+    @property
+    def defects(self) -> pd.DataFrame:
+        return self.defect_index.frame
+
     def get_latest_defect(self, vehicle_name):
-        df = self.defects[self.defects["vehicle_name"] == vehicle_name]
-        if not df.empty:
-            return df.sort_values("reported_date", ascending=False).iloc[0].to_dict()
-        return None
+        return self.defect_index.latest(vehicle_name)
 
-    # THIS IS THE ONLY METHOD THAT MATTERS — CACHE OUTSIDE THE CLASS
     @staticmethod
-    @lru_cache(maxsize=64)
-    def get_recommendation(vehicle_name: str, customer_name: str = "Valued Customer") -> str:
-        # We create a temporary agent just to get defect data (cheap & fast)
-        temp_agent = CustomerEngagementAgent()
-        defect = temp_agent.get_latest_defect(vehicle_name)
+    def render_recommendation(vehicle_name: str, customer_name: str = "Valued Customer") -> tuple:
+        """(prompt, fallback message) for the vehicle's latest defect; prompt is None when there is none."""
+        # Shared, precomputed latest-defect lookup; a cache miss only pays the LLM round trip
+        defect = defect_index.latest(vehicle_name)
 
         if not defect:
-            return f"Hi {customer_name}, your {vehicle_name} is in perfect condition. No action needed!"
+            return None, f"Hi {customer_name}, your {vehicle_name} is in perfect condition. No action needed!"
 
         prompt = f"""
 You are a professional service advisor contacting {customer_name} about their {vehicle_name}.
@@ -77,21 +96,83 @@ Write a short (3–4 sentences), warm, specific message that:
 
 Example tone: friendly but proactive.
 """
+        fallback = f"Hi {customer_name}, we found a {defect['defect_type'].lower()} issue on {vehicle_name}. Please book a slot soon."
+        return prompt, fallback
 
-        print("OPENAI CALL (will only happen ONCE per vehicle)")
-        print(f"→ {vehicle_name} | {customer_name} | {defect['defect_type']} ({defect['severity']})")
+    # THIS IS THE ONLY METHOD THAT MATTERS — one LLM template per defect class (utils/message_templates.py),
+    # or with personalized=True one cached response per prompt (utils/llm_cache.py)
+    @staticmethod
+    def get_recommendation(vehicle_name: str, customer_name: str = "Valued Customer", tone: str = DEFAULT_TONE,
+                           personalized: bool = False) -> str:
+        prompt, fallback = CustomerEngagementAgent.render_recommendation(vehicle_name, customer_name)
+        if prompt is None:
+            return fallback
+
+        if not personalized:
+            defect = defect_index.latest(vehicle_name)
+            template = message_templates.ensure(defect['defect_type'], defect['severity'], tone, _complete, RECOMMENDATION_MODEL)
+            return fill(template, customer_name, vehicle_name) if template else fallback
+
+        # Same prompt + model params → same key, across restarts and workers; a new defect is a new prompt
+        cache = get_llm_cache()
+        cache_key = cache.key(prompt, model=RECOMMENDATION_MODEL, temperature=RECOMMENDATION_TEMPERATURE)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        print("OPENAI CALL (only once per distinct prompt)")
+        print(f"→ {vehicle_name} | {customer_name}")
 
         try:
-            response = temp_agent.model.invoke(prompt)
-            print("OpenAI replied → cached forever")
-            return response.content.strip()
+            response = get_recommendation_model().invoke(prompt)
+            message = response.content.strip()
+            cache.put(cache_key, message, RECOMMENDATION_MODEL)
+            print("OpenAI replied → cached on disk")
+            return message
         except Exception as e:
-            return f"Hi {customer_name}, we found a {defect['defect_type'].lower()} issue on {vehicle_name}. Please book a slot soon."
+            return fallback
 
     # NEW: simple wrapper so your app.py doesn't change
     def recommend_action(self, vehicle_name: str, customer_name: str = "Valued Customer") -> str:
         return self.get_recommendation(vehicle_name, customer_name)
 
+    def recommend_campaign(self, vehicles, concurrency: int = 32, tone: str = DEFAULT_TONE, personalized: bool = False):
+        """Outreach messages for many (vehicle_name, customer_name) pairs, yielded as they finish.
+        By default the missing templates of the defect classes involved are generated in parallel
+        and every message is filled locally. personalized=True runs one prompt per recipient through
+        LLMCampaign: bounded concurrency, backoff on rate limits, one call per distinct prompt,
+        and the same disk cache as get_recommendation."""
+        if not personalized:
+            vehicles = list(vehicles)
+            defects = {vehicle_name: defect_index.latest(vehicle_name) for vehicle_name, _ in vehicles}
+            classes = {(d['defect_type'], d['severity']) for d in defects.values() if d}
+            message_templates.prefetch(classes, chat_model_generator(self.model), tone, RECOMMENDATION_MODEL, concurrency)
+            for vehicle_name, customer_name in vehicles:
+                defect = defects[vehicle_name]
+                template = message_templates.get(defect['defect_type'], defect['severity'], tone) if defect else None
+                if template is not None:
+                    message, status = fill(template, customer_name, vehicle_name), "template"
+                else:
+                    message, status = self.render_recommendation(vehicle_name, customer_name)[1], "no_action" if not defect else "fallback"
+                yield {"vehicle_name": vehicle_name, "customer_name": customer_name, "message": message, "status": status}
+            return
+
+        items = []
+        for vehicle_name, customer_name in vehicles:
+            prompt, fallback = self.render_recommendation(vehicle_name, customer_name)
+            if prompt is None:
+                yield {"vehicle_name": vehicle_name, "customer_name": customer_name, "message": fallback, "status": "no_action"}
+            else:
+                items.append(((vehicle_name, customer_name), prompt, fallback))
+
+        campaign = LLMCampaign(
+            chat_model_generator(self.model), concurrency=concurrency, cache=get_llm_cache(),
+            cache_params={"model": RECOMMENDATION_MODEL, "temperature": RECOMMENDATION_TEMPERATURE},
+        )
+        for result in campaign.iter_results(items):
+            vehicle_name, customer_name = result["id"]
+            yield {"vehicle_name": vehicle_name, "customer_name": customer_name, "message": result["text"], "status": result["status"]}
+
 from langchain.tools import tool
 from utils.voice_caller import phone
 
@@ -1,11 +1,17 @@
 import os
+import threading
+import weakref
 import numpy as np
 import pandas as pd
 from pathlib import Path
 from dotenv import load_dotenv
-from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler
 import warnings
+from utils.telematics_engine import KAGGLE_PATH, TELEMATICS_FEATURES
+from utils.telematics_store import TelematicsStore
+from utils.telematics_index import TelematicsIndex, VehicleDirectory
+from models.diagnosis_registry import ModelRegistry, diagnosis_models
+from models.diagnosis_rules import DiagnosisRules
+from models.diagnosis_training import IncrementalTrainer
 
 warnings.filterwarnings("ignore")
 
@@ -14,9 +20,10 @@ load_dotenv(dotenv_path=ENV_PATH)
 
 
 class DiagnosisAgent:
-    def __init__(self):
-        self.scaler = StandardScaler()
-        self.isoforest = IsolationForest(contamination=0.1, random_state=42)
+    def __init__(self, registry: ModelRegistry = diagnosis_models):
+        # Fitted scaler/forest live in the registry so every agent shares one pair
+        self.registry = registry
+        self.rules = DiagnosisRules()
 
         self.vehicles = self._load_vehicles()
         self.defects = (
@@ -24,8 +31,27 @@ class DiagnosisAgent:
             if Path("data/defects.csv").exists()
             else pd.DataFrame()
         )
+        self.telematics_store = TelematicsStore()
         self.telematics = self._load_kaggle_telematics()
-        self._fit_models()
+        self._telematics_mark = (self.telematics_store.source_id, self.telematics_store.rows_seen)
+        # O(1) per-vehicle lookups instead of scanning telematics/vehicles per call
+        self.index = TelematicsIndex.from_frame(self.telematics, TELEMATICS_FEATURES)
+        self.directory = VehicleDirectory(self.vehicles)
+        self.trainer = IncrementalTrainer(self.telematics_store, self.registry, features=TELEMATICS_FEATURES)
+        if self.registry.current() is None:
+            self._fit_models()
+        # New Kaggle rows are folded into telematics, the index and the model in the background from now on
+        self.trainer.start(sync=self._store_sync())
+
+    @property
+    def scaler(self):
+        model = self.registry.current()
+        return model.scaler if model else None
+
+    @property
+    def isoforest(self):
+        model = self.registry.current()
+        return model.forest if model else None
 
     def _load_vehicles(self):
         vehicles_path = "data/vehicles.csv"
@@ -34,137 +60,86 @@ class DiagnosisAgent:
         raise FileNotFoundError("vehicles.csv not found in data/ folder")
 
     def _load_kaggle_telematics(self):
-        kaggle_path = "data/Telematicsdata.csv"
-        if not Path(kaggle_path).exists():
+        """Standardized telematics from the persistent store.
+        Only Kaggle rows added since the last run are parsed; the rest is loaded from .npy parts.
+        """
+        kaggle_path = KAGGLE_PATH
+        if Path(kaggle_path).exists():
+            vehicle_ids = self.vehicles["vehicle_id"].tolist()  # [101,102,103,104]
+            new_rows = self.telematics_store.sync(kaggle_path, vehicle_ids)
+            print(
+                f"✅ Ingested {new_rows} new Kaggle rows → "
+                f"{self.telematics_store.row_count} standardized rows in store"
+            )
+        elif self.telematics_store.watermark is None:
             raise FileNotFoundError("Put Telematicsdata.csv in data/ folder")
 
-        df = pd.read_csv(kaggle_path)
-        df["parsed_value"] = df["value"].astype(str).apply(self._parse_telematics_value)
-
-        df["battery_internal"] = df.apply(
-            lambda row: row["parsed_value"]
-            if row["variable"] == "INTERNAL BATTERY"
-            else np.nan,
-            axis=1,
-        )
-        df["battery_external"] = df.apply(
-            lambda row: row["parsed_value"]
-            if row["variable"] == "EXTERNAL BATTERY"
-            else np.nan,
-            axis=1,
-        )
-        df["towing"] = df.apply(
-            lambda row: row["parsed_value"] if row["variable"] == "TOWING" else 0,
-            axis=1,
-        )
-        df["ignition"] = df.apply(
-            lambda row: row["parsed_value"]
-            if row["variable"] == "IGNITION_STATUS"
-            else 0,
-            axis=1,
-        )
-        df["alarm_class"] = df["alarmClass"]
-
-        df["battery_internal"] = df["battery_internal"].ffill().fillna(50)
-        df["battery_external"] = df["battery_external"].ffill().fillna(36)
+        return self.telematics_store.read()
 
-        df = df.reset_index(drop=True)
+    def _store_sync(self):
+        """Callable that pulls new raw rows into the store and this agent (None without a raw file).
+        Holds the agent weakly, like the retrain thread holds the trainer."""
+        if not Path(KAGGLE_PATH).exists():
+            return None
+        agent_ref = weakref.ref(self)
 
-        vehicle_ids = self.vehicles["vehicle_id"].tolist()  # [101,102,103,104]
-        df["vehicle_id"] = df.index.map(lambda i: vehicle_ids[i % len(vehicle_ids)])
+        def sync():
+            agent = agent_ref()
+            if agent is not None:
+                agent.refresh_telematics()
+        return sync
 
-        telematics = pd.DataFrame(
-            {
-                "timestamp": pd.to_datetime(
-                    df["timestamp"].astype(str) + ":00",
-                    format="%H:%M:%S",
-                    errors="coerce",
-                ),
-                "vehicle_id": df["vehicle_id"],
-                "battery_voltage": (df["battery_internal"] + df["battery_external"]) / 2,
-                "alarm_level": df["alarm_class"],
-                "towing_status": df["towing"],
-                "ignition_status": df["ignition"],
-                "vibration": df["alarm_class"] * 0.5,
-            }
-        )
-        telematics.to_csv("data/telematics.csv", index=False)
-        print(f"✅ Converted {len(df)} Kaggle rows → {len(telematics)} standardized rows")
-        return telematics.dropna()
-
-    def _parse_telematics_value(self, value):
-        val = str(value).strip()
-        if "," in val:
-            return 0
-        try:
-            return float(val)
-        except Exception:
-            return 0
+    def refresh_telematics(self) -> int:
+        """Sync new Kaggle rows into the store and append them to telematics and the index.
+        A replaced raw file rebuilds both. Returns the rows added.
+        """
+        store = self.telematics_store
+        store.sync(KAGGLE_PATH, self.vehicles["vehicle_id"].tolist())
+        source, seen = self._telematics_mark
+        if store.source_id != source or store.rows_seen < seen:
+            telematics = store.read()
+            self.index = TelematicsIndex.from_frame(telematics, TELEMATICS_FEATURES)
+            self.telematics = telematics
+            added = len(telematics)
+        else:
+            new_rows = store.read(min_seq=seen)
+            timestamps = new_rows["timestamp"].to_numpy(dtype="datetime64[ns]")
+            values = new_rows[self.index.features].to_numpy(dtype=float)
+            for vid, ts, row in zip(new_rows["vehicle_id"], timestamps, values):
+                self.index.append(vid, row, ts)
+            if len(new_rows):
+                self.telematics = pd.concat([self.telematics, new_rows], ignore_index=True)
+            added = len(new_rows)
+        self._telematics_mark = (store.source_id, store.rows_seen)
+        return added
 
     def _fit_models(self):
-        features = [
-            "battery_voltage",
-            "alarm_level",
-            "towing_status",
-            "ignition_status",
-            "vibration",
-        ]
-        X = self.telematics[features].fillna(self.telematics[features].mean())
-        if len(X) > 10:
-            X_scaled = self.scaler.fit_transform(X)
-            self.isoforest.fit(X_scaled)
+        """Load the last checkpoint and catch up on new telematics, or fit from scratch."""
+        self.trainer.train(history=self.telematics)
 
     def continuous_monitor(self, vehicle_id: str):
         """Real-time diagnosis using telematics.
         Accepts either numeric vehicle_id ('102') or vehicle_name ('Car B').
         """
-        # If it's not numeric, treat it as vehicle_name and map to id
-        if not str(vehicle_id).isdigit():
-            row = self.vehicles[self.vehicles["vehicle_name"] == vehicle_id]
-            if row.empty:
-                # Fallback if name not found
-                return {
-                    "vehicle_id": vehicle_id,
-                    "anomaly_score": 0.0,
-                    "risk_level": "low",
-                    "predicted_failure": "none",
-                    "urgency": "14d",
-                    "battery_internal": 12.6,
-                    "alarms_triggered": 0,
-                }
-            vid = int(row.iloc[0]["vehicle_id"])
-        else:
-            vid = int(vehicle_id)
+        vid = self.directory.resolve(vehicle_id)
+        if vid is None:
+            # Fallback if name not found
+            return self._no_data_diagnosis(vehicle_id)
 
-        vehicle_data = self.telematics[self.telematics["vehicle_id"] == vid].tail(50)
+        _, window = self.index.window_of(vid)
+        if not len(window):
+            return self._no_data_diagnosis(vid)
 
         # Get static status from vehicles.csv
-        row = self.vehicles[self.vehicles["vehicle_id"] == vid]
-        status = row.iloc[0]["status"] if not row.empty else ""
-
-        if vehicle_data.empty:
-            return {
-                "vehicle_id": vid,
-                "anomaly_score": 0.0,
-                "risk_level": "low",
-                "predicted_failure": "none",
-                "urgency": "14d",
-                "battery_internal": 12.6,
-                "alarms_triggered": 0,
-            }
+        status = self.directory.status(vid)
 
-        features = [
-            "battery_voltage",
-            "alarm_level",
-            "towing_status",
-            "ignition_status",
-            "vibration",
-        ]
-        X = vehicle_data[features].fillna(method="ffill").tail(10)
-        X_scaled = self.scaler.transform(X)
-
-        anomaly_score = self.isoforest.decision_function(X_scaled)[-1]
-        latest = vehicle_data.iloc[-1]
+        model = self.registry.current()
+        if model is None:
+            anomaly_score = 0.0
+        else:
+            X_scaled = model.scaler.transform(window[-1:])
+            anomaly_score = model.forest.decision_function(X_scaled)[-1]
+        latest = dict(zip(self.index.features, window[-1]))
 
         diagnosis = self._rule_based_diagnosis(latest, anomaly_score, status)
 
@@ -178,38 +153,98 @@ class DiagnosisAgent:
             "alarms_triggered": int(latest["alarm_level"]),
         }
 
+    def diagnose_many(self, vehicle_ids=None) -> pd.DataFrame:
+        """Fleet-wide diagnosis in one pass.
+
+        Gathers every vehicle's latest telematics row into one matrix, scores it
+        with a single scaler/forest call and labels it with the vectorized rules.
+        Accepts ids or names like continuous_monitor (default: all of vehicles.csv)
+        and returns one row per requested vehicle with the same fields.
+        """
+        if vehicle_ids is None:
+            vehicle_ids = list(self.directory.status_by_id)
+        requested = list(vehicle_ids)
+        vids = [self.directory.resolve(v) for v in requested]
+        latest, has_data = self.index.latest_rows(vids)
+
+        scores = np.zeros(len(vids))
+        model = self.registry.current()
+        if model is not None and has_data.any():
+            scores[has_data] = model.forest.decision_function(model.scaler.transform(latest[has_data]))
+
+        latest_df = pd.DataFrame(latest, columns=self.index.features)
+        statuses = [self.directory.status(v) if v is not None else "" for v in vids]
+        labels = self._rule_based_diagnosis_batch(latest_df, scores, statuses)
+
+        no_data = self._no_data_diagnosis(None)
+        return pd.DataFrame(
+            {
+                "vehicle_id": [v if v is not None else r for v, r in zip(vids, requested)],
+                "anomaly_score": scores,
+                "risk_level": np.where(has_data, labels["risk"], no_data["risk_level"]),
+                "predicted_failure": np.where(has_data, labels["failure_type"], no_data["predicted_failure"]),
+                "urgency": np.where(has_data, labels["urgency"], no_data["urgency"]),
+                "battery_internal": np.where(has_data, latest_df["battery_voltage"], no_data["battery_internal"]),
+                "alarms_triggered": np.where(has_data, latest_df["alarm_level"], 0).astype(int),
+            }
+        )
+
+    @staticmethod
+    def _no_data_diagnosis(vehicle_id):
+        return {
+            "vehicle_id": vehicle_id,
+            "anomaly_score": 0.0,
+            "risk_level": "low",
+            "predicted_failure": "none",
+            "urgency": "14d",
+            "battery_internal": 12.6,
+            "alarms_triggered": 0,
+        }
+
     def _rule_based_diagnosis(self, latest, anomaly_score: float, status: str):
         """Use telematics + status + anomaly_score to label risk/failure/urgency."""
-        bv = latest["battery_voltage"]
-        alarms = latest["alarm_level"]
-        towing = latest["towing_status"]
-        ignition = latest["ignition_status"]
-
-        # explicit high/critical cases from vehicles.csv
-        if "Fault: Brake Issue" in status:
-            return {"risk": "critical", "failure_type": "brake", "urgency": "2d"}
-        if "Fault: Oil Leak" in status:
-            return {"risk": "high", "failure_type": "oil_leak", "urgency": "3d"}
-
-        # sensor-based rules for others
-        if bv <= 11.8 or alarms >= 3:
-            risk = "high"
-            failure_type = "battery"
-            urgency = "3d"
-        elif towing == 1 and ignition == 0:
-            risk = "critical"
-            failure_type = "towing"
-            urgency = "1d"
-        elif anomaly_score < -0.1:
-            risk = "medium"
-            failure_type = "telematics"
-            urgency = "7d"
-        else:
-            risk = "low"
-            failure_type = "none"
-            urgency = "14d"
+        return self.rules.evaluate_one(latest, anomaly_score, status)
+
+    def _rule_based_diagnosis_batch(self, latest: pd.DataFrame, anomaly_scores, statuses) -> pd.DataFrame:
+        """Column-wise _rule_based_diagnosis over many rows at once."""
+        frame = latest.assign(anomaly_score=np.asarray(anomaly_scores), status=list(statuses))
+        return self.rules.evaluate(frame)
+
+    def label_history(self, telematics: pd.DataFrame | None = None) -> pd.DataFrame:
+        """Backtest the current model and rules over full telematics history in one pass.
+        Adds anomaly_score, risk_level, predicted_failure, urgency and rule columns.
+        """
+        df = self.telematics if telematics is None else telematics
+        features = list(self.index.features)
+        scores = np.zeros(len(df))
+        model = self.registry.current()
+        if model is not None and len(df):
+            scores = model.forest.decision_function(model.scaler.transform(df[features].to_numpy()))
+
+        statuses = df["vehicle_id"].map(self.directory.status_by_id).fillna("")
+        labels = self._rule_based_diagnosis_batch(df[features], scores, statuses)
+        return df.assign(
+            anomaly_score=scores,
+            risk_level=labels["risk"].to_numpy(),
+            predicted_failure=labels["failure_type"].to_numpy(),
+            urgency=labels["urgency"].to_numpy(),
+            rule=labels["rule"].to_numpy(),
+        )
+
+_shared_agent = None
+_shared_lock = threading.Lock()
+
 
-        return {"risk": risk, "failure_type": failure_type, "urgency": urgency}
+def get_diagnosis_agent() -> DiagnosisAgent:
+    """Process-wide DiagnosisAgent: telematics and models are loaded once and reused
+    by the scheduling, feedback and orchestrator agents and every Streamlit rerun.
+    """
+    global _shared_agent
+    if _shared_agent is None:
+        with _shared_lock:
+            if _shared_agent is None:
+                _shared_agent = DiagnosisAgent()
+    return _shared_agent
 
 
 if __name__ == "__main__":
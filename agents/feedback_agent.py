@@ -5,11 +5,13 @@ from pathlib import Path
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain.tools import tool
-from textblob import TextBlob
 from openai import RateLimitError  # for safe fallback
 import streamlit as st
 from agents.customer_engagement_agent import CustomerEngagementAgent
-from agents.diagnosis_agent import DiagnosisAgent
+from agents.diagnosis_agent import get_diagnosis_agent
+from utils.llm_cache import get_llm_cache
+from utils.sentiment import get_sentiment_service
+from utils.llm_campaign import LLMCampaign, chat_model_generator
 
 ENV_PATH = Path(__file__).parent.parent / ".env"
 load_dotenv(dotenv_path=ENV_PATH)
@@ -21,7 +23,7 @@ class FeedbackAgent:
         self.use_llm = use_llm
         self.llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.3) if use_llm else None
         self.feedback_df = self._load_feedback()
-        self.diagnosis_agent = DiagnosisAgent()
+        self.diagnosis_agent = get_diagnosis_agent()
         self.customer_agent = CustomerEngagementAgent()
 
     def _load_feedback(self):
@@ -30,15 +32,12 @@ class FeedbackAgent:
             df = pd.read_csv(feedback_path)
             df["service_date"] = pd.to_datetime(df["service_date"], errors="coerce")
             df["user_rating"] = pd.to_numeric(df["user_rating"], errors="coerce")
-            df["sentiment"] = df["comments"].apply(
-                lambda x: TextBlob(str(x)).sentiment.polarity
-            )
+            get_sentiment_service().fill(df)  # only comments without a stored score; cached in the sentiment db
             return df
         return pd.DataFrame()
 
-    def request_feedback(
-        self, vehicle_name: str, customer_name: str, diagnosis: dict | None = None
-    ):
+    def _feedback_prompt(self, vehicle_name: str, customer_name: str, diagnosis: dict | None = None) -> tuple:
+        """(prompt, base_text) for a feedback request; base_text is also the fallback."""
         diagnosis = diagnosis or {}
         risk = diagnosis.get("risk_level", "unknown")
         failure = diagnosis.get("predicted_failure", "N/A")
@@ -55,6 +54,23 @@ Current diagnosis: {risk} risk ({failure})
 Generate personalized request (2 sentences) based on the above:
 "{base_text}"
 """
+        return prompt, base_text
+
+    def _feedback_request(self, vehicle_name: str, customer_name: str, diagnosis: dict | None, text: str,
+                          index: int = 0) -> dict:
+        """`index` numbers the requests of one campaign so each gets its own feedback_id."""
+        return {
+            "prompt": text,
+            "vehicle_name": vehicle_name,
+            "customer_name": customer_name,
+            "feedback_id": f"FB{2025*10000 + pd.Timestamp.now().dayofyear * 100 + len(self.feedback_df) + 1 + index}",
+            "diagnosis_context": diagnosis or {},
+        }
+
+    def request_feedback(
+        self, vehicle_name: str, customer_name: str, diagnosis: dict | None = None
+    ):
+        prompt, base_text = self._feedback_prompt(vehicle_name, customer_name, diagnosis)
 
         if self.use_llm and self.llm is not None:
             try:
@@ -65,13 +81,25 @@ Generate personalized request (2 sentences) based on the above:
         else:
             text = base_text
 
-        return {
-            "prompt": text,
-            "vehicle_name": vehicle_name,
-            "customer_name": customer_name,
-            "feedback_id": f"FB{2025*10000 + pd.Timestamp.now().dayofyear * 100 + len(self.feedback_df) + 1}",
-            "diagnosis_context": diagnosis,
-        }
+        return self._feedback_request(vehicle_name, customer_name, diagnosis, text)
+
+    def request_feedback_campaign(self, requests, concurrency: int = 32):
+        """Feedback requests for many (vehicle_name, customer_name, diagnosis) tuples, yielded as they
+        finish. Same output as request_feedback, generated concurrently through LLMCampaign."""
+        requests = list(requests)
+        if not (self.use_llm and self.llm is not None):
+            for n, request in enumerate(requests):
+                yield self._feedback_request(*request, self._feedback_prompt(*request)[1], index=n)
+            return
+
+        items = [(n, *self._feedback_prompt(*request)) for n, request in enumerate(requests)]
+        campaign = LLMCampaign(
+            chat_model_generator(self.llm), concurrency=concurrency, cache=get_llm_cache(),
+            cache_params={"model": self.llm.model_name, "temperature": self.llm.temperature},
+        )
+        for result in campaign.iter_results(items):
+            vehicle_name, customer_name, diagnosis = requests[result["id"]]
+            yield self._feedback_request(vehicle_name, customer_name, diagnosis, result["text"], index=result["id"])
 
     def process_feedback(
         self,
@@ -123,6 +151,7 @@ Generate:
             "center_feedback": f"Customer satisfied: {rating}/5 - {risk} risk monitored",
             "mechanic_notes": mechanic_notes,
             "rca_capa_reference": rca_ref,
+            "sentiment": get_sentiment_service().score(comments),
         }
 
         self.feedback_df = pd.concat(
@@ -133,7 +162,7 @@ Generate:
         return {
             "saved": True,
             "feedback_id": new_feedback["feedback_id"],
-            "sentiment": TextBlob(comments).sentiment.polarity,
+            "sentiment": new_feedback["sentiment"],
             "needs_followup": rating < 3 or risk in ["high", "critical"],
         }
 
@@ -1,64 +1,113 @@
 import os
+import heapq
+import threading
+import weakref
 import pandas as pd
 import numpy as np
 from pathlib import Path
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain.tools import tool
 from datetime import datetime, timedelta
-import streamlit as st
-from agents.diagnosis_agent import DiagnosisAgent
-from agents.customer_engagement_agent import CustomerEngagementAgent
+from itertools import islice
+from agents.diagnosis_agent import get_diagnosis_agent
+from utils.spatial_index import CenterIndex, haversine_km
+from utils.slot_store import SlotStore
+from utils.slot_calendar import SlotCalendar
+from utils.slot_templates import SLOT_HORIZON_DAYS, SlotTemplate
+from utils.fleet_scheduler import FleetScheduler
+from utils.job_queue import get_job_queue
+from utils.slot_cache import SlotQueryCache
+from utils.center_stats import LOAD_WEIGHT_DAYS, LOAD_WEIGHT_KM, MAX_LOAD_PENALTY_KM, CenterStats
+from utils.slot_preferences import SlotPreferences
+from utils.agent_logic import log_event
+
+ENRICH_JOB = "booking.enrich"
 
 # Load env
 ENV_PATH = Path(__file__).parent.parent / ".env"
 load_dotenv(dotenv_path=ENV_PATH)
 
+def _roll_horizon_daily(agent_ref, stop: threading.Event, check_every: int = 600):
+    """Background job: move the calendar horizon forward when the day changes.
+    Holds the agent only weakly, so a discarded agent is collected and the thread exits."""
+    while not stop.wait(check_every):
+        agent = agent_ref()
+        if agent is None:
+            return
+        try:
+            agent._roll_horizon()
+        except Exception as e:
+            print(f"⚠️ Slot horizon roll failed: {e}")
+        del agent
+
+
 class SchedulingAgent:
-    def __init__(self):
+    def __init__(self, centers: dict | None = None, template: SlotTemplate | None = None, slot_store: SlotStore | None = None,
+                 jobs=None, horizon_days: int = SLOT_HORIZON_DAYS, diagnosis_agent=None, roll_horizon: bool = True):
+        """Defaults are the real centers, data/slots.db, the shared job queue and diagnosis
+        agent, and a daily horizon roll; the benchmark harness (utils/scheduling_bench.py)
+        passes synthetic ones and turns the roll off."""
         #self.llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.2)
-        self.slots_df = self._load_or_init_slots()
         self.high_risk_slots = 10  # Per center reserve
-        self.centers = self._get_centers()  # 25+ REAL Mumbai centers
-        self.diagnosis_agent = DiagnosisAgent()
+        self.centers = centers or self._get_centers()  # 25+ REAL Mumbai centers
+        self.center_index = CenterIndex(self.centers)
+        self.template = template or SlotTemplate(self.centers.keys())
+        self.slot_store = slot_store or self._load_or_init_slots()
+        self.calendar = SlotCalendar.from_store(self.template, self.slot_store, self._horizon_start(), horizon_days)
+        self.fleet_scheduler = FleetScheduler(self.center_index, self.calendar)
+        self.slot_cache = SlotQueryCache()
+        self.center_stats = CenterStats(self.calendar)
+        self.diagnosis_agent = diagnosis_agent or get_diagnosis_agent()
+        if jobs is None:
+            # one handler per process, whichever agent submitted the job
+            self.jobs = get_job_queue()
+            self.jobs.register(ENRICH_JOB, _enrich_job)
+        else:
+            self.jobs = jobs
+            self.jobs.register(ENRICH_JOB, self._enrich_bookings)
+        self._stop = threading.Event()
+        if roll_horizon:
+            threading.Thread(target=_roll_horizon_daily, args=(weakref.ref(self), self._stop),
+                             name="slot-horizon-roll", daemon=True).start()
+
+    def close(self):
+        """Stop the horizon-roll thread (it also stops on its own once the agent is garbage-collected)."""
+        self._stop.set()
     
+    @property
+    def slots_df(self):
+        """Snapshot of the slot horizon: template slots overlaid with stored bookings/closures (read-only)"""
+        df = self.template.frame(self.calendar.start, self.calendar.days)
+        stored = self.slot_store.between(f"{self.calendar.start:%Y-%m-%d}", f"{self.calendar.end:%Y-%m-%d}")
+        df = pd.concat([df[~df['slot_id'].isin(stored['slot_id'])], stored])
+        return df.sort_values('slot_id').reset_index(drop=True)
+
     def _load_or_init_slots(self):
-        """Load/create slots.csv with high-risk reservations"""
+        """Open the slot store; slots come from the center template, so only bookings/closures are stored.
+        A fresh store takes over the bookings recorded in slots.csv."""
+        store = SlotStore(template=self.template)
         slots_path = "data/slots.csv"
-        if Path(slots_path).exists():
+        if store.is_empty() and Path(slots_path).exists():
             df = pd.read_csv(slots_path)
-            df['date'] = pd.to_datetime(df['date'], errors='coerce')
-            return df.dropna(subset=['date'])
-        
-        # Generate slots for REAL service centers
-        dates = pd.date_range(start=datetime.now().date(), periods=7)
-        times = ["09:30", "10:30", "14:00", "15:30", "16:30"]
-        centers_list = list(self._get_centers().keys())
-        
-        slots = []
-        slot_id = 1
-        for date in dates:
-            for time in times:
-                for center in centers_list:
-                    # Reserve first 2 slots per center for high-risk
-                    is_high_risk = slot_id % 25 < 10
-                    slots.append({
-                        'slot_id': slot_id,
-                        'date': date.strftime('%Y-%m-%d'),
-                        'time': time,
-                        'center': center,
-                        'vehicle_name': None,
-                        'status': 'available',
-                        'is_high_risk_reserve': is_high_risk,
-                        'priority_level': 'emergency' if is_high_risk else 'normal'
-                    })
-                    slot_id += 1
-        
-        df = pd.DataFrame(slots)
-        df.to_csv(slots_path, index=False)
-        print(f"✅ Created {len(df)} slots across {len(centers_list)} Mumbai centers")
-        return df
-    
+            df['slot_id'] = [self.template.slot_id(c, d, t) for c, d, t in zip(df['center'], df['date'], df['time'])]
+            deviations = df[(df['status'] != 'available') | (df['is_high_risk_reserve'] != self.template.is_reserve(df['slot_id']))]
+            store.insert_many(deviations)
+            print(f"✅ Imported {len(deviations)} booked/changed slots from {slots_path}")
+        return store
+
+    def _horizon_start(self):
+        return max(pd.Timestamp(datetime.now().date()), self.template.date_of(0))
+
+    def _roll_horizon(self):
+        self.calendar.roll(self._horizon_start(), self.slot_store)
+        self.slot_cache.clear()
+
+    def _bookable(self, slot_id) -> bool:
+        """A template slot dated between today and the end of the horizon."""
+        if not self.template.contains(slot_id):
+            return False
+        day = self.template.date_of(int(self.template.locate(slot_id)[1]))
+        return self._horizon_start() <= day <= self.calendar.end
+
     def _get_centers(self):
         """50+ REAL Mumbai car service centers (No API needed!)"""
         return {
@@ -128,89 +177,193 @@ class SchedulingAgent:
         }
 
     
-    def book_with_preferences(self, vehicle_name: str, center_name: str, preferences: list[str], customer_name: str = "Customer") -> dict:
+    def book_with_preferences(self, vehicle_name: str, center_name: str, preferences, customer_name: str = "Customer",
+                              ranking: str = "distance") -> dict:
             """
-            Pick the first available slot at the selected center that matches user preferences.
-            For now, treat preferences as free-text labels and just choose the earliest slot.
+            Book the best open slot that matches the user's preferences (see SlotPreferences):
+            exact "YYYY-MM-DD HH:MM" choices first, in the order given, then the earliest slot
+            inside their time windows / days / centers. ranking="load_aware" trades a later
+            day for a less crowded one (see CenterStats).
             """
-            # filter slots for this center that are still available
-            df = self.slots_df[
-                (self.slots_df["center"] == center_name)
-                & (self.slots_df["status"] == "available")
-            ].copy()
-
-            if df.empty:
-                return {"status": "error", "message": f"No slots available at {center_name}"}
-
-            # pick the earliest slot
-            df["date"] = pd.to_datetime(df["date"], errors="coerce")
-            df = df.sort_values(["date", "time"])
-            chosen = df.iloc[0]
-
-            booking = self.book_appointment(
-                vehicle_name=vehicle_name,
-                slot_id=int(chosen["slot_id"]),
-                customer_name=customer_name,
-                risk_level="medium",
-                auto_confirm=True,
-            )
+            prefs = SlotPreferences.parse(preferences)
+            self._sync_calendar()
+            for slot_id in self._preferred_slots(center_name, prefs, ranking):
+                booking = self.book_appointment(
+                    vehicle_name=vehicle_name,
+                    slot_id=slot_id,
+                    customer_name=customer_name,
+                    risk_level="medium",
+                    auto_confirm=True,
+                )
+                if booking["status"] != "error":
+                    break
+            else:
+                return {"status": "error", "message": f"No slots matching your preferences at {center_name}"}
 
             # attach the raw user preferences so OEM can see them
             booking["user_preferences"] = preferences
             return booking
+
+    def _preference_centers(self, center_name: str, prefs: SlotPreferences) -> list:
+        """(center, km) pairs the preferences allow, nearest first"""
+        location = prefs.location or self.centers.get(center_name)
+        named = [c for c in (prefs.centers or [center_name]) if c in self.center_index]
+        if location is None:
+            return [(c, 0.0) for c in named]
+        if prefs.max_km is None:
+            return sorted(zip(named, self.center_index.distances(location, named).tolist()), key=lambda c: c[1])
+        return [(c, km) for c, km in self.center_index.iter_nearest(location, prefs.max_km)
+                if not prefs.centers or c in prefs.centers]
+
+    def _preferred_slots(self, center_name: str, prefs: SlotPreferences, ranking: str = "distance"):
+        """Slot ids to try, best first. Lazy: a booking usually reads one or two bitmap words."""
+        centers = self._preference_centers(center_name, prefs)
+        for date, slot_time in prefs.slots:
+            if slot_time not in self.template.times:
+                continue
+            for center, _ in centers:
+                slot_id = self.template.slot_id(center, date, slot_time)
+                if self.calendar.is_free(slot_id):
+                    yield slot_id
+
+        filters = dict(start=prefs.after, until=prefs.before,
+                       times=prefs.time_mask(self.template.times), days=prefs.day_mask(self.calendar))
+        if ranking == "load_aware":
+            streams = [self._least_loaded_slots(center, km, **filters) for center, km in centers]
+        else:
+            streams = [self._earliest_slots(center, km, **filters) for center, km in centers]
+        for *_, slot_id in heapq.merge(*streams):
+            yield slot_id
+
+    def _earliest_slots(self, center_name: str, km: float = 0.0, **filters):
+        """The center's free slots as (date, time, km, slot_id), earliest first"""
+        for slot_id, date, slot_time in self.calendar.iter_free(center_name, **filters):
+            yield date, slot_time, km, slot_id
+
+    def _least_loaded_slots(self, center_name: str, km: float = 0.0, **filters) -> list:
+        """The center's first free slot of each day as (score, day, km, slot_id), best first.
+        score = days out + load penalty + km / LOAD_WEIGHT_KM, so across centers every
+        LOAD_WEIGHT_KM of extra driving counts like one day later."""
+        load = self.center_stats.day_load(center_name)
+        first_of_day = {}
+        for slot_id, date, _ in self.calendar.iter_free(center_name, **filters):
+            first_of_day.setdefault(self.calendar.day_of(date), slot_id)
+        return sorted((d + LOAD_WEIGHT_DAYS * load[d] + km / LOAD_WEIGHT_KM, d, km, slot_id)
+                      for d, slot_id in first_of_day.items())
+
     def get_available_slots(self, vehicle_name: str, customer_location: tuple = (19.0760, 72.8777), 
-                          days_ahead: int = 7, risk_level: str = "medium") -> list:
-        """Find nearest centers + available slots"""
-        df = self.slots_df[
-            (self.slots_df['status'] == 'available') & 
-            (self.slots_df['date'] <= (datetime.now().date() + timedelta(days=days_ahead)).strftime('%Y-%m-%d'))
-        ].copy()
-        
-        if df.empty:
-            return [{"message": "No slots available - contact emergency line"}]
+                          days_ahead: int = 7, risk_level: str = "medium", ranking: str = "distance") -> list:
+        """Find nearest centers + available slots.
+        ranking="load_aware" ranks by distance plus a penalty for busy centers (utilization and
+        near-term queue, see CenterStats.load_penalty_km), spreading demand to idle ones."""
+        until = (datetime.now().date() + timedelta(days=days_ahead)).strftime('%Y-%m-%d')
+        self._sync_calendar()
         
-        # Sort by proximity to customer (using REAL center coordinates)
-        df['distance'] = df['center'].map(lambda c: self._haversine(
-            customer_location[0], customer_location[1], 
-            self.centers[c][0], self.centers[c][1]
-        ))
-        df = df.sort_values(['distance', 'date', 'time'])
+        # Candidates are cached per ~1 km location cell and re-ranked by exact distance
+        tier = 'priority' if risk_level in ['high', 'critical'] else 'standard'
+        limit = self.high_risk_slots if tier == 'priority' else 10
+        load_aware = ranking == "load_aware"
+        key = self.slot_cache.key(customer_location, until, f"{tier}:{ranking}")
+        candidates = self.slot_cache.get(key)
+        if candidates is None:
+            generation = self.slot_cache.generation
+            margin = self.slot_cache.margin_km(key) + (MAX_LOAD_PENALTY_KM if load_aware else 0.0)
+            candidates, searched = self._slot_candidates(self.slot_cache.cell_center(key), until, limit, margin)
+            self.slot_cache.put(key, candidates, searched, generation)
         
-        # High risk gets priority access to reserved slots
-        if risk_level in ['high', 'critical']:
-            return df.head(self.high_risk_slots)[['slot_id', 'date', 'time', 'center', 'distance']].to_dict('records')
+        if not candidates:
+            return [{"message": "No slots available - contact emergency line"}]
         
-        return df.head(10)[['slot_id', 'date', 'time', 'center', 'distance']].to_dict('records')
+        distances = self.center_index.distances(customer_location, list(candidates))
+        slots = []
+        for (center, free), km in zip(candidates.items(), distances):
+            score = km
+            if load_aware:
+                utilization = self.center_stats.utilization(center, until)
+                queue_length = self.center_stats.queue_length(center)
+                score = km + self.center_stats.load_penalty_km(center, until)
+            for slot_id, date, slot_time in free:
+                slot = {'slot_id': slot_id, 'date': date, 'time': slot_time, 'center': center, 'distance': km}
+                if load_aware:
+                    slot['utilization'] = utilization
+                    slot['queue_length'] = queue_length
+                slots.append((score, slot))
+        slots.sort(key=lambda s: (s[0], s[1]['date'], s[1]['time']))
+        return [slot for _, slot in slots[:limit]]
+    
+    def _slot_candidates(self, location: tuple, until: str, limit: int, margin_km: float = 0.0):
+        """Earliest open slots of the centers nearest `location`: enough for `limit` slots there,
+        plus every center up to `margin_km` further. Returns ({center: slots}, centers searched)."""
+        candidates, searched, reach = {}, [], None
+        collected = 0
+        for center, km in self.center_index.iter_nearest(location):
+            if reach is not None and km > reach:
+                break
+            searched.append(center)
+            free = list(islice(self.calendar.iter_free(center, until=until), limit))
+            if free:
+                candidates[center] = free
+                collected += len(free)
+                if reach is None and collected >= limit:
+                    reach = km + margin_km
+        return candidates, searched
+    
+    def _sync_calendar(self):
+        """Pull other writers' slot changes into the calendar and drop cached queries they affect"""
+        changes = self.calendar.sync(self.slot_store)
+        if changes is not None:
+            for center in changes['center'].unique():
+                self.slot_cache.invalidate_center(center)
     
     # ... rest of your methods remain EXACTLY the same ...
     def book_appointment(self, vehicle_name: str, slot_id: int, customer_name: str, 
                         risk_level: str = "medium", auto_confirm: bool = False) -> dict:
-        slot = self.slots_df[self.slots_df['slot_id'] == slot_id]
-        if slot.empty or slot.iloc[0]['status'] != 'available':
-            return {"status": "error", "message": "Slot no longer available"}
-        
-        self.slots_df.loc[self.slots_df['slot_id'] == slot_id, 'vehicle_name'] = vehicle_name
-        self.slots_df.loc[self.slots_df['slot_id'] == slot_id, 'status'] = 'booked'
-        self.slots_df.loc[self.slots_df['slot_id'] == slot_id, 'priority_level'] = risk_level
-        self.slots_df.to_csv("data/slots.csv", index=False)
+        if not self._bookable(slot_id):
+            return {"status": "error", "slot_id": slot_id, "message": "Slot is not in the booking horizon"}
+        # Compare-and-set: only one concurrent caller can claim the slot
+        slot = self.slot_store.book(slot_id, vehicle_name, risk_level)
+        if slot is None:
+            self._sync_calendar()
+            return {"status": "error", "slot_id": slot_id, "message": "Slot no longer available"}
+        self.calendar.set_free(slot_id, False)
+        self.slot_cache.invalidate_center(slot['center'])
         
-        diagnosis = self.diagnosis_agent.continuous_monitor(vehicle_name)
+        # Diagnosis + notification run after the booking has committed
+        job_id = self.jobs.submit(ENRICH_JOB, {"bookings": [slot]})
         return {
             "status": "confirmed" if auto_confirm else "reserved",
             "slot_id": slot_id,
             "vehicle_name": vehicle_name,
             "customer_name": customer_name,
-            "center": slot.iloc[0]['center'],
-            "date": slot.iloc[0]['date'].strftime('%Y-%m-%d'),
-            "time": slot.iloc[0]['time'],
+            "center": slot['center'],
+            "date": slot['date'],
+            "time": slot['time'],
             "risk_level": risk_level,
             "needs_confirmation": not auto_confirm,
-            "diagnosis": diagnosis['predicted_failure']
+            "diagnosis": "pending",
+            "enrichment_job": job_id
         }
     
+    def _enrich_bookings(self, payload: dict) -> dict:
+        """Background stage for committed bookings: diagnose the vehicles in one batch,
+        store the predicted failure on each booking and log the confirmation notice."""
+        bookings = payload["bookings"]
+        diagnosis = self.diagnosis_agent.diagnose_many([b['vehicle_name'] for b in bookings])
+        results = {}
+        for booking, failure in zip(bookings, diagnosis['predicted_failure']):
+            self.slot_store.annotate(booking['slot_id'], failure)
+            log_event(
+                booking['vehicle_name'], "Scheduling Agent", "Service slot booked", "scheduling",
+                booking['status'], f"Predicted issue: {failure}",
+                output=f"{booking['center']} {booking['date']} {booking['time']}",
+                date=booking['date'], center=booking['center'],
+            )
+            results[booking['slot_id']] = failure
+        return results
+
     def auto_reserve_high_risk(self, vehicle_name: str, customer_location: tuple):
         slots = self.get_available_slots(vehicle_name, customer_location, risk_level="critical")
-        if not slots:
+        if not slots or 'slot_id' not in slots[0]:
             return {"status": "error", "message": "No emergency slots"}
         
         nearest_slot = slots[0]
@@ -218,14 +371,78 @@ class SchedulingAgent:
             vehicle_name, nearest_slot['slot_id'], "Emergency", 
             risk_level="critical", auto_confirm=False
         )
-        booking['message'] = f"🚨 EMERGENCY SLOT RESERVED: {nearest_slot['center']} ({nearest_slot['distance']:.1f}km) on {nearest_slot['date']} {nearest_slot['time']}. Reply YES to confirm."
+        if booking['status'] != "error":
+            booking['message'] = f"🚨 EMERGENCY SLOT RESERVED: {nearest_slot['center']} ({nearest_slot['distance']:.1f}km) on {nearest_slot['date']} {nearest_slot['time']}. Reply YES to confirm."
         return booking
     
+    def auto_reserve_fleet(self, vehicles: list, days_ahead: int = 7, center_cap: int | None = None) -> list:
+        """Reserve slots for many (vehicle_name, customer_location, risk_level) tuples at once.
+        Assignment is planned jointly (see FleetScheduler) and booked in one transaction.
+        """
+        until = (datetime.now().date() + timedelta(days=days_ahead)).strftime('%Y-%m-%d')
+        self._sync_calendar()
+        plan = self.fleet_scheduler.plan(vehicles, until=until, center_cap=center_cap)
+        planned = [p for p in plan if p['slot_id'] is not None]
+        booked = self.slot_store.book_many([(p['slot_id'], p['vehicle_name'], p['risk_level']) for p in planned])
+        for p, slot in zip(planned, booked):
+            p['booked'] = slot is not None
+            if slot is not None:
+                self.calendar.set_free(p['slot_id'], False)
+                self.slot_cache.invalidate_center(p['center'])
+        if not all(p['booked'] for p in planned):
+            self._sync_calendar()
+
+        job_id = self.jobs.submit(ENRICH_JOB, {"bookings": [slot for slot in booked if slot]}) if any(booked) else None
+
+        results = []
+        for p in plan:
+            if p['slot_id'] is None:
+                results.append({"status": "error", "vehicle_name": p['vehicle_name'], "message": "No emergency slots"})
+            elif not p['booked']:
+                results.append({"status": "error", "vehicle_name": p['vehicle_name'], "message": "Slot no longer available"})
+            else:
+                results.append({
+                    "status": "reserved",
+                    "slot_id": p['slot_id'],
+                    "vehicle_name": p['vehicle_name'],
+                    "customer_name": "Emergency",
+                    "center": p['center'],
+                    "date": p['date'].strftime('%Y-%m-%d'),
+                    "time": p['time'],
+                    "risk_level": p['risk_level'],
+                    "needs_confirmation": True,
+                    "distance": p['distance'],
+                    "diagnosis": "pending",
+                    "enrichment_job": job_id,
+                    "message": f"🚨 EMERGENCY SLOT RESERVED: {p['center']} ({p['distance']:.1f}km) on {p['date']:%Y-%m-%d} {p['time']}. Reply YES to confirm.",
+                })
+        print(f"✅ Fleet reservation: {sum(r['status'] == 'reserved' for r in results)}/{len(vehicles)} vehicles booked")
+        return results
+
     def _haversine(self, lat1, lon1, lat2, lon2):
-        R = 6371
-        dlat, dlon = np.radians([lat2-lat1, lon2-lon1])
-        a = np.sin(dlat/2)**2 + np.cos(np.radians(lat1)) * np.cos(np.radians(lat2)) * np.sin(dlon/2)**2
-        return 2 * R * np.arcsin(np.sqrt(a))
+        return haversine_km(lat1, lon1, lat2, lon2)
+
+_shared_agent = None
+_shared_lock = threading.Lock()
+
+
+def _enrich_job(payload: dict) -> dict:
+    """booking.enrich handler of the process-wide job queue; runs on the shared agent."""
+    return get_scheduling_agent()._enrich_bookings(payload)
+
+
+def get_scheduling_agent() -> SchedulingAgent:
+    """Process-wide SchedulingAgent: the calendar, slot-query cache and center stats are built
+    once and reused by every Streamlit rerun and orchestrator run. The cache stays correct
+    across processes because each query first pulls the store's changes since the calendar's
+    `rev` and invalidates the centers they touch."""
+    global _shared_agent
+    if _shared_agent is None:
+        with _shared_lock:
+            if _shared_agent is None:
+                _shared_agent = SchedulingAgent()
+    return _shared_agent
+
 
 # Test
 if __name__ == "__main__":
@@ -4,8 +4,8 @@ import pandas as pd
 import streamlit as st
 
 from agents.customer_engagement_agent import CustomerEngagementAgent
-from agents.scheduling_agent import SchedulingAgent
-from agents.diagnosis_agent import DiagnosisAgent
+from agents.scheduling_agent import get_scheduling_agent
+from agents.diagnosis_agent import get_diagnosis_agent
 from agents.feedback_agent import FeedbackAgent
 from graph.master import MasterOrchestrator
 from models.manufacturing_insight_model import ManufacturingInsightModule
@@ -77,8 +77,8 @@ if tab == "User":
     feedback_df = load_feedback()
 
     cea = CustomerEngagementAgent()
-    sched = SchedulingAgent()
-    diag = DiagnosisAgent()
+    sched = get_scheduling_agent()
+    diag = get_diagnosis_agent()
     master = MasterOrchestrator()
 
     vehicle_options = vehicles["vehicle_name"].tolist()
@@ -9,9 +9,9 @@ from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
 from typing import TypedDict, List
 from datetime import datetime
-from agents.diagnosis_agent import DiagnosisAgent
+from agents.diagnosis_agent import get_diagnosis_agent
 from agents.customer_engagement_agent import CustomerEngagementAgent
-from agents.scheduling_agent import SchedulingAgent
+from agents.scheduling_agent import get_scheduling_agent
 from agents.feedback_agent import FeedbackAgent
 from utils.security_tools import agent_ueba
 
@@ -37,9 +37,9 @@ class AgentState(TypedDict):
 class MasterOrchestrator:
     def __init__(self):
         self.llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.1)
-        self.diagnosis_agent = DiagnosisAgent()
+        self.diagnosis_agent = get_diagnosis_agent()
         self.customer_agent = CustomerEngagementAgent()
-        self.scheduling_agent = SchedulingAgent()
+        self.scheduling_agent = get_scheduling_agent()
         self.feedback_agent = FeedbackAgent()
         self.checkpointer = MemorySaver()
         self.graph = self._build_workflow()
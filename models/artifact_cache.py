@@ -0,0 +1,96 @@
+import os
+import json
+import hashlib
+import joblib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+ARTIFACT_DIR = "data/models/artifacts"
+
+
+def data_fingerprint(data) -> str:
+    """Content hash of training data (DataFrame or array), vectorized via pandas hashing."""
+    if isinstance(data, np.ndarray):
+        data = pd.DataFrame(data)
+    h = hashlib.sha1(pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes())
+    h.update(json.dumps([str(c) for c in data.columns]).encode())
+    return h.hexdigest()
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+class ArtifactCache:
+    """On-disk cache of fitted models keyed by (name, training-data fingerprint, features, params).
+
+    The point is that a worker starts without refitting. Artifacts are
+    uncompressed joblib files loaded with mmap_mode="r", so plain numpy
+    attributes (scaler statistics, per-tree feature lists, …) are mapped from
+    the page cache rather than copied. The trees themselves are not shared:
+    sklearn's Tree.__setstate__ copies its node arrays, so every process holds
+    its own copy of a forest. Each (name, features) also remembers its latest
+    artifact for callers that want to continue from it.
+    """
+
+    def __init__(self, root: str = ARTIFACT_DIR, max_per_name: int = 8):
+        self.root = Path(root)
+        self.max_per_name = max_per_name
+
+    def _path(self, name, fingerprint, features, params) -> Path:
+        return self.root / f"{name}-{_digest(fingerprint, list(features), params)}.joblib"
+
+    def _latest_pointer(self, name, features) -> Path:
+        return self.root / f"{name}-{_digest(list(features))}.latest"
+
+    def _load(self, path: Path):
+        try:
+            return joblib.load(path, mmap_mode="r")
+        except Exception as e:
+            print(f"⚠️ Could not load model artifact {path}: {e}")
+            return None
+
+    def get(self, name: str, fingerprint: str, features, params=None):
+        path = self._path(name, fingerprint, features, params)
+        return self._load(path) if path.exists() else None
+
+    def latest(self, name: str, features):
+        pointer = self._latest_pointer(name, features)
+        if not pointer.exists():
+            return None
+        path = self.root / pointer.read_text().strip()
+        return self._load(path) if path.exists() else None
+
+    def put(self, name: str, fingerprint: str, features, artifact, params=None) -> Path:
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._path(name, fingerprint, features, params)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        joblib.dump(artifact, tmp)
+        os.replace(tmp, path)
+
+        pointer = self._latest_pointer(name, features)
+        tmp = pointer.with_name(f"{pointer.name}.{os.getpid()}.tmp")
+        tmp.write_text(path.name)
+        os.replace(tmp, pointer)
+        self._evict(name, keep=path)
+        return path
+
+    def _evict(self, name: str, keep: Path):
+        files = sorted(self.root.glob(f"{name}-*.joblib"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for old in files[self.max_per_name:]:
+            if old != keep:
+                old.unlink(missing_ok=True)
+
+    def get_or_fit(self, name: str, data, features, fit_fn, params=None, fingerprint: str | None = None):
+        """Cached artifact for this exact training data, fitting (and storing) it on a miss."""
+        fingerprint = fingerprint or data_fingerprint(data)
+        artifact = self.get(name, fingerprint, features, params)
+        if artifact is None:
+            artifact = fit_fn()
+            self.put(name, fingerprint, features, artifact, params)
+        return artifact
+
+
+# Global instance
+artifact_cache = ArtifactCache()
@@ -0,0 +1,63 @@
+import time
+import threading
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ModelVersion:
+    """One fitted scaler/forest pair as handed out to the agents."""
+
+    version: int
+    scaler: object
+    forest: object
+    features: tuple
+    trained_rows: int
+    published_at: float
+    watermark: int = 0  # telematics rows with seq below this were seen in training
+    reference: object = None  # scaled sample of the training rows, used to recalibrate the forest's offset
+
+
+class ModelRegistry:
+    """Process-wide holder of the current diagnosis model.
+
+    Readers grab `current()` per call, so publishing a newer version swaps the
+    model for every agent at once without rebuilding anything.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._current = None
+
+    def current(self) -> ModelVersion | None:
+        return self._current
+
+    @property
+    def version(self) -> int:
+        return self._current.version if self._current else 0
+
+    def publish(self, scaler, forest, features, trained_rows: int, version: int | None = None,
+                watermark: int = 0, reference=None) -> ModelVersion:
+        """Make a fitted pair current. Versions older than the live one are ignored."""
+        with self._lock:
+            if version is None:
+                version = self.version + 1
+            if self._current is not None and version <= self._current.version:
+                print(f"⚠️ Model v{version} not newer than live v{self._current.version}, keeping live model")
+                return self._current
+
+            self._current = ModelVersion(
+                version=version,
+                scaler=scaler,
+                forest=forest,
+                features=tuple(features),
+                trained_rows=trained_rows,
+                published_at=time.time(),
+                watermark=watermark,
+                reference=reference,
+            )
+            print(f"✅ Diagnosis model v{version} published ({trained_rows} rows)")
+            return self._current
+
+
+# Global instance
+diagnosis_models = ModelRegistry()
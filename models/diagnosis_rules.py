@@ -0,0 +1,149 @@
+import os
+import json
+import time
+import operator
+import threading
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+RULES_PATH = "data/diagnosis_rules.json"
+
+OUTPUT_FIELDS = ["risk", "failure_type", "urgency"]
+
+_NUMERIC_OPS = {
+    "<": (np.less, operator.lt),
+    "<=": (np.less_equal, operator.le),
+    ">": (np.greater, operator.gt),
+    ">=": (np.greater_equal, operator.ge),
+    "==": (np.equal, operator.eq),
+    "!=": (np.not_equal, operator.ne),
+}
+
+
+def _compile_condition(cond: dict):
+    """(mask over columns, test on one row dict) for a single condition."""
+    field, op, value = cond["field"], cond["op"], cond["value"]
+    if op == "contains":
+        value = str(value)
+        return (
+            lambda cols: cols[field].str.contains(value, regex=False).to_numpy(),
+            lambda row: value in row[field],
+        )
+    if op not in _NUMERIC_OPS:
+        raise ValueError(f"Unknown rule operator '{op}'")
+    array_fn, scalar_fn = _NUMERIC_OPS[op]
+    value = float(value)
+    return lambda cols: array_fn(cols[field], value), lambda row: scalar_fn(float(row[field]), value)
+
+
+def compile_rules(table: dict):
+    """Validate a rule table and turn it into ((name, mask_fn, test_fn, outputs), ...) in
+    priority order plus the default outputs. A rule with both `all` and `any` needs
+    every `all` condition and at least one `any` condition."""
+    compiled = []
+    rules = sorted(enumerate(table["rules"]), key=lambda item: (item[1].get("priority", 0), item[0]))
+    for _, rule in rules:
+        when = rule["when"]
+        unknown = set(when) - {"all", "any"}
+        if unknown:
+            raise ValueError(f"Rule '{rule.get('name')}' has unknown condition groups {sorted(unknown)}")
+        all_conds = [_compile_condition(c) for c in when.get("all", [])]
+        any_conds = [_compile_condition(c) for c in when.get("any", [])]
+        if not all_conds and not any_conds:
+            raise ValueError(f"Rule '{rule.get('name')}' has no conditions")
+        outputs = tuple(rule["then"][f] for f in OUTPUT_FIELDS)
+
+        def mask(cols, all_conds=all_conds, any_conds=any_conds):
+            masks = [m(cols) for m, _ in all_conds]
+            if any_conds:
+                masks.append(np.logical_or.reduce([m(cols) for m, _ in any_conds]))
+            return np.logical_and.reduce(masks)
+
+        def test(row, all_conds=all_conds, any_conds=any_conds):
+            return all(t(row) for _, t in all_conds) and (not any_conds or any(t(row) for _, t in any_conds))
+
+        compiled.append((rule.get("name", ""), mask, test, outputs))
+    default = tuple(table["default"][f] for f in OUTPUT_FIELDS)
+    return tuple(compiled), default
+
+
+class DiagnosisRules:
+    """Declarative diagnosis rules, evaluated as NumPy masks over whole columns.
+
+    The rules live only in the JSON file. The first matching rule by priority
+    wins. The file is re-read when it changes (its mtime is checked at most
+    every `check_interval` seconds), so rules can be tuned without restarting.
+    A broken edit keeps the previous rules live.
+    """
+
+    def __init__(self, path: str = RULES_PATH, check_interval: float = 1.0):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        if not self.path.exists():
+            raise FileNotFoundError(f"{self.path} not found; it holds the diagnosis rules")
+        with open(self.path) as fh:
+            self._table = compile_rules(json.load(fh))  # (rules, default), swapped as one
+        self._mtime = os.path.getmtime(self.path)
+        print(f"✅ Loaded {len(self._table[0])} diagnosis rules from {self.path}")
+
+    def reload(self, force: bool = False) -> bool:
+        """Re-read the rule file if it changed; returns True when new rules went live."""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                return False
+            if not force and mtime == self._mtime:
+                return False
+            try:
+                with open(self.path) as fh:
+                    self._table = compile_rules(json.load(fh))
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"⚠️ Invalid rules in {self.path}: {e}; keeping previous rules")
+                return False
+            finally:
+                self._mtime = mtime
+        print(f"✅ Loaded {len(self._table[0])} diagnosis rules from {self.path}")
+        return True
+
+    @property
+    def names(self):
+        return [rule[0] for rule in self._table[0]]
+
+    def evaluate(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Label every row of `frame` (telematics features + anomaly_score + status).
+        Returns risk / failure_type / urgency plus the name of the rule that fired.
+        """
+        self.reload()
+        rules, default = self._table
+        cols = {c: frame[c].to_numpy() for c in frame.columns if c != "status"}
+        cols["status"] = frame["status"].fillna("").astype(str) if "status" in frame else pd.Series([""] * len(frame))
+
+        conditions = [mask(cols) for _, mask, _, _ in rules]
+        result = {
+            field: np.select(conditions, [out[i] for _, _, _, out in rules], default[i])
+            for i, field in enumerate(OUTPUT_FIELDS)
+        }
+        result["rule"] = np.select(conditions, [name for name, _, _, _ in rules], "default")
+        return pd.DataFrame(result, index=frame.index)
+
+    def evaluate_one(self, latest, anomaly_score: float, status: str) -> dict:
+        """`evaluate` for a single vehicle, on plain values: rules are tested in
+        priority order and the first match returns."""
+        self.reload()
+        rules, default = self._table
+        row = dict(latest)
+        row["anomaly_score"] = anomaly_score
+        row["status"] = status if isinstance(status, str) else ""
+        for name, _, test, outputs in rules:
+            if test(row):
+                return {**dict(zip(OUTPUT_FIELDS, outputs)), "rule": name}
+        return {**dict(zip(OUTPUT_FIELDS, default)), "rule": "default"}
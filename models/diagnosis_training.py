@@ -0,0 +1,202 @@
+import copy
+import weakref
+import threading
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+from models.artifact_cache import ArtifactCache, artifact_cache
+from models.diagnosis_registry import ModelRegistry, diagnosis_models
+from utils.telematics_engine import TELEMATICS_FEATURES
+
+ARTIFACT_NAME = "diagnosis"
+RETRAIN_INTERVAL = 15 * 60  # seconds between scheduled store syncs + incremental updates
+REFERENCE_ROWS = 4096  # training rows kept (scaled) to recalibrate the anomaly threshold
+
+# Per-tree state IsolationForest keeps in parallel lists; trimmed together
+_PER_TREE_ATTRS = [
+    "estimators_",
+    "estimators_features_",
+    "_average_path_length_per_tree",
+    "_decision_path_lengths",
+    "_seeds",
+]
+
+
+def _drop_oldest_trees(forest: IsolationForest, keep: int):
+    """Sliding window over the ensemble: keep only the `keep` newest trees."""
+    drop = len(forest.estimators_) - keep
+    if drop <= 0:
+        return
+    for attr in _PER_TREE_ATTRS:
+        if hasattr(forest, attr):
+            setattr(forest, attr, getattr(forest, attr)[drop:])
+    forest.n_estimators = keep
+
+
+def _sample(rows: np.ndarray, n: int, rng) -> np.ndarray:
+    if len(rows) <= n:
+        return rows
+    return rows[rng.choice(len(rows), n, replace=False)]
+
+
+def _retrain_periodically(trainer_ref, stop: threading.Event, interval: float, sync):
+    """Background job: pull new raw rows into the store, then update the model.
+    Holds the trainer only weakly, so a discarded agent's thread exits on its own."""
+    while not stop.wait(interval):
+        trainer = trainer_ref()
+        if trainer is None:
+            return
+        try:
+            if sync is not None:
+                with trainer._train_lock:
+                    sync()
+            trainer.train()
+        except Exception as e:
+            print(f"⚠️ Scheduled diagnosis retrain failed: {e}")
+        del trainer
+
+
+class IncrementalTrainer:
+    """Keeps the diagnosis model current at a cost proportional to new telematics.
+
+    The first run fits StandardScaler + IsolationForest on the full history as
+    before. Later runs read only store rows past the model's watermark, grow
+    `trees_per_update` new trees on them (warm start) and retire the oldest
+    ones beyond `max_trees`. The scaler stays frozen between full fits so the
+    kept trees still see the space they were grown in; when the new rows have
+    drifted more than `max_drift` standard deviations the whole model is refit.
+    The anomaly threshold is recalibrated on a reference sample of old and new
+    rows. `start` runs a store sync + update every `interval` seconds.
+    Training works on copies; the live model keeps serving until the new version
+    is published, and every version is stored in the artifact cache keyed by the
+    store source and watermark.
+    """
+
+    def __init__(self, store, registry: ModelRegistry = diagnosis_models,
+                 cache: ArtifactCache = artifact_cache, features=TELEMATICS_FEATURES,
+                 trees_per_update: int = 20, max_trees: int = 100, min_new_rows: int = 256,
+                 max_drift: float = 1.0):
+        self.store = store
+        self.registry = registry
+        self.cache = cache
+        self.features = list(features)
+        self.trees_per_update = trees_per_update
+        self.max_trees = max_trees
+        self.min_new_rows = min_new_rows
+        self.max_drift = max_drift
+        self._train_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    # ---------- checkpoints ----------
+    def _fingerprint(self, watermark: int) -> str:
+        return f"{self.store.source_id}:{watermark}"
+
+    def _save_checkpoint(self, model):
+        self.cache.put(
+            ARTIFACT_NAME,
+            self._fingerprint(model.watermark),
+            self.features,
+            {
+                "version": model.version,
+                "scaler": model.scaler,
+                "forest": model.forest,
+                "trained_rows": model.trained_rows,
+                "watermark": model.watermark,
+                "reference": model.reference,
+                "source": self.store.source_id,
+            },
+        )
+
+    def load_checkpoint(self):
+        """Publish the cached model for the store's current data, else the latest one
+        trained on the same source (to catch up from). Returns it or None.
+        """
+        ckpt = self.cache.get(ARTIFACT_NAME, self._fingerprint(self.store.rows_seen), self.features)
+        if ckpt is None:
+            ckpt = self.cache.latest(ARTIFACT_NAME, self.features)
+        if ckpt is None or ckpt["source"] != self.store.source_id:
+            return None
+        return self.registry.publish(
+            ckpt["scaler"], ckpt["forest"], self.features, ckpt["trained_rows"],
+            version=max(ckpt["version"], self.registry.version + 1), watermark=ckpt["watermark"],
+            reference=ckpt.get("reference"),
+        )
+
+    # ---------- training ----------
+    def _full_fit(self, history):
+        X = history[self.features].fillna(history[self.features].mean()).to_numpy()
+        if len(X) <= 10:
+            return None
+        scaler = StandardScaler()
+        forest = IsolationForest(contamination=0.1, random_state=42)
+        X_scaled = scaler.fit_transform(X)
+        forest.fit(X_scaled)
+        reference = _sample(X_scaled, REFERENCE_ROWS, np.random.default_rng(42))
+        return scaler, forest, len(X), reference
+
+    def _drifted(self, scaler, X) -> bool:
+        return bool(np.abs(scaler.transform(X).mean(axis=0)).max() > self.max_drift)
+
+    def _warm_update(self, current, new_rows):
+        X_scaled = current.scaler.transform(new_rows[self.features].to_numpy())
+
+        forest = copy.deepcopy(current.forest)
+        forest.warm_start = True
+        forest.n_estimators = len(forest.estimators_) + self.trees_per_update
+        forest.random_state = 42 + current.version  # fresh tree seeds every round
+        seeds = forest._seeds
+        forest.fit(X_scaled)
+        forest._seeds = np.concatenate([seeds, forest._seeds])  # a warm fit only keeps the new trees' seeds
+        _drop_oldest_trees(forest, self.max_trees)
+
+        # fit() set the threshold from the new rows alone; place it over old and new rows
+        # in proportion, scored by the trees that are actually kept
+        trained_rows = current.trained_rows + len(X_scaled)
+        rng = np.random.default_rng(current.version)
+        n_old = round(REFERENCE_ROWS * current.trained_rows / trained_rows)
+        reference = np.concatenate([
+            _sample(current.reference, n_old, rng),
+            _sample(X_scaled, REFERENCE_ROWS - n_old, rng),
+        ])
+        forest.offset_ = np.percentile(forest.score_samples(reference), 100.0 * forest.contamination)
+        return current.scaler, forest, trained_rows, reference
+
+    def train(self, history=None):
+        """Bring the model up to the store's watermark. Returns the new ModelVersion or None.
+        `history` may pass the already-loaded full frame for the first fit.
+        """
+        with self._train_lock:
+            current = self.registry.current() or self.load_checkpoint()
+            watermark = self.store.rows_seen
+
+            if current is None or current.watermark > watermark or current.reference is None:
+                frame = self.store.read(columns=self.features) if history is None else history
+                fitted = self._full_fit(frame)
+            elif watermark - current.watermark < self.min_new_rows:
+                return None
+            else:
+                new_rows = self.store.read(columns=self.features, min_seq=current.watermark)
+                if len(new_rows) < self.min_new_rows:
+                    return None
+                if self._drifted(current.scaler, new_rows[self.features].to_numpy()):
+                    print("⚠️ New telematics drifted from the scaler, refitting the diagnosis model")
+                    fitted = self._full_fit(self.store.read(columns=self.features))
+                else:
+                    fitted = self._warm_update(current, new_rows)
+
+            if fitted is None:
+                return None
+            scaler, forest, trained_rows, reference = fitted
+            model = self.registry.publish(scaler, forest, self.features, trained_rows,
+                                          watermark=watermark, reference=reference)
+            self._save_checkpoint(model)
+            return model
+
+    def start(self, interval: float = RETRAIN_INTERVAL, sync=None):
+        """Every `interval` seconds call `sync()` (e.g. store.sync of the raw file) and train."""
+        threading.Thread(target=_retrain_periodically, args=(weakref.ref(self), self._stop, interval, sync),
+                         name="diagnosis-retrain", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
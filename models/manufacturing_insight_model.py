@@ -1,9 +1,11 @@
 import pandas as pd
-from textblob import TextBlob
 from sklearn.ensemble import IsolationForest
 import os
+from models.artifact_cache import artifact_cache
+from utils.sentiment import get_sentiment_service
 
 DATA_DIR = "data"
+MIN_CACHED_ROWS = 200  # rating outlier models fitted on fewer rows are not worth an artifact
 
 def load_feedback(path=os.path.join(DATA_DIR, "feedback.csv")):
     print(f"Loading {os.path.abspath(path)}; exists: {os.path.isfile(path)}")
@@ -40,14 +42,12 @@ class ManufacturingInsightModule:
         self._add_sentiment()
 
     def _add_sentiment(self):
-        self.feedback["sentiment"] = self.feedback["comments"].apply(self.basic_sentiment)
+        # feedback.csv carries scores already; only unscored comments go through the shared service
+        get_sentiment_service().fill(self.feedback)
 
     @staticmethod
     def basic_sentiment(comment):
-        if not isinstance(comment, str):
-            return 0
-        blob = TextBlob(comment)
-        return blob.sentiment.polarity  # -1 (negative) to +1 (positive)
+        return get_sentiment_service().score(comment)  # -1 (negative) to +1 (positive)
 
     def aggregate_feedback_insights(self):
         summary = self.feedback.groupby("vehicle_name")["user_rating"].agg(['mean', 'count']).reset_index()
@@ -81,8 +81,18 @@ class ManufacturingInsightModule:
         X = self.feedback[["user_rating"]].values
         if len(X) < 2:
             return []
-        model = IsolationForest(contamination=0.1, random_state=0)
-        preds = model.fit_predict(X)
+        fit = lambda: IsolationForest(contamination=0.1, random_state=0).fit(X)
+        if len(X) < MIN_CACHED_ROWS:
+            model = fit()  # a handful of ratings: refitting is cheaper than an artifact per feedback edit
+        else:
+            model = artifact_cache.get_or_fit(
+                "feedback_rating_outliers",
+                self.feedback[["user_rating"]],
+                ["user_rating"],
+                fit,
+                params={"contamination": 0.1, "random_state": 0},
+            )
+        preds = model.predict(X)
         self.feedback["is_anomaly"] = preds == -1
         outliers = self.feedback[self.feedback["is_anomaly"]]
         return outliers["vehicle_name"].unique().tolist()
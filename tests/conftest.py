@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# Modules use data/... paths relative to the project root and import each other as utils.*, agents.*
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
@@ -0,0 +1,57 @@
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from models.diagnosis_registry import ModelRegistry
+from models.diagnosis_rules import RULES_PATH
+from utils.telematics_engine import KAGGLE_PATH, TELEMATICS_FEATURES
+
+VARIABLES = ["INTERNAL BATTERY", "EXTERNAL BATTERY", "TOWING", "IGNITION_STATUS"]
+
+
+def kaggle_rows(n, start=0, seed=0):
+    rng = np.random.default_rng(seed)
+    lines = []
+    for i in range(start, start + n):
+        minute = i * 7 % (24 * 60)
+        lines.append(f"{minute // 60:02d}:{minute % 60:02d},{rng.choice(VARIABLES)},{rng.integers(30, 50)},{rng.integers(0, 3)}\n")
+    return "".join(lines)
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    from agents.diagnosis_agent import DiagnosisAgent
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    shutil.copy(Path(__file__).resolve().parent.parent / RULES_PATH, RULES_PATH)
+    (tmp_path / "data" / "vehicles.csv").write_text(
+        "vehicle_id,vehicle_name,status\n101,Car A,Active\n102,Car B,Active\n103,Car C,Active\n"
+    )
+    (tmp_path / KAGGLE_PATH).write_text("timestamp,variable,value,alarmClass\n" + kaggle_rows(300))
+    agent = DiagnosisAgent(registry=ModelRegistry())
+    yield agent
+    agent.trainer.stop()
+
+
+def test_refresh_appends_new_rows_to_telematics_and_index(agent, tmp_path):
+    with open(tmp_path / KAGGLE_PATH, "a") as fh:
+        fh.write(kaggle_rows(60, start=300, seed=1))
+    before = len(agent.telematics)
+    added = agent.refresh_telematics()
+    assert added > 0 and len(agent.telematics) == before + added
+    assert len(agent.telematics) == agent.telematics_store.row_count
+
+    fresh = type(agent.index).from_frame(agent.telematics, TELEMATICS_FEATURES)
+    for vid in fresh.vehicle_ids():
+        np.testing.assert_array_equal(agent.index.window_of(vid)[1], fresh.window_of(vid)[1])
+        np.testing.assert_array_equal(agent.index.window_of(vid)[0], fresh.window_of(vid)[0])
+    assert agent.refresh_telematics() == 0
+
+
+def test_refresh_rebuilds_after_the_raw_file_is_replaced(agent, tmp_path):
+    (tmp_path / KAGGLE_PATH).write_text("timestamp,variable,value,alarmClass\n" + kaggle_rows(90, seed=2))
+    assert agent.refresh_telematics() == len(agent.telematics) == 90
+    assert sum(len(agent.index.window_of(vid)[1]) for vid in agent.index.vehicle_ids()) == 90  # old rows are gone
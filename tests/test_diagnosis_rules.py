@@ -0,0 +1,98 @@
+import os
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.diagnosis_rules import RULES_PATH, DiagnosisRules, compile_rules
+
+DEFAULT = {"risk": "low", "failure_type": "none", "urgency": "14d"}
+
+
+def rule(name, priority, when, risk="high"):
+    return {"name": name, "priority": priority, "when": when, "then": {"risk": risk, "failure_type": name, "urgency": "3d"}}
+
+
+def cond(field, op, value):
+    return {"field": field, "op": op, "value": value}
+
+
+def fleet(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        "battery_voltage": rng.uniform(11.0, 13.0, n),
+        "alarm_level": rng.integers(0, 5, n).astype(float),
+        "towing_status": rng.integers(0, 2, n).astype(float),
+        "ignition_status": rng.integers(0, 2, n).astype(float),
+        "vibration": rng.uniform(0, 1, n),
+        "anomaly_score": rng.uniform(-0.3, 0.3, n),
+        "status": rng.choice(["Active", "Fault: Brake Issue", "Fault: Oil Leak", None], n),
+    })
+    frame.loc[::97, "battery_voltage"] = np.nan
+    return frame
+
+
+def test_compile_rules_orders_by_priority_then_position():
+    table = {"default": DEFAULT, "rules": [
+        rule("late", 20, {"all": [cond("x", ">", 0)]}),
+        rule("first", 10, {"all": [cond("x", ">", 0)]}),
+        rule("tie", 20, {"all": [cond("x", ">", 0)]}),
+    ]}
+    rules, default = compile_rules(table)
+    assert [name for name, *_ in rules] == ["first", "late", "tie"]
+    assert default == ("low", "none", "14d")
+
+
+def test_all_and_any_combine():
+    when = {"all": [cond("x", ">", 0)], "any": [cond("y", "==", 1), cond("z", "==", 1)]}
+    [(_, mask, test, _)], _ = compile_rules({"default": DEFAULT, "rules": [rule("both", 1, when)]})
+    cols = {"x": np.array([1.0, 1.0, 1.0, -1.0]), "y": np.array([1.0, 0.0, 0.0, 1.0]), "z": np.array([0.0, 1.0, 0.0, 1.0])}
+    assert mask(cols).tolist() == [True, True, False, False]
+    assert [test({k: v[i] for k, v in cols.items()}) for i in range(4)] == [True, True, False, False]
+
+
+@pytest.mark.parametrize("when", [
+    {"all": [cond("x", "~", 1)]},  # unknown operator
+    {"all": []},  # no conditions
+    {"none": [cond("x", ">", 0)]},  # unknown group
+])
+def test_invalid_rules_are_rejected(when):
+    with pytest.raises(ValueError):
+        compile_rules({"default": DEFAULT, "rules": [rule("bad", 1, when)]})
+
+
+def test_evaluate_one_matches_evaluate_on_the_shipped_rules():
+    rules = DiagnosisRules(Path(__file__).resolve().parent.parent / RULES_PATH)
+    frame = fleet()
+    labels = rules.evaluate(frame)
+    assert set(labels["rule"]) == set(rules.names) | {"default"}
+    for i in range(0, len(frame), 7):
+        row = frame.iloc[i]
+        latest = row.drop(["anomaly_score", "status"]).to_dict()
+        assert rules.evaluate_one(latest, row["anomaly_score"], row["status"]) == labels.iloc[i].to_dict()
+
+
+def test_rule_edits_go_live_and_broken_edits_keep_the_old_rules(tmp_path):
+    path = tmp_path / "rules.json"
+    table = {"default": DEFAULT, "rules": [rule("low_battery", 10, {"all": [cond("battery_voltage", "<", 12)]})]}
+    path.write_text(json.dumps(table))
+    rules = DiagnosisRules(path, check_interval=0.0)
+    assert rules.evaluate_one({"battery_voltage": 11.5}, 0.0, "")["rule"] == "low_battery"
+
+    table["rules"][0]["when"]["all"][0]["value"] = 11
+    path.write_text(json.dumps(table))
+    os.utime(path, (1, 1))  # a distinct mtime even on coarse filesystem clocks
+    assert rules.reload()
+    assert rules.evaluate_one({"battery_voltage": 11.5}, 0.0, "")["rule"] == "default"
+
+    path.write_text("{not json")
+    os.utime(path, (2, 2))
+    assert not rules.reload()
+    assert rules.evaluate_one({"battery_voltage": 10.5}, 0.0, "")["rule"] == "low_battery"
+
+
+def test_missing_rule_file_is_an_error(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        DiagnosisRules(tmp_path / "missing.json")
@@ -0,0 +1,127 @@
+import time
+import asyncio
+import threading
+from collections import Counter
+
+import pytest
+
+from utils.llm_cache import LLMCache
+from utils.llm_campaign import LLMCampaign
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__("rate limited")
+        self.response = type("Response", (), {"status_code": 429, "headers": {"retry-after": str(retry_after)}})()
+
+
+class Unavailable(Exception):
+    status_code = 503
+
+
+class FakeLLM:
+    """Async generate(prompt) with scripted failures and delays; records every call."""
+
+    def __init__(self, failures=None, delays=None):
+        self.failures = {prompt: list(errors) for prompt, errors in (failures or {}).items()}
+        self.delays = delays or {}
+        self.calls = Counter()
+        self.times = {}
+
+    async def __call__(self, prompt: str) -> str:
+        self.calls[prompt] += 1
+        self.times.setdefault(prompt, []).append(time.monotonic())
+        if self.failures.get(prompt):
+            raise self.failures[prompt].pop(0)
+        await asyncio.sleep(self.delays.get(prompt, 0))
+        return prompt.upper()
+
+
+def collect(campaign, items) -> list:
+    async def main():
+        return [result async for result in campaign.stream(items)]
+    return asyncio.run(main())
+
+
+def make_campaign(llm, **kwargs):
+    kwargs = {"concurrency": 4, "base_delay": 0.01, "max_delay": 0.05, "timeout": 5.0, **kwargs}
+    return LLMCampaign(llm, **kwargs)
+
+
+def test_identical_prompts_are_generated_once():
+    llm = FakeLLM()
+    results = collect(make_campaign(llm), [(1, "same", "fb"), (2, "same", "fb"), (3, "other", "fb")])
+    assert llm.calls == {"same": 1, "other": 1}
+    assert {r["id"]: r["text"] for r in results} == {1: "SAME", 2: "SAME", 3: "OTHER"}
+    assert {r["status"] for r in results} == {"generated"}
+
+
+def test_transient_errors_are_retried_with_backoff():
+    llm = FakeLLM(failures={"flaky": [Unavailable("503"), Unavailable("503")]})
+    campaign = make_campaign(llm)
+    [result] = collect(campaign, [("a", "flaky", "fallback")])
+    assert result["status"] == "generated"
+    assert result["attempts"] == 3
+    assert campaign.retries == 2
+    gaps = [b - a for a, b in zip(llm.times["flaky"], llm.times["flaky"][1:])]
+    assert all(gap >= 0.004 for gap in gaps)  # jittered base_delay * 2**n, at least half of 0.01
+
+
+def test_rate_limit_honors_retry_after_and_pauses_everyone():
+    llm = FakeLLM(failures={"limited": [RateLimited(0.2)]}, delays={"limited": 0, "late": 0})
+    campaign = make_campaign(llm, concurrency=1)
+    results = collect(campaign, [("a", "limited", "fb"), ("b", "late", "fb")])
+    assert {r["id"]: r["status"] for r in results} == {"a": "generated", "b": "generated"}
+    first_call = llm.times["limited"][0]
+    assert llm.times["limited"][1] - first_call >= 0.19
+    assert llm.times["late"][0] - first_call >= 0.19  # waited out the cool-down, too
+
+
+def test_permanent_errors_and_exhausted_retries_fall_back():
+    llm = FakeLLM(failures={"bad": [ValueError("nope")], "down": [Unavailable("503")] * 5})
+    campaign = make_campaign(llm, max_retries=2)
+    results = {r["id"]: r for r in collect(campaign, [("bad", "bad", "fb-bad"), ("down", "down", "fb-down")])}
+    assert results["bad"]["text"] == "fb-bad" and results["bad"]["attempts"] == 1
+    assert "ValueError" in results["bad"]["error"]
+    assert results["down"]["text"] == "fb-down" and results["down"]["attempts"] == 3
+    assert all(r["status"] == "fallback" for r in results.values())
+
+
+def test_results_stream_in_completion_order():
+    llm = FakeLLM(delays={"slow": 0.3, "fast": 0.0, "medium": 0.1})
+    results = collect(make_campaign(llm), [("s", "slow", ""), ("m", "medium", ""), ("f", "fast", "")])
+    assert [r["id"] for r in results] == ["f", "m", "s"]
+
+
+def test_cached_prompts_skip_the_llm(tmp_path):
+    cache = LLMCache(tmp_path / "cache.db")
+    params = {"model": "fake"}
+    cache.put(LLMCache.key("known", **params), "from cache")
+    llm = FakeLLM(delays={"new": 0.05})
+    campaign = make_campaign(llm, cache=cache, cache_params=params)
+    results = collect(campaign, [("k", "known", ""), ("n", "new", "")])
+    assert results[0] == {"id": "k", "text": "from cache", "status": "cached", "attempts": 0, "error": None}
+    assert llm.calls == {"new": 1}
+    assert cache.get(LLMCache.key("new", **params)) == "NEW"
+
+
+def test_iter_results_stops_the_pump_when_the_consumer_stops(tmp_path):
+    llm = FakeLLM(delays={"slow": 30})
+    campaign = make_campaign(llm, cache=LLMCache(tmp_path / "cache.db"))
+    started = time.monotonic()
+    for result in campaign.iter_results([("f", "fast", ""), ("s", "slow", "")]):
+        assert result["id"] == "f"
+        break
+    assert time.monotonic() - started < 5
+    assert not any(t.name == "llm-campaign" and t.is_alive() for t in threading.enumerate())
+
+
+def test_iter_results_raises_errors_from_the_pump():
+    def broken_items():
+        yield ("a", "x", "")
+        raise RuntimeError("bad items")
+
+    with pytest.raises(RuntimeError, match="bad items"):
+        list(make_campaign(FakeLLM()).iter_results(broken_items()))
@@ -0,0 +1,64 @@
+import copy
+import pandas as pd
+import pytest
+
+
+@pytest.fixture(scope="module")
+def report(tmp_path_factory):
+    from utils import scheduling_bench
+
+    return scheduling_bench.run(centers=6, times=3, days=3, vehicles=60, workers=4, duration=1.0,
+                                workdir=str(tmp_path_factory.mktemp("bench")))
+
+
+def test_run_is_safe(report):
+    assert report["double_bookings"] == 0
+    assert report["store_mismatches"] == 0
+    assert report["operations"]
+    assert sum(op["count"] for op in report["operations"].values()) > 0
+
+
+def test_compare_against_baseline(report):
+    from utils.scheduling_bench import compare
+
+    slower = copy.deepcopy(report)
+    for op in slower["operations"].values():
+        op["throughput_per_s"] /= 2
+        op["p95_ms"] *= 2
+    assert compare(report, slower, max_regression=0.2) == []
+
+    faster = copy.deepcopy(report)
+    for op in faster["operations"].values():
+        op["throughput_per_s"] *= 10
+    failures = compare(report, faster, max_regression=0.2)
+    assert len(failures) == len(report["operations"])
+    assert all("throughput" in f for f in failures)
+
+    unsafe = dict(report, double_bookings=1)
+    assert compare(unsafe, report, max_regression=0.2)
+
+
+
+def test_booking_outcomes_tell_conflicts_from_empty():
+    from utils.scheduling_bench import booking_outcome
+
+    assert booking_outcome({"status": "reserved", "slot_id": 7}) == "ok"
+    assert booking_outcome({"status": "error", "slot_id": 8, "message": "Slot no longer available"}) == "conflict"
+    assert booking_outcome({"status": "error", "message": "No emergency slots"}) == "empty"
+
+
+
+def test_bookings_outside_the_horizon_are_rejected(tmp_path):
+    from utils.scheduling_bench import make_agent
+
+    agent = make_agent({"workdir": str(tmp_path), "centers": 2, "times": 2, "days": 3, "seed": 0})
+    center = agent.calendar.centers[0]
+    time = agent.template.times[0]
+    for day in (agent.calendar.start - pd.Timedelta(days=1), agent.calendar.end + pd.Timedelta(days=1)):
+        slot_id = agent.template.slot_id(center, day, time)
+        booking = agent.book_appointment("Car A", slot_id, "Bench")
+        assert booking["status"] == "error" and booking["slot_id"] == slot_id
+        assert agent.slot_store.get(slot_id)["status"] == "available"
+    assert agent.book_appointment("Car A", 10**9, "Bench")["status"] == "error"
+    in_horizon = agent.template.slot_id(center, agent.calendar.start, time)
+    assert agent.book_appointment("Car A", in_horizon, "Bench")["status"] == "reserved"
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.slot_calendar import SlotCalendar
+from utils.slot_store import SlotStore
+from utils.slot_templates import SlotTemplate
+
+CENTERS = ["North", "South", "East"]
+START = "2025-12-15"  # a Monday
+
+
+class Recorder:
+    def __init__(self):
+        self.changes, self.rolls = [], 0
+
+    def on_change(self, centers, days, delta):
+        self.changes.extend(zip(centers.tolist(), days.tolist(), delta.tolist()))
+
+    def on_roll(self):
+        self.rolls += 1
+
+
+@pytest.fixture
+def template():
+    return SlotTemplate(CENTERS, closed_weekdays=[6])
+
+
+@pytest.fixture
+def store(tmp_path, template):
+    return SlotStore(tmp_path / "slots.db", template=template)
+
+
+def template_rows(template, center, days=7, reserve=None):
+    df = template.frame(START, days)
+    df = df[(df["center"] == center) & (df["status"] == "available")]
+    if reserve is not None:
+        df = df[df["is_high_risk_reserve"] == reserve]
+    return df.sort_values(["date", "time"])
+
+
+def test_bitmaps_match_the_template_rows(template):
+    calendar = SlotCalendar(template, START, 7)
+    for center in CENTERS:
+        for reserve in (None, True, False):
+            rows = template_rows(template, center, reserve=reserve)
+            assert calendar.count_available(center, reserve=reserve) == len(rows)
+            assert [s for s, _, _ in calendar.iter_free(center, reserve=reserve)] == rows["slot_id"].tolist()
+    sunday = calendar.day_of("2025-12-21")
+    assert not calendar.free[:, sunday].any()
+    assert calendar.counts(until="2025-12-15") == {c: len(template.times) for c in CENTERS}
+
+
+def test_time_and_day_masks(template):
+    calendar = SlotCalendar(template, START, 7)
+    afternoon = sum(1 << t for t, time in enumerate(calendar.times) if time >= "14:00")
+    tuesday = np.arange(7) == calendar.day_of("2025-12-16")
+    free = list(calendar.iter_free("East", times=afternoon, days=tuesday))
+    assert [(d.strftime("%Y-%m-%d"), t) for _, d, t in free] == [("2025-12-16", t) for t in ("14:00", "15:30", "16:30")]
+    assert calendar.earliest("Nowhere") is None
+
+
+def test_set_free_flips_one_bit_and_notifies(template):
+    calendar = SlotCalendar(template, START, 7)
+    recorder = Recorder()
+    calendar.listeners.append(recorder)
+    slot_id = template.slot_id("South", "2025-12-17", "10:30")
+    calendar.set_free(slot_id, False)
+    calendar.set_free(slot_id, False)  # no change, no event
+    assert not calendar.is_free(slot_id)
+    calendar.set_free(slot_id, True)
+    assert calendar.is_free(slot_id)
+    day = calendar.day_of("2025-12-17")
+    assert recorder.changes == [(1, day, 1), (1, day, -1)]
+
+
+def test_sync_follows_other_writers(template, store):
+    calendar = SlotCalendar.from_store(template, store, START, 7)
+    assert calendar.sync(store) is None
+    other = SlotStore(store.path, template=template)
+    booked = template.slot_id("North", "2025-12-16", "09:30")
+    released = template.slot_id("North", "2025-12-16", "10:30")
+    other.book_many([(booked, "Car A", "normal"), (released, "Car B", "normal")])
+    other.release(released)
+    changes = calendar.sync(store)
+    assert sorted(changes["slot_id"].unique()) == sorted([booked, released])
+    assert not calendar.is_free(booked) and calendar.is_free(released)
+    assert calendar.rev == store.max_rev()
+    assert calendar.sync(store) is None
+
+
+def test_from_store_overlays_stored_deviations(template, store):
+    booked = template.slot_id("East", "2025-12-19", "16:30")
+    store.book(booked, "Car A", "normal")
+    calendar = SlotCalendar.from_store(template, store, START, 7)
+    assert not calendar.is_free(booked)
+    assert calendar.count_available("East") == len(template_rows(template, "East")) - 1
+
+
+def test_roll_keeps_overlap_and_loads_new_days_from_the_store(template, store):
+    calendar = SlotCalendar.from_store(template, store, START, 7)
+    recorder = Recorder()
+    calendar.listeners.append(recorder)
+    kept = template.slot_id("North", "2025-12-20", "09:30")
+    calendar.set_free(kept, False)  # own booking not yet in the store
+    later = template.slot_id("South", "2025-12-23", "14:00")
+    store.book(later, "Car B", "normal")  # beyond the current horizon
+
+    calendar.roll("2025-12-18", store)
+    assert calendar.start == pd.Timestamp("2025-12-18") and calendar.days == 7
+    assert not calendar.is_free(kept)
+    assert not calendar.is_free(later)
+    assert not calendar.is_free(template.slot_id("North", "2025-12-16", "09:30"))  # dropped from the horizon
+    assert calendar.is_free(template.slot_id("North", "2025-12-24", "09:30"))
+    assert recorder.rolls == 1
+
+    calendar.roll("2025-12-18", store)  # same window: nothing to do
+    assert recorder.rolls == 1
@@ -0,0 +1,97 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from utils.slot_store import SlotStore
+from utils.slot_templates import SlotTemplate
+
+CENTERS = ["North", "South"]
+
+
+@pytest.fixture
+def template():
+    return SlotTemplate(CENTERS)
+
+
+@pytest.fixture
+def store(tmp_path, template):
+    return SlotStore(tmp_path / "slots.db", template=template)
+
+
+def test_unstored_slots_come_from_the_template(store, template):
+    slot_id = template.slot_id("South", "2025-12-16", "10:30")
+    assert store.is_empty()
+    assert store.get(slot_id) == template.describe(slot_id)
+    assert store.get(slot_id)["status"] == "available"
+
+
+def test_book_is_compare_and_set(store, template):
+    slot_id = template.slot_id("North", "2025-12-16", "09:30")
+    row = store.book(slot_id, "Car A", "normal")
+    assert row["status"] == "booked" and row["vehicle_name"] == "Car A"
+    assert store.book(slot_id, "Car B", "normal") is None
+    assert store.get(slot_id)["vehicle_name"] == "Car A"
+
+
+def test_racing_writers_get_exactly_one_winner(tmp_path, template):
+    path = tmp_path / "slots.db"
+    slot_id = template.slot_id("North", "2025-12-17", "14:00")
+    SlotStore(path, template=template)  # create the schema before the race
+    barrier = threading.Barrier(8)
+    results = {}
+
+    def claim(n):
+        store = SlotStore(path, template=template, timeout=10.0)  # own connection per writer
+        barrier.wait()
+        results[n] = store.book(slot_id, f"Car {n}", "normal")
+
+    threads = [threading.Thread(target=claim, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    winners = [n for n, row in results.items() if row is not None]
+    assert len(results) == 8 and len(winners) == 1
+    assert SlotStore(path, template=template).get(slot_id)["vehicle_name"] == f"Car {winners[0]}"
+
+
+def test_book_many_claims_what_is_free_in_one_revision(store, template):
+    taken = template.slot_id("North", "2025-12-16", "09:30")
+    store.book(taken, "Car A", "normal")
+    rev = store.max_rev()
+    free = [template.slot_id("South", "2025-12-16", t) for t in ("09:30", "10:30")]
+    rows = store.book_many([(taken, "Car B", "high"), (free[0], "Car C", "high"), (free[1], "Car D", "critical")])
+    assert rows[0] is None
+    assert [r["vehicle_name"] for r in rows[1:]] == ["Car C", "Car D"]
+    assert {r["rev"] for r in rows[1:]} == {rev + 1}
+    assert store.get(taken)["vehicle_name"] == "Car A"
+
+
+def test_release_and_changes_since(store, template):
+    first = template.slot_id("North", "2025-12-18", "15:30")
+    second = template.slot_id("South", "2025-12-18", "15:30")
+    store.book(first, "Car A", "normal")
+    rev = store.max_rev()
+    store.book(second, "Car B", "normal")
+    assert store.release(first)
+    assert not store.release(first)  # already available
+    changes = store.changes_since(rev)
+    assert changes["slot_id"].tolist() == [second, first]
+    assert changes["status"].tolist() == ["booked", "available"]
+    assert store.get(first)["vehicle_name"] is None
+
+
+def test_insert_many_leaves_existing_rows(store, template):
+    slot_id = template.slot_id("North", "2025-12-19", "16:30")
+    store.book(slot_id, "Car A", "normal")
+    row = dict(template.describe(slot_id), status="closed")
+    store.insert_many(pd.DataFrame([row]))
+    assert store.get(slot_id)["status"] == "booked"
+
+
+def test_release_leaves_closed_slots_closed(store, template):
+    slot_id = template.slot_id("South", "2025-12-19", "09:30")
+    store.book(slot_id, None, None, status="closed")
+    assert not store.release(slot_id)
+    assert store.get(slot_id)["status"] == "closed"
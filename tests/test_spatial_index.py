@@ -0,0 +1,50 @@
+import numpy as np
+
+from utils.spatial_index import CenterIndex, haversine_km
+
+CENTERS = {
+    "Andheri": [19.1136, 72.8697],
+    "Bandra": [19.0596, 72.8295],
+    "Colaba": [18.9067, 72.8147],
+    "Pune": [18.5204, 73.8567],
+    "Thane": [19.2183, 72.9781],
+}
+HOME = (19.0760, 72.8777)
+
+
+def brute_force(location):
+    km = {name: float(haversine_km(location[0], location[1], lat, lon)) for name, (lat, lon) in CENTERS.items()}
+    return sorted(km.items(), key=lambda c: c[1])
+
+
+def test_iter_nearest_matches_brute_force():
+    index = CenterIndex(CENTERS)
+    found = list(index.iter_nearest(HOME, batch=2))
+    assert [name for name, _ in found] == [name for name, _ in brute_force(HOME)]
+    assert np.allclose([km for _, km in found], [km for _, km in brute_force(HOME)])
+
+
+def test_nearest_with_radius_and_filter():
+    index = CenterIndex(CENTERS)
+    within = [name for name, km in brute_force(HOME) if km <= 20]
+    assert [name for name, _ in index.nearest(HOME, k=10, max_km=20)] == within
+    assert [name for name, _ in index.nearest(HOME, k=2, where=lambda c: c != "Bandra")] == \
+        [name for name, _ in brute_force(HOME) if name != "Bandra"][:2]
+
+
+def test_nearest_many_matches_single_queries():
+    index = CenterIndex(CENTERS)
+    points = [HOME, (18.52, 73.85), (19.2, 72.97)]
+    idx, km = index.nearest_many(points, k=3)
+    assert idx.shape == km.shape == (3, 3)
+    for row, point in enumerate(points):
+        assert list(index.names[idx[row]]) == [name for name, _ in brute_force(point)[:3]]
+        assert np.all(np.diff(km[row]) >= 0)
+
+
+def test_empty_index_returns_nothing():
+    index = CenterIndex({})
+    assert len(index) == 0
+    assert list(index.iter_nearest(HOME)) == []
+    idx, km = index.nearest_many([HOME, HOME], k=4)
+    assert idx.shape == km.shape == (2, 0)
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.telematics_engine import CLOCK_EPOCH, IngestState, parse_timestamps, parse_values, parse_vehicle_ids
+
+
+def row_parser(value):
+    """The per-row parser parse_values replaced."""
+    val = str(value).strip()
+    if "," in val:
+        return 0
+    try:
+        return float(val)
+    except Exception:
+        return 0
+
+
+FORMATS = [
+    "12.6", " 12.6 ", "-0.5", "+3", "1.", ".5", "1e3", "1E-2",  # plain numbers
+    "1_000", "٣",  # float() accepts these, pd.to_numeric does not
+    "inf", "-inf", "Infinity", "nan", "NaN", "-nan",  # special values
+    "", "abc", "0x10", "OFF", "1,2", "19.07,72.87",  # junk and comma lists become 0
+]
+
+
+@pytest.mark.parametrize("value", FORMATS)
+def test_parse_values_accepts_what_float_accepts(value):
+    expected = row_parser(value)
+    [parsed] = parse_values(pd.Series([value], dtype=object))
+    assert parsed == expected or (np.isnan(parsed) and np.isnan(expected))
+
+
+def test_parse_values_batch_and_missing():
+    values = pd.Series(FORMATS + [None, np.nan], dtype=object)
+    parsed = parse_values(values)
+    expected = np.array([row_parser(v) for v in FORMATS] + [np.nan, np.nan])
+    np.testing.assert_array_equal(parsed, expected)  # NaN == NaN here; a real None stays missing
+
+
+def test_parse_values_numeric_column_is_copied():
+    values = pd.Series([1.0, 2.0, np.nan])
+    parsed = parse_values(values)
+    parsed[0] = 5.0
+    assert values[0] == 1.0
+
+
+def test_parse_timestamps_dates_clock_rows_across_chunks():
+    state = IngestState()
+    first = parse_timestamps(pd.Series(["23:50", "23:55", "23:54"]), state)  # interleaved devices, same day
+    second = parse_timestamps(pd.Series(["00:05", "2022-03-01 10:00", "junk"]), state)  # midnight wrap
+    day = np.timedelta64(1, "D")
+    assert list(first - CLOCK_EPOCH) == [np.timedelta64(23 * 60 + m, "m") for m in (50, 55, 54)]
+    assert second[0] == CLOCK_EPOCH + day + np.timedelta64(5, "m")
+    assert second[1] == np.datetime64("2022-03-01T10:00", "ns")
+    assert np.isnat(second[2])
+    assert state.clock_day == 1
+
+
+def test_parse_vehicle_ids_drops_non_integers():
+    ids = parse_vehicle_ids(pd.Series(["101", "7", "101.5", "car", None, "inf"]))
+    np.testing.assert_array_equal(ids, [101, 7, np.nan, np.nan, np.nan, np.nan])
@@ -0,0 +1,106 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import IsolationForest
+
+from models.diagnosis_rules import RULES_PATH, DiagnosisRules
+from utils.telematics_engine import TELEMATICS_FEATURES
+from utils.telematics_index import TelematicsIndex
+from utils.telematics_stream import QueueSource, StreamMonitor
+
+VEHICLES = {101: "Car A", 102: "Car B"}
+
+
+class Directory:
+    status_by_id = {vid: "Active" for vid in VEHICLES}
+
+    def resolve(self, vehicle):
+        if str(vehicle).isdigit():
+            return int(vehicle)
+        return {name: vid for vid, name in VEHICLES.items()}.get(vehicle)
+
+
+class Agent:
+    """What StreamMonitor uses of DiagnosisAgent: directory, index, label_history, diagnose_many."""
+
+    def __init__(self):
+        self.directory = Directory()
+        self.index = TelematicsIndex()
+        self.rules = DiagnosisRules(Path(__file__).resolve().parent.parent / RULES_PATH)
+        rng = np.random.default_rng(0)
+        normal = np.column_stack([rng.normal(43, 1, 500), rng.integers(0, 2, 500), np.zeros(500), np.ones(500), rng.uniform(0, 0.5, 500)])
+        self.forest = IsolationForest(n_estimators=20, random_state=0).fit(normal)
+
+    def label_history(self, frame):
+        scores = self.forest.decision_function(frame[TELEMATICS_FEATURES].to_numpy())  # raises on NaN, like the agent
+        labels = self.rules.evaluate(frame[TELEMATICS_FEATURES].assign(anomaly_score=scores, status="Active"))
+        return frame.assign(anomaly_score=scores, risk_level=labels["risk"].to_numpy(),
+                            predicted_failure=labels["failure_type"].to_numpy(),
+                            urgency=labels["urgency"].to_numpy(), rule=labels["rule"].to_numpy())
+
+    def diagnose_many(self):
+        return pd.DataFrame({"vehicle_id": list(VEHICLES), "risk_level": ["low"] * len(VEHICLES)})
+
+
+@pytest.fixture
+def monitor():
+    return StreamMonitor(Agent(), QueueSource())
+
+
+def raw(variable, value, vehicle_id=101, alarm=0):
+    return {"vehicle_id": vehicle_id, "variable": variable, "value": value, "alarmClass": alarm}
+
+
+def latest(monitor, vid=101):
+    _, values = monitor.agent.index.window_of(vid, 1)
+    return dict(zip(TELEMATICS_FEATURES, values[-1]))
+
+
+def test_towing_without_ignition_is_a_risk_change(monitor):
+    changes = monitor.process([raw("IGNITION_STATUS", 0), raw("TOWING", 1)])
+    assert [c["risk_level"] for c in changes] == ["critical"]
+    assert changes[0]["rule"] == "towing_without_ignition"
+
+
+@pytest.mark.parametrize("value", [None, "", float("nan"), "nan", float("inf")])
+def test_unusable_raw_values_keep_the_previous_state(monitor, value):
+    monitor.process([raw("TOWING", 1), raw("IGNITION_STATUS", 1), raw("INTERNAL BATTERY", 40)])
+    before = latest(monitor)
+    for variable in ("TOWING", "IGNITION_STATUS", "INTERNAL BATTERY"):
+        monitor.process([raw(variable, value)])
+        assert latest(monitor) == before
+    assert all(np.isfinite(monitor.agent.index.window_of(101)[1]).ravel())
+
+
+def test_a_null_event_does_not_poison_later_batches(monitor):
+    monitor.process([raw("TOWING", None), raw("IGNITION_STATUS", None, vehicle_id=102)])
+    changes = monitor.process([raw("IGNITION_STATUS", 0), raw("TOWING", 1)])
+    assert [c["risk_level"] for c in changes] == ["critical"]
+    assert monitor.processed == 4
+
+
+def test_malformed_events_are_rejected_one_by_one(monitor):
+    standardized = {"vehicle_id": 102, **{f: 1.0 for f in TELEMATICS_FEATURES}}
+    events = [
+        {**standardized, "battery_voltage": "twelve"},  # not a number
+        {**standardized, "alarm_level": None},  # incomplete, dropped like the batch dropna
+        raw("TOWING", 1, alarm="high"),
+        raw("TOWING", 1, vehicle_id={"id": 101}),
+        {**standardized, "timestamp": [1, 2]},
+        "not an event",
+        {**standardized, "battery_voltage": 42.0, "timestamp": "2025-01-01T10:00:00Z"},
+        raw("INTERNAL BATTERY", 48),
+    ]
+    monitor.process(events)
+    assert monitor.rejected == 6
+    assert monitor.processed == 2
+    assert latest(monitor, 102)["battery_voltage"] == 42.0
+    assert monitor.agent.index.window_of(102)[0][-1] == np.datetime64("2025-01-01T10:00")
+    assert latest(monitor, 101)["battery_voltage"] == (48 + 36) / 2
+
+
+def test_unknown_vehicles_are_skipped_without_counting_as_rejected(monitor):
+    assert monitor.process([raw("TOWING", 1, vehicle_id="Car Z")]) == []
+    assert monitor.rejected == 0 and monitor.processed == 0
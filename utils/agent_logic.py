@@ -55,13 +55,11 @@ def log_event(
         'date': date,
         'center': center
     }
-    try:
-        logs = pd.read_csv(path)
-    except FileNotFoundError:
-        logs = pd.DataFrame()
-    
-    logs = pd.concat([logs, pd.DataFrame([row])], ignore_index=True)
+    # Append one line instead of reading and rewriting the whole log
     os.makedirs(os.path.dirname(path), exist_ok=True)  # Ensure directory exists
-    logs.to_csv(path, index=False)
-    return logs
-
+    new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+    entry = pd.DataFrame([row])
+    if not new_file:
+        entry = entry.reindex(columns=pd.read_csv(path, nrows=0).columns)  # keep the file's column order
+    entry.to_csv(path, mode="a", header=new_file, index=False)
+    return entry
@@ -0,0 +1,97 @@
+import threading
+import numpy as np
+import pandas as pd
+
+LOAD_WEIGHT_KM = 5.0  # a fully booked center ranks like one this much further away
+LOAD_WEIGHT_QUEUE_KM = 3.0  # a center whose next queue_days are fully booked ranks like one this much further away
+LOAD_WEIGHT_DAYS = 2.0  # a fully booked day ranks like one this many days later
+MAX_LOAD_PENALTY_KM = LOAD_WEIGHT_KM + LOAD_WEIGHT_QUEUE_KM
+
+
+class CenterStats:
+    """Per-center, per-day load of the slot horizon, kept up to date incrementally.
+
+    Counts are built once from the calendar bitmaps (and again when the horizon
+    rolls); after that every free/taken transition the calendar applies, own
+    bookings or changes synced from other writers, arrives through `on_change`
+    as a +1/-1 delta. Utilization and queue length are therefore O(days) reads,
+    never a scan of the slot table.
+    """
+
+    def __init__(self, calendar, queue_days: int = 2):
+        self.calendar = calendar
+        self.queue_days = queue_days
+        self._lock = threading.Lock()
+        self.rebuild()
+        calendar.listeners.append(self)
+
+    def rebuild(self):
+        calendar = self.calendar
+        template_free, _ = calendar.template.bitmaps(calendar.first_day, calendar.days)
+        capacity = np.bitwise_count(template_free).astype(np.int32)
+        with self._lock:
+            self.capacity = capacity
+            self.taken = capacity - np.bitwise_count(calendar.free & template_free).astype(np.int32)
+            self._center_pos = {c: i for i, c in enumerate(calendar.centers)}
+
+    # ---------- calendar events ----------
+    def on_change(self, centers, days, delta):
+        with self._lock:
+            np.add.at(self.taken, (centers, days), delta)
+            # a slot outside the template (e.g. on a closed weekday) opening up is -1 with
+            # nothing taken to subtract from; never count below zero
+            self.taken[centers, days] = np.maximum(self.taken[centers, days], 0)
+
+    def on_roll(self):
+        self.rebuild()
+
+    # ---------- reads ----------
+    def _days(self, until):
+        return self.calendar.days if until is None else max(0, min(self.calendar.days, self.calendar.day_of(until) + 1))
+
+    def utilization(self, center: str, until=None) -> float:
+        """Share of the center's slots up to `until` that are taken (booked or closed)."""
+        c, d = self._center_pos.get(center), self._days(until)
+        if c is None:
+            return 0.0
+        capacity = int(self.capacity[c, :d].sum())
+        return float(self.taken[c, :d].sum()) / capacity if capacity else 1.0
+
+    def queue_length(self, center: str) -> int:
+        """Bookings waiting at the center over the next `queue_days` days."""
+        c = self._center_pos.get(center)
+        return 0 if c is None else int(self.taken[c, :self.queue_days].sum())
+
+    def queue_share(self, center: str) -> float:
+        """queue_length as a share of the center's slots over the next `queue_days` days."""
+        c = self._center_pos.get(center)
+        if c is None:
+            return 0.0
+        capacity = int(self.capacity[c, :self.queue_days].sum())
+        return min(1.0, self.queue_length(center) / capacity) if capacity else 1.0
+
+    def load_penalty_km(self, center: str, until=None) -> float:
+        """Ranking penalty for a busy center, in km: utilization up to `until` plus how
+        crowded its next days already are. At most MAX_LOAD_PENALTY_KM."""
+        return LOAD_WEIGHT_KM * min(1.0, self.utilization(center, until)) + LOAD_WEIGHT_QUEUE_KM * self.queue_share(center)
+
+    def day_load(self, center: str, until=None) -> np.ndarray:
+        """Per-day utilization of the center from the horizon start."""
+        c, d = self._center_pos.get(center), self._days(until)
+        if c is None:
+            return np.zeros(d)
+        capacity = self.capacity[c, :d]
+        return np.divide(self.taken[c, :d], capacity, out=np.ones(d), where=capacity > 0)
+
+    def snapshot(self, until=None) -> pd.DataFrame:
+        """One row per center for dashboards."""
+        d = self._days(until)
+        capacity = self.capacity[:, :d].sum(axis=1)
+        taken = self.taken[:, :d].sum(axis=1)
+        return pd.DataFrame({
+            "center": self.calendar.centers,
+            "capacity": capacity,
+            "taken": taken,
+            "utilization": np.divide(taken, capacity, out=np.ones(len(capacity)), where=capacity > 0),
+            "queue_length": self.taken[:, :self.queue_days].sum(axis=1),
+        }).sort_values("utilization", ascending=False, ignore_index=True)
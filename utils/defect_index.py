@@ -0,0 +1,62 @@
+import os
+import time
+import threading
+import pandas as pd
+from pathlib import Path
+
+DEFECTS_PATH = os.path.join("data", "defects.csv")
+
+
+class DefectIndex:
+    """Latest defect per vehicle, precomputed from defects.csv.
+
+    The file is sorted once per load and reduced to one record per vehicle, so
+    `latest(vehicle_name)` is a dict lookup. It is re-read when its mtime
+    changes (checked at most every `check_interval` seconds).
+    """
+
+    def __init__(self, path: str = DEFECTS_PATH, check_interval: float = 1.0):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self.frame = pd.DataFrame()
+        self._latest = {}
+        self.reload(force=True)
+
+    def reload(self, force: bool = False) -> bool:
+        """Re-read the defects file if it changed; returns True when the index was rebuilt."""
+        if not force and time.monotonic() - self._checked_at < self.check_interval:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._checked_at < self.check_interval:
+                return False  # another caller just checked
+            self._checked_at = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                mtime = None
+            if not force and mtime == self._mtime:
+                return False
+
+            frame = pd.read_csv(self.path) if mtime is not None else pd.DataFrame()
+            latest = {}
+            if not frame.empty:
+                newest_first = frame.sort_values("reported_date", ascending=False, kind="stable")
+                latest = {row["vehicle_name"]: row for row in newest_first.drop_duplicates("vehicle_name").to_dict("records")}
+            self.frame, self._latest, self._mtime = frame, latest, mtime
+        return True
+
+    def latest(self, vehicle_name: str) -> dict | None:
+        self.reload()
+        defect = self._latest.get(vehicle_name)
+        return dict(defect) if defect is not None else None
+
+    def __len__(self):
+        return len(self._latest)
+
+
+# Global instance
+defect_index = DefectIndex()
@@ -0,0 +1,210 @@
+import json
+import time
+import sqlite3
+import threading
+import traceback
+import pandas as pd
+from pathlib import Path
+
+JOBS_DB_PATH = "data/jobs.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id);
+"""
+
+
+class JobQueue:
+    """Durable background-job queue in SQLite, worked by a few daemon threads.
+
+    Used to take slow follow-up work (diagnosis, notifications) off the request
+    path: callers `submit` and return, handlers registered per job kind run in
+    the background. Jobs are rows (queued → running → done/failed, retried up to
+    `max_attempts`), so they survive restarts and can be inspected from any
+    process with `jobs()` / `stats()`. Idle workers regularly put jobs that have
+    been running longer than `stale_after` (their process died) back in the
+    queue, so `stale_after` must exceed the longest handler run.
+    """
+
+    def __init__(self, path: str = JOBS_DB_PATH, workers: int = 2, max_attempts: int = 3,
+                 poll_interval: float = 0.5, stale_after: float = 300):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self._handlers = {}
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._started = False
+        self._start_lock = threading.Lock()
+        self._next_sweep = 0.0
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ---------- producers ----------
+    def register(self, kind: str, handler):
+        """Run `handler(payload) -> result` for jobs of `kind`; starts the workers.
+        Registering the same handler again is a no-op."""
+        if self._handlers.get(kind) is handler:
+            return
+        self._handlers[kind] = handler
+        self.start()
+
+    def submit(self, kind: str, payload: dict) -> int:
+        cur = self._conn().execute(
+            "INSERT INTO jobs (kind, payload, created_at) VALUES (?, ?, ?)",
+            (kind, json.dumps(payload, default=str), time.time()),
+        )
+        self._wakeup.set()
+        return cur.lastrowid
+
+    # ---------- inspection ----------
+    def get(self, job_id: int) -> dict | None:
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (int(job_id),)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def jobs(self, status: str | None = None, kind: str | None = None, limit: int = 100) -> pd.DataFrame:
+        """Most recent jobs, newest first."""
+        sql, params = "SELECT * FROM jobs WHERE 1 = 1", []
+        if status:
+            sql += " AND status = ?"
+            params.append(status)
+        if kind:
+            sql += " AND kind = ?"
+            params.append(kind)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(int(limit))
+        return pd.read_sql_query(sql, self._conn(), params=params)
+
+    def stats(self) -> dict:
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def wait(self, job_id: int, timeout: float = 30.0) -> dict | None:
+        """Block until the job is done or failed (for callers that need the result after all)."""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            job = self.get(job_id)
+            if job is None or job["status"] in ("done", "failed"):
+                return job
+            time.sleep(0.02)
+        return self.get(job_id)
+
+    # ---------- workers ----------
+    def start(self):
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+        for n in range(self.workers):
+            threading.Thread(target=self._work, name=f"job-worker-{n}", daemon=True).start()
+
+    def requeue_stale(self) -> int:
+        """Jobs left 'running' by a process that died go back to the queue (or fail
+        once they used up their attempts). Returns how many were touched."""
+        return self._conn().execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+            "error = COALESCE(error, 'worker died') WHERE status = 'running' AND started_at < ?",
+            (self.max_attempts, time.time() - self.stale_after),
+        ).rowcount
+
+    def _sweep(self):
+        now = time.monotonic()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.stale_after / 2
+        if self.requeue_stale():
+            self._wakeup.set()
+
+    def _claim(self) -> sqlite3.Row | None:
+        conn = self._conn()
+        kinds = list(self._handlers)
+        if not kinds:
+            return None
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                f"SELECT * FROM jobs WHERE status = 'queued' AND kind IN ({', '.join('?' * len(kinds))}) ORDER BY id LIMIT 1",
+                kinds,
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ? WHERE id = ?",
+                    (time.time(), row["id"]),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return row
+
+    def _work(self):
+        while True:
+            try:
+                self._sweep()
+                job = self._claim()
+            except sqlite3.OperationalError as e:
+                print(f"⚠️ Job queue busy: {e}")
+                job = None
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._run(job)
+
+    def _run(self, job):
+        conn = self._conn()
+        try:
+            result = self._handlers[job["kind"]](json.loads(job["payload"]))
+            conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, finished_at = ? WHERE id = ?",
+                (json.dumps(result, default=str), time.time(), job["id"]),
+            )
+        except Exception as e:
+            retry = job["attempts"] + 1 < self.max_attempts
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                ("queued" if retry else "failed", "".join(traceback.format_exception_only(e)).strip(), time.time(), job["id"]),
+            )
+            print(f"⚠️ Job {job['id']} ({job['kind']}) failed{', will retry' if retry else ''}: {e}")
+
+
+_shared_queue = None
+_shared_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Process-wide JobQueue, created (with data/jobs.db) on first use rather than at import."""
+    global _shared_queue
+    if _shared_queue is None:
+        with _shared_lock:
+            if _shared_queue is None:
+                _shared_queue = JobQueue()
+    return _shared_queue
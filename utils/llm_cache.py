@@ -0,0 +1,162 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+
+LLM_CACHE_PATH = "data/llm_cache.db"
+LLM_CACHE_TTL = 7 * 24 * 3600  # seconds
+LLM_CACHE_MAX_ENTRIES = 20_000
+TOUCH_BATCH = 100  # hits are written back in batches of this many keys ...
+TOUCH_INTERVAL = 60.0  # ... or at least this often (seconds)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used);
+CREATE INDEX IF NOT EXISTS idx_responses_created ON responses (created_at);
+"""
+
+
+class LLMCache:
+    """Disk-backed LLM response cache shared by every process on the machine.
+
+    Entries are content-addressed: the key is a SHA-256 of the rendered prompt
+    plus the model parameters, so anything that changes the prompt (a new
+    defect, another customer name, an edited template) is simply a different
+    key and old answers never have to be invalidated by hand. Entries expire
+    after `ttl` seconds; past `max_entries` the least recently used go first.
+    Hits only update `last_used`/`hits` in memory; those are written back in
+    one statement per batch, so a cache hit is a single indexed SELECT.
+    SQLite in WAL mode, one connection per thread, like the slot store.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._puts = 0
+        self._touch_lock = threading.Lock()
+        self._touched = {}  # key -> [last_used, hits] not yet written back
+        self._flushed_at = time.monotonic()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Write back pending hits and close the calling thread's connection (e.g. before a worker thread exits)."""
+        self.flush()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @staticmethod
+    def key(prompt: str, **params) -> str:
+        """Hash of the prompt and model parameters (model, temperature, ...)."""
+        payload = json.dumps({"prompt": prompt, "params": params}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] < now - self.ttl:
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            return None
+        self._touch(key, now)
+        return row[0]
+
+    def _touch(self, key: str, now: float):
+        with self._touch_lock:
+            touched = self._touched.setdefault(key, [now, 0])
+            touched[0] = now
+            touched[1] += 1
+            due = len(self._touched) >= TOUCH_BATCH or time.monotonic() - self._flushed_at >= TOUCH_INTERVAL
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write pending hit counts and last-used times back to the database."""
+        with self._touch_lock:
+            touched, self._touched = self._touched, {}
+            self._flushed_at = time.monotonic()
+        if touched:
+            self._conn().executemany(
+                "UPDATE responses SET last_used = MAX(last_used, ?), hits = hits + ? WHERE key = ?",
+                [(last_used, hits, key) for key, (last_used, hits) in touched.items()],
+            )
+
+    def put(self, key: str, response: str, model: str | None = None):
+        now = time.time()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO responses (key, model, response, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+            (key, model, response, now, now),
+        )
+        self._puts += 1
+        if self._puts % 100 == 1:  # eviction is a couple of indexed deletes; no need on every write
+            self.evict()
+
+    def get_or_call(self, prompt: str, call, **params) -> str:
+        """Cached response for `prompt`, else `call(prompt)` stored under it. Exceptions are not cached."""
+        key = self.key(prompt, **params)
+        response = self.get(key)
+        if response is None:
+            response = call(prompt)
+            self.put(key, response, params.get("model"))
+        return response
+
+    # ---------- maintenance ----------
+    def evict(self) -> int:
+        """Drop expired entries, then the least recently used beyond `max_entries`."""
+        self.flush()
+        conn = self._conn()
+        removed = conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,)).rowcount
+        excess = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+        if excess > 0:
+            removed += conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)", (excess,)
+            ).rowcount
+        return removed
+
+    def stats(self) -> dict:
+        self.flush()
+        entries, hits = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM responses").fetchone()
+        return {"entries": entries, "hits": hits}
+
+    def clear(self):
+        with self._touch_lock:
+            self._touched = {}
+        self._conn().execute("DELETE FROM responses")
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """Process-wide LLMCache; the db file is only created on first use."""
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_lock:
+            if _shared_cache is None:
+                _shared_cache = LLMCache()
+    return _shared_cache
@@ -0,0 +1,173 @@
+import time
+import queue
+import random
+import asyncio
+import threading
+
+from utils.llm_cache import LLMCache
+
+TRANSIENT_STATUS = {408, 409, 429, 500, 502, 503, 504}
+TRANSIENT_ERRORS = {"APIConnectionError", "APITimeoutError", "InternalServerError", "RateLimitError"}
+_DONE = object()
+
+
+def _status_code(error):
+    return getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+
+
+def _retry_after(error) -> float | None:
+    """Seconds the server asked us to wait (Retry-After header), if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_rate_limited(error) -> bool:
+    return _status_code(error) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def is_transient(error) -> bool:
+    return (
+        isinstance(error, (asyncio.TimeoutError, ConnectionError))
+        or _status_code(error) in TRANSIENT_STATUS
+        or type(error).__name__ in TRANSIENT_ERRORS
+    )
+
+
+def chat_model_generator(model):
+    """Async `generate(prompt)` for a LangChain chat model (uses its pooled async client).
+    Point OPENAI_BASE_URL at a local fake endpoint to exercise a campaign without the real API."""
+    async def generate(prompt: str) -> str:
+        return (await model.ainvoke(prompt)).content.strip()
+    return generate
+
+
+class LLMCampaign:
+    """Generate LLM messages for many recipients with bounded concurrency.
+
+    Items are (item_id, prompt, fallback). Identical prompts are generated once
+    and fanned out to every item that rendered them; prompts already in the
+    LLMCache are answered without a call. At most `concurrency` requests are in
+    flight. Transient failures are retried with jittered exponential backoff;
+    a rate limit (HTTP 429, honoring Retry-After) also pauses every worker
+    until the cool-down ends, so the campaign slows down instead of hammering
+    the API. Items that still fail get their fallback text. Results stream
+    back as they finish: `stream` for asyncio callers, `iter_results` / `run`
+    for everyone else.
+    """
+
+    def __init__(self, generate, concurrency: int = 16, max_retries: int = 5, base_delay: float = 1.0,
+                 max_delay: float = 60.0, timeout: float = 60.0, cache: LLMCache | None = None, cache_params: dict | None = None):
+        self.generate = generate
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.cache = cache
+        self.cache_params = cache_params or {}
+        self._cooldown_until = 0.0
+        self.calls = self.retries = 0
+
+    async def stream(self, items):
+        """Async generator of result dicts: id, text, status (cached / generated / fallback),
+        attempts and error, in completion order."""
+        groups = {}
+        for item_id, prompt, fallback in items:
+            key = LLMCache.key(prompt, **self.cache_params)
+            group = groups.setdefault(key, {"prompt": prompt, "fallback": fallback, "ids": []})
+            group["ids"].append(item_id)
+
+        pending = []
+        for key, group in groups.items():
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is not None:
+                for item_id in group["ids"]:
+                    yield {"id": item_id, "text": cached, "status": "cached", "attempts": 0, "error": None}
+            else:
+                pending.append((key, group))
+
+        self._cooldown_until = 0.0
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = [asyncio.create_task(self._generate_one(key, group, semaphore)) for key, group in pending]
+        for done in asyncio.as_completed(tasks):
+            key, text, status, attempts, error = await done
+            for item_id in groups[key]["ids"]:
+                yield {"id": item_id, "text": text, "status": status, "attempts": attempts, "error": error}
+
+    async def _generate_one(self, key, group, semaphore):
+        loop = asyncio.get_running_loop()
+        async with semaphore:
+            for attempt in range(1, self.max_retries + 2):
+                wait = self._cooldown_until - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self.calls += 1
+                try:
+                    text = await asyncio.wait_for(self.generate(group["prompt"]), self.timeout)
+                except Exception as e:
+                    if attempt > self.max_retries or not is_transient(e):
+                        return key, group["fallback"], "fallback", attempt, f"{type(e).__name__}: {e}"
+                    delay = _retry_after(e) or min(self.max_delay, self.base_delay * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+                    if is_rate_limited(e):
+                        self._cooldown_until = max(self._cooldown_until, loop.time() + delay)
+                    self.retries += 1
+                    await asyncio.sleep(delay)
+                    continue
+                if self.cache is not None:
+                    self.cache.put(key, text, self.cache_params.get("model"))
+                return key, text, "generated", attempt, None
+
+    # ---------- sync callers ----------
+    def iter_results(self, items):
+        """Blocking iterator over `stream`, which runs on its own event loop thread.
+        Stopping early (break / close()) cancels the outstanding requests and ends that thread."""
+        results = queue.Queue()
+        ready = threading.Event()
+        runner = {}
+
+        def pump():
+            async def main():
+                runner["loop"], runner["task"] = asyncio.get_running_loop(), asyncio.current_task()
+                ready.set()
+                async for result in self.stream(items):
+                    results.put(result)
+            try:
+                asyncio.run(main())
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                results.put(e)
+            finally:
+                ready.set()
+                if self.cache is not None:
+                    self.cache.close()  # the pump thread's own connection
+                results.put(_DONE)
+
+        thread = threading.Thread(target=pump, name="llm-campaign", daemon=True)
+        thread.start()
+        try:
+            while (result := results.get()) is not _DONE:
+                if isinstance(result, Exception):
+                    raise result
+                yield result
+        finally:
+            if thread.is_alive():
+                ready.wait()
+                try:
+                    runner["loop"].call_soon_threadsafe(runner["task"].cancel)
+                except (KeyError, RuntimeError):  # never started / loop already closed
+                    pass
+                thread.join()
+
+    def run(self, items) -> list:
+        started = time.perf_counter()
+        results = list(self.iter_results(items))
+        counts = {}
+        for r in results:
+            counts[r["status"]] = counts.get(r["status"], 0) + 1
+        print(f"✅ Campaign: {len(results)} messages in {time.perf_counter() - started:.1f}s "
+              f"({self.calls} LLM calls, {self.retries} retries) {counts}")
+        return results
@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import threading
+from pathlib import Path
+
+from utils.file_lock import file_lock
+from utils.llm_campaign import LLMCampaign
+
+TEMPLATES_PATH = "data/message_templates.json"
+TEMPLATE_VERSION = 1  # bump when the template prompt changes; older templates stay in the file but are not used
+DEFAULT_TONE = "friendly"
+PLACEHOLDERS = ("{customer_name}", "{vehicle_name}")
+RETRY_AFTER = 300.0  # seconds before a class whose generation failed is tried again (doubles per failure)
+MAX_RETRY_AFTER = 6 * 3600.0
+
+
+def template_prompt(defect_type: str, severity: str, tone: str = DEFAULT_TONE) -> str:
+    return f"""
+You are a professional service advisor writing a reusable outreach message template.
+
+Issue detected:
+• Type: {defect_type}
+• Severity: {severity}
+
+Write a short (3–4 sentences), {tone}, specific message that:
+- Greets the customer as {{customer_name}}
+- Refers to the car as {{vehicle_name}}
+- Explains the issue simply
+- Mentions urgency that fits the severity
+- Offers to schedule service immediately
+
+Keep {{customer_name}} and {{vehicle_name}} exactly as written; they are filled in later. Return only the message.
+"""
+
+
+def fill(template: str, customer_name: str, vehicle_name: str) -> str:
+    """Per-customer message from a template: two string replaces."""
+    return template.replace("{customer_name}", str(customer_name)).replace("{vehicle_name}", str(vehicle_name))
+
+
+class MessageTemplates:
+    """LLM-written message templates per (defect_type, severity, tone).
+
+    Outreach messages only differ by customer name, vehicle name and the
+    defect class, so the LLM writes one template per class (with
+    {customer_name}/{vehicle_name} placeholders) and every customer's message
+    is filled locally. Templates live in a JSON file, one entry per class and
+    TEMPLATE_VERSION, so they survive restarts, can be reviewed or hand-edited,
+    and are re-read when the file changes. `ensure` generates a missing
+    template once per process even under concurrent callers; `prefetch` does
+    all missing classes of a campaign in parallel.
+    """
+
+    def __init__(self, path: str = TEMPLATES_PATH, check_interval: float = 1.0):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._mtime = None
+        self._checked_at = 0.0
+        self._entries = {}
+        self.failures = {}  # key -> {"attempts", "retry_at", "error"}
+        self.reload(force=True)
+
+    @staticmethod
+    def key(defect_type: str, severity: str, tone: str = DEFAULT_TONE, version: int = TEMPLATE_VERSION) -> str:
+        return f"{str(defect_type).strip().lower()}|{str(severity).strip().lower()}|{tone}|v{version}"
+
+    # ---------- storage ----------
+    def reload(self, force: bool = False) -> bool:
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if not force and mtime == self._mtime:
+            return False
+        try:
+            with open(self.path) as fh:
+                entries = json.load(fh)
+        except ValueError as e:
+            print(f"⚠️ Invalid templates in {self.path}: {e}; keeping previous templates")
+            return False
+        finally:
+            self._mtime = mtime
+        self._entries = entries
+        return True
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w") as fh:
+            json.dump(self._entries, fh, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+        self._mtime = os.path.getmtime(self.path)
+
+    def get(self, defect_type: str, severity: str, tone: str = DEFAULT_TONE) -> str | None:
+        self.reload()
+        entry = self._entries.get(self.key(defect_type, severity, tone))
+        return entry["template"] if entry else None
+
+    def put(self, defect_type: str, severity: str, tone: str, template: str, model: str | None = None) -> bool:
+        """Store a template; rejected (False) unless it keeps both placeholders."""
+        template = template.strip()
+        if not all(p in template for p in PLACEHOLDERS):
+            return False
+        with self._lock, file_lock(self.path.with_name(self.path.name + ".lock")):
+            self.reload(force=True)  # merge with what other processes wrote
+            self._entries[self.key(defect_type, severity, tone)] = {
+                "defect_type": defect_type, "severity": severity, "tone": tone, "version": TEMPLATE_VERSION,
+                "template": template, "model": model, "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            self._save()
+        return True
+
+    # ---------- generation ----------
+    def _cooling_down(self, key: str) -> bool:
+        failure = self.failures.get(key)
+        return failure is not None and time.monotonic() < failure["retry_at"]
+
+    def _failed(self, key: str, error: str):
+        with self._lock:
+            attempts = self.failures.get(key, {}).get("attempts", 0) + 1
+            wait = min(MAX_RETRY_AFTER, RETRY_AFTER * 2 ** (attempts - 1))
+            self.failures[key] = {"attempts": attempts, "retry_at": time.monotonic() + wait, "error": error}
+        print(f"⚠️ Template {key} failed ({attempts} attempt{'s' if attempts > 1 else ''}): {error}; retrying in {wait:.0f}s")
+
+    def ensure(self, defect_type: str, severity: str, tone: str, generate, model: str | None = None) -> str | None:
+        """Template for the class, asking `generate(prompt) -> str` once if it is missing.
+        None when generation fails, returns something without the placeholders, or
+        failed recently (cool-down)."""
+        template = self.get(defect_type, severity, tone)
+        key = self.key(defect_type, severity, tone)
+        if template is not None or self._cooling_down(key):
+            return template
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            template = self.get(defect_type, severity, tone)
+            if template is None and not self._cooling_down(key):
+                try:
+                    candidate = generate(template_prompt(defect_type, severity, tone))
+                except Exception as e:
+                    self._failed(key, f"{type(e).__name__}: {e}")
+                    return None
+                if self.put(defect_type, severity, tone, candidate, model):
+                    print(f"✅ New message template {key}")
+                    self.failures.pop(key, None)
+                    template = self.get(defect_type, severity, tone)
+                else:
+                    self._failed(key, "answer without the placeholders")
+        return template
+
+    def prefetch(self, classes, generate_async, tone: str = DEFAULT_TONE, model: str | None = None, concurrency: int = 16) -> int:
+        """Generate the missing templates for (defect_type, severity) `classes` concurrently; returns how many were added."""
+        missing = {(d, s) for d, s in classes
+                   if self.get(d, s, tone) is None and not self._cooling_down(self.key(d, s, tone))}
+        items = [((d, s), template_prompt(d, s, tone), None) for d, s in missing]
+        added = 0
+        for result in LLMCampaign(generate_async, concurrency=concurrency).iter_results(items):
+            key = self.key(*result["id"], tone)
+            if result["text"] is None:
+                self._failed(key, result["error"])
+            elif self.put(*result["id"], tone, result["text"], model):
+                self.failures.pop(key, None)
+                added += 1
+            else:
+                self._failed(key, "answer without the placeholders")
+        return added
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Global instance
+message_templates = MessageTemplates()
@@ -0,0 +1,289 @@
+"""Load test for the scheduling path: throughput, latency and double-booking safety.
+
+    python -m utils.scheduling_bench --centers 200 --days 30 --vehicles 5000 --workers 16 --duration 20
+    python -m utils.scheduling_bench --processes 4 --json bench.json
+    python -m utils.scheduling_bench --baseline bench.json --max-regression 0.15   # CI gate
+
+A synthetic world (centers around Mumbai, a slot template, a fleet placed near
+the centers, a share of slots already booked) is built in a scratch directory
+with its own slot store and job queue, and the agents get a stub diagnosis
+agent, so data/slots.db, data/jobs.db and the telematics/model files are not
+used, and no LLM client or API key is needed. Workers, threads sharing one
+SchedulingAgent (like Streamlit sessions) and optionally several
+processes each with its own agent on the same store (like parallel orchestrator
+runs), loop over a weighted mix of `get_available_slots`, `book_appointment`
+on one of the few best slots (to force contention) and `auto_reserve_high_risk`.
+
+Reported per operation: count, throughput, p50/p95/p99/max latency, plus
+booking conflicts (a lost compare-and-set, expected under contention) and
+double bookings (two winners for one slot, must be 0). With `--baseline` the
+run exits non-zero when throughput drops or p95 latency grows by more than
+`--max-regression`, or when any double booking happened.
+"""
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from utils.job_queue import JobQueue
+from utils.slot_store import SlotStore
+from utils.slot_templates import SlotTemplate
+
+MUMBAI_BOX = ((18.90, 19.30), (72.78, 73.12))  # (lat range, lon range)
+OPERATIONS = ("query", "book", "emergency")
+DEFAULT_MIX = "query=6,book=3,emergency=1"
+
+
+# ---------- synthetic world ----------
+def synthetic_centers(n: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    (lat0, lat1), (lon0, lon1) = MUMBAI_BOX
+    return {f"Bench Center {i:04d}": [round(rng.uniform(lat0, lat1), 5), round(rng.uniform(lon0, lon1), 5)] for i in range(n)}
+
+
+def synthetic_times(n: int) -> list:
+    """`n` slot times every 30 minutes from 08:00 (max 32 to stay inside one day)."""
+    return [f"{8 + (m // 60):02d}:{m % 60:02d}" for m in range(0, 30 * min(n, 32), 30)]
+
+
+def synthetic_fleet(centers: dict, n: int, seed: int = 0, jitter_deg: float = 0.02) -> list:
+    """(vehicle_name, location) pairs scattered around the centers."""
+    rng = random.Random(seed + 1)
+    coords = list(centers.values())
+    fleet = []
+    for i in range(n):
+        lat, lon = rng.choice(coords)
+        fleet.append((f"BENCH-{i:06d}", (lat + rng.uniform(-jitter_deg, jitter_deg), lon + rng.uniform(-jitter_deg, jitter_deg))))
+    return fleet
+
+
+def build_world(workdir: str, centers: int, times: int, days: int, prebooked: float, seed: int = 0) -> dict:
+    """Create the slot store for a run and pre-book a share of the horizon. Returns the world spec."""
+    spec = {"workdir": workdir, "centers": centers, "times": times, "days": days, "seed": seed}
+    agent = make_agent(spec)
+    horizon = agent.template.frame(agent.calendar.start, days)
+    rng = np.random.default_rng(seed)
+    taken = horizon['slot_id'].to_numpy()[rng.random(len(horizon)) < prebooked]
+    agent.slot_store.book_many([(int(slot_id), f"PREBOOKED-{n}", "normal") for n, slot_id in enumerate(taken)])
+    print(f"✅ Bench world: {centers} centers x {times} times x {days} days = {len(horizon):,} slots, {len(taken):,} pre-booked")
+    return spec
+
+
+class StubDiagnosis:
+    """Stands in for DiagnosisAgent, which would load the real telematics and models."""
+
+    def diagnose_many(self, vehicle_ids=None) -> pd.DataFrame:
+        vehicle_ids = list(vehicle_ids or [])
+        return pd.DataFrame({"vehicle_id": vehicle_ids, "predicted_failure": ["none"] * len(vehicle_ids)})
+
+
+def make_agent(spec: dict):
+    """A SchedulingAgent on the run's synthetic centers and scratch store, with a stub
+    diagnosis agent and no horizon-roll thread; enrichment jobs are queued in the scratch
+    directory but never worked (no logs.csv writes)."""
+    from agents.scheduling_agent import SchedulingAgent
+
+    workdir = Path(spec["workdir"])
+    centers = synthetic_centers(spec["centers"], spec["seed"])
+    template = SlotTemplate(centers.keys(), times=synthetic_times(spec["times"]))
+    store = SlotStore(workdir / "slots.db", timeout=30.0, template=template)
+    jobs = JobQueue(workdir / "jobs.db", workers=0)
+    return SchedulingAgent(centers=centers, template=template, slot_store=store, jobs=jobs, horizon_days=spec["days"],
+                           diagnosis_agent=StubDiagnosis(), roll_horizon=False)
+
+
+# ---------- workers ----------
+def _parse_mix(mix: str) -> dict:
+    weights = {op: float(w) for op, w in (part.split("=") for part in mix.split(","))}
+    unknown = set(weights) - set(OPERATIONS)
+    if unknown:
+        raise ValueError(f"Unknown operations in mix: {sorted(unknown)}")
+    return weights
+
+
+def booking_outcome(booking: dict) -> str:
+    """ok, conflict (lost the compare-and-set on the slot it reports) or empty (no slot to try)."""
+    if booking["status"] != "error":
+        return "ok"
+    return "empty" if booking.get("slot_id") is None else "conflict"
+
+
+def _run_ops(agent, fleet, mix: dict, deadline: float, seed: int, hot: int, days_ahead: int) -> list:
+    """One worker loop. Returns (op, seconds, outcome, slot_id) samples."""
+    rng = random.Random(seed)
+    ops, weights = zip(*mix.items())
+    samples = []
+    while time.perf_counter() < deadline:
+        op = rng.choices(ops, weights)[0]
+        vehicle_name, location = rng.choice(fleet)
+        outcome, slot_id = "ok", None
+        started = time.perf_counter()
+        if op == "query":
+            slots = agent.get_available_slots(vehicle_name, location, days_ahead=days_ahead)
+            if "slot_id" not in slots[0]:
+                outcome = "empty"
+        elif op == "book":
+            slots = agent.get_available_slots(vehicle_name, location, days_ahead=days_ahead)
+            if "slot_id" not in slots[0]:
+                outcome = "empty"
+            else:
+                slot_id = rng.choice(slots[:hot])['slot_id']
+                booking = agent.book_appointment(vehicle_name, slot_id, "Bench", auto_confirm=True)
+                outcome = "conflict" if booking["status"] == "error" else "ok"
+        else:
+            booking = agent.auto_reserve_high_risk(vehicle_name, location)
+            outcome, slot_id = booking_outcome(booking), booking.get("slot_id")
+        samples.append((op, time.perf_counter() - started, outcome, slot_id if outcome == "ok" else None))
+    return samples
+
+
+def _process_worker(spec: dict, fleet, mix: dict, duration: float, seed: int, threads: int, hot: int, days_ahead: int) -> tuple:
+    return _run_threads(make_agent(spec), fleet, mix, duration, seed, threads, hot, days_ahead)
+
+
+def _run_threads(agent, fleet, mix, duration, seed, threads, hot, days_ahead) -> tuple:
+    """Drive one agent from `threads` workers. Returns (samples, seconds spent), agent setup excluded."""
+    started = time.perf_counter()
+    deadline = started + duration
+    with ThreadPoolExecutor(threads) as pool:
+        futures = [pool.submit(_run_ops, agent, fleet, mix, deadline, seed * 1000 + n, hot, days_ahead) for n in range(threads)]
+        samples = [sample for f in futures for sample in f.result()]
+    return samples, time.perf_counter() - started
+
+
+# ---------- report ----------
+def summarize(samples: list, elapsed: float) -> dict:
+    by_op = defaultdict(list)
+    outcomes = defaultdict(Counter)
+    winners = Counter()
+    for op, seconds, outcome, slot_id in samples:
+        by_op[op].append(seconds)
+        outcomes[op][outcome] += 1
+        if slot_id is not None:
+            winners[slot_id] += 1
+    report = {"elapsed_s": round(elapsed, 3), "operations": {}}
+    for op, latencies in sorted(by_op.items()):
+        ms = np.array(latencies) * 1000
+        report["operations"][op] = {
+            "count": len(ms),
+            "throughput_per_s": round(len(ms) / elapsed, 1),
+            "p50_ms": round(float(np.percentile(ms, 50)), 3),
+            "p95_ms": round(float(np.percentile(ms, 95)), 3),
+            "p99_ms": round(float(np.percentile(ms, 99)), 3),
+            "max_ms": round(float(ms.max()), 3),
+            **dict(sorted(outcomes[op].items())),
+        }
+    report["total_throughput_per_s"] = round(len(samples) / elapsed, 1)
+    report["bookings"] = sum(winners.values())
+    report["conflicts"] = sum(c["conflict"] for c in outcomes.values())
+    report["double_bookings"] = sum(n - 1 for n in winners.values() if n > 1)
+    return report
+
+
+def check_store(spec: dict, report: dict) -> int:
+    """Every slot the workers won must be held by exactly the vehicle that won it."""
+    store = SlotStore(Path(spec["workdir"]) / "slots.db")
+    booked = store.frame()
+    won = booked[booked['vehicle_name'].str.startswith("BENCH-", na=False)]
+    return report["bookings"] - len(won)
+
+
+def print_report(report: dict):
+    print(f"\n📊 Scheduling benchmark ({report['elapsed_s']}s, {report['total_throughput_per_s']} ops/s)")
+    print(f"{'op':<10}{'count':>8}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}  outcomes")
+    for op, stats in report["operations"].items():
+        outcomes = ", ".join(f"{k}={stats[k]}" for k in ("ok", "conflict", "empty") if k in stats)
+        print(f"{op:<10}{stats['count']:>8}{stats['throughput_per_s']:>10}{stats['p50_ms']:>10}"
+              f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}  {outcomes}")
+    print(f"bookings={report['bookings']} conflicts={report['conflicts']} "
+          f"double_bookings={report['double_bookings']} store_mismatches={report['store_mismatches']}")
+
+
+def safety_failures(report: dict) -> list:
+    if report["double_bookings"] or report["store_mismatches"]:
+        return [f"double bookings: {report['double_bookings']}, store mismatches: {report['store_mismatches']}"]
+    return []
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> list:
+    """Regressions against a saved report, as messages (empty = pass)."""
+    failures = safety_failures(report)
+    for op, base in baseline.get("operations", {}).items():
+        now = report["operations"].get(op)
+        if now is None:
+            continue
+        if now["throughput_per_s"] < base["throughput_per_s"] * (1 - max_regression):
+            failures.append(f"{op} throughput {now['throughput_per_s']}/s < baseline {base['throughput_per_s']}/s")
+        if now["p95_ms"] > base["p95_ms"] * (1 + max_regression):
+            failures.append(f"{op} p95 {now['p95_ms']} ms > baseline {base['p95_ms']} ms")
+    return failures
+
+
+def run(centers: int = 52, times: int = 5, days: int = 30, vehicles: int = 2000, prebooked: float = 0.3,
+        workers: int = 8, processes: int = 1, duration: float = 10.0, mix: str = DEFAULT_MIX, hot: int = 3,
+        days_ahead: int = 7, seed: int = 0, workdir: str | None = None) -> dict:
+    scratch = workdir or tempfile.mkdtemp(prefix="scheduling_bench_")
+    try:
+        spec = build_world(scratch, centers, times, days, prebooked, seed)
+        fleet = synthetic_fleet(synthetic_centers(centers, seed), vehicles, seed)
+        weights = _parse_mix(mix)
+        print(f"⏱️ Running {processes} process(es) x {workers} thread(s) for {duration}s, mix {mix}")
+        if processes > 1:
+            with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = [pool.submit(_process_worker, spec, fleet, weights, duration, seed + p, workers, hot, days_ahead)
+                           for p in range(processes)]
+                results = [f.result() for f in futures]
+        else:
+            results = [_run_threads(make_agent(spec), fleet, weights, duration, seed, workers, hot, days_ahead)]
+        samples = [sample for part, _ in results for sample in part]
+        report = summarize(samples, max(elapsed for _, elapsed in results))
+        report["store_mismatches"] = check_store(spec, report)
+        report["config"] = {"centers": centers, "times": times, "days": days, "vehicles": vehicles, "prebooked": prebooked,
+                            "workers": workers, "processes": processes, "duration": duration, "mix": mix, "hot": hot}
+        return report
+    finally:
+        if workdir is None:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test slot queries and bookings")
+    parser.add_argument("--centers", type=int, default=52)
+    parser.add_argument("--times", type=int, default=5, help="slot times per day")
+    parser.add_argument("--days", type=int, default=30, help="horizon length")
+    parser.add_argument("--vehicles", type=int, default=2000)
+    parser.add_argument("--prebooked", type=float, default=0.3, help="share of slots booked before the run")
+    parser.add_argument("--workers", type=int, default=8, help="threads per process")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation weights, e.g. query=6,book=3,emergency=1")
+    parser.add_argument("--hot", type=int, default=3, help="book one of the N best slots (higher = less contention)")
+    parser.add_argument("--days-ahead", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report here (usable as a --baseline later)")
+    parser.add_argument("--baseline", help="report to compare against; exit 1 on regression")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed throughput/p95 change vs baseline")
+    args = parser.parse_args()
+
+    report = run(args.centers, args.times, args.days, args.vehicles, args.prebooked, args.workers, args.processes,
+                 args.duration, args.mix, args.hot, args.days_ahead, args.seed)
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+        print(f"✅ Report written to {args.json}")
+    if args.baseline:
+        failures = compare(report, json.loads(Path(args.baseline).read_text()), args.max_regression)
+    else:
+        failures = safety_failures(report)
+    for failure in failures:
+        print(f"🚨 {failure}")
+    sys.exit(1 if failures else 0)
@@ -6,11 +6,16 @@ from datetime import datetime, timedelta
 from typing import Dict, List
 from sklearn.ensemble import IsolationForest
 from langchain_openai import ChatOpenAI
+from models.artifact_cache import artifact_cache
+
+UEBA_MIN_ROWS = 50  # the behavior model is trained once the log has more rows than this
+UEBA_REFRESH_ROWS = 50  # ...and refit on the whole log each time it grows by this many rows
 
 class AgentUEBA:
     def __init__(self):
         self.llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
         self.agent_log = self._init_agent_log()
+        self.trained_rows = 0
         self.isolation_forest = self._train_behavior_model()
     
     def _init_agent_log(self):
@@ -29,13 +34,19 @@ class AgentUEBA:
         return empty_df
     
     def _train_behavior_model(self):
-        """ML model for inter-agent anomaly detection"""
+        """ML model for inter-agent anomaly detection, trained on the whole log.
+        The cache is keyed on the rows themselves, so a restart on an unchanged log skips the fit."""
         features = ['data_size', 'response_time_ms', 'cross_agent_calls']
-        if len(self.agent_log) > 50:
+        if len(self.agent_log) > UEBA_MIN_ROWS:
             X = self.agent_log[features].fillna(0)
-            model = IsolationForest(contamination=0.1, random_state=42)
-            model.fit(X)
-            return model
+            self.trained_rows = len(X)
+            return artifact_cache.get_or_fit(
+                "ueba_behavior",
+                X,
+                features,
+                lambda: IsolationForest(contamination=0.1, random_state=42).fit(X),
+                params={"contamination": 0.1, "random_state": 42},
+            )
         return None
     
     def monitor_agent_call(self, source_agent: str, target_agent: str, 
@@ -64,6 +75,8 @@ class AgentUEBA:
         # 3. Save log
         self.agent_log = pd.concat([self.agent_log, pd.DataFrame([log_entry])], ignore_index=True)
         self.agent_log.to_csv("data/agent_interactions.csv", index=False)
+        if len(self.agent_log) - self.trained_rows >= UEBA_REFRESH_ROWS:
+            self.isolation_forest = self._train_behavior_model()
         
         return {
             "allowed": not log_entry['blocked'],
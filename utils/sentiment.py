@@ -0,0 +1,141 @@
+import os
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from textblob import TextBlob
+from concurrent.futures import ProcessPoolExecutor
+
+SENTIMENT_CACHE_PATH = "data/sentiment_cache.db"
+PARALLEL_MIN = 20_000  # below this many unscored comments a process pool costs more than it saves
+_LOOKUP_BATCH = 900  # stay under SQLite's bound-parameter limit
+
+
+def comment_key(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def polarity(text) -> float:
+    """TextBlob polarity, -1 (negative) to +1 (positive); 0 for missing comments."""
+    if not isinstance(text, str):
+        return 0.0
+    return float(TextBlob(text).sentiment.polarity)
+
+
+def _score_chunk(texts: list) -> list:
+    return [polarity(t) for t in texts]
+
+
+class SentimentService:
+    """Comment sentiment, scored once per distinct text.
+
+    Scores are memoized by a hash of the comment, in memory and in a small
+    SQLite table shared by every process, and `fill` only scores rows of a
+    frame whose `sentiment` column is still empty, so reloads of feedback.csv
+    look scores up instead of re-running TextBlob. Misses are
+    de-duplicated and scored in one batch (across a process pool when there
+    are many, e.g. a first load of historical feedback).
+    """
+
+    def __init__(self, path: str = SENTIMENT_CACHE_PATH, workers: int | None = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.workers = workers or os.cpu_count()
+        self._memo = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._conn().execute("CREATE TABLE IF NOT EXISTS sentiment (key TEXT PRIMARY KEY, polarity REAL NOT NULL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def score(self, text) -> float:
+        return float(self.score_many([text])[0])
+
+    def score_many(self, texts) -> np.ndarray:
+        """Polarity per text, in order; each distinct text is looked up or scored once."""
+        texts = ["" if not isinstance(t, str) else t for t in texts]
+        unique = {t: comment_key(t) for t in set(texts) if t}
+        scores = {"": 0.0}
+        missing = {}
+        with self._lock:
+            for text, key in unique.items():
+                if key in self._memo:
+                    scores[text] = self._memo[key]
+                else:
+                    missing[key] = text
+        if missing:
+            found = self._lookup(list(missing))
+            for key, value in found.items():
+                scores[missing.pop(key)] = value
+            new = self._score(missing)
+            self._store(new)
+            for key, value in new.items():
+                scores[missing[key]] = value
+            with self._lock:
+                self._memo.update(found)
+                self._memo.update(new)
+        return np.array([scores[t] for t in texts], dtype=float)
+
+    def fill(self, frame: pd.DataFrame, text_col: str = "comments", score_col: str = "sentiment") -> int:
+        """Score only the rows of `frame` without a sentiment yet (in place). Returns how many were scored."""
+        if frame.empty:
+            frame[score_col] = pd.Series(dtype=float)
+            return 0
+        if score_col not in frame:
+            frame[score_col] = np.nan
+        frame[score_col] = pd.to_numeric(frame[score_col], errors="coerce")
+        todo = frame[score_col].isna().to_numpy()
+        if todo.any():
+            frame.loc[todo, score_col] = self.score_many(frame.loc[todo, text_col].tolist())
+        return int(todo.sum())
+
+    # ---------- storage ----------
+    def _lookup(self, keys: list) -> dict:
+        conn = self._conn()
+        found = {}
+        for i in range(0, len(keys), _LOOKUP_BATCH):
+            batch = keys[i:i + _LOOKUP_BATCH]
+            rows = conn.execute(f"SELECT key, polarity FROM sentiment WHERE key IN ({', '.join('?' * len(batch))})", batch)
+            found.update(rows.fetchall())
+        return found
+
+    def _score(self, missing: dict) -> dict:
+        keys, texts = list(missing), list(missing.values())
+        if len(texts) < PARALLEL_MIN or self.workers <= 1:
+            return dict(zip(keys, _score_chunk(texts)))
+        size = -(-len(texts) // (self.workers * 4))
+        with ProcessPoolExecutor(self.workers) as pool:
+            scored = [s for chunk in pool.map(_score_chunk, [texts[i:i + size] for i in range(0, len(texts), size)]) for s in chunk]
+        print(f"✅ Scored sentiment for {len(texts):,} new comments with {self.workers} workers")
+        return dict(zip(keys, scored))
+
+    def _store(self, scores: dict):
+        if scores:
+            with self._conn() as conn:
+                conn.executemany("INSERT OR REPLACE INTO sentiment (key, polarity) VALUES (?, ?)", scores.items())
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM sentiment").fetchone()[0]
+
+
+_shared_service = None
+_shared_lock = threading.Lock()
+
+
+def get_sentiment_service() -> SentimentService:
+    """Process-wide SentimentService; the cache db is only opened on first use."""
+    global _shared_service
+    if _shared_service is None:
+        with _shared_lock:
+            if _shared_service is None:
+                _shared_service = SentimentService()
+    return _shared_service
@@ -0,0 +1,97 @@
+import time
+import math
+import threading
+from collections import OrderedDict
+
+from utils.spatial_index import haversine_km
+
+
+class SlotQueryCache:
+    """LRU + TTL cache of slot-query candidates keyed by (location cell, until, risk tier).
+
+    A cell is a `cell_deg` square of lat/lon. An entry holds, per center, the
+    earliest open slots the query could need for *any* point in the cell (the
+    caller widens its center search by `margin_km`), so results re-ranked by
+    exact distance stay identical to an uncached query. Each entry is indexed by
+    the centers it contains, and `invalidate_center` drops exactly the entries a
+    status change at that center can affect.
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 60.0, cell_deg: float = 0.01):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.cell_deg = cell_deg
+        self._entries = OrderedDict()  # key -> (expires_at, value, centers)
+        self._by_center = {}  # center -> set of keys
+        self._lock = threading.Lock()
+        self._generation = 0  # bumped by every invalidation; guards puts of values computed before it
+        self.hits = self.misses = 0
+
+    # ---------- keys ----------
+    def key(self, location: tuple, until: str, tier: str) -> tuple:
+        return (math.floor(location[0] / self.cell_deg), math.floor(location[1] / self.cell_deg), until, tier)
+
+    def cell_center(self, key: tuple) -> tuple:
+        return ((key[0] + 0.5) * self.cell_deg, (key[1] + 0.5) * self.cell_deg)
+
+    def margin_km(self, key: tuple) -> float:
+        """Twice the distance from the cell center to its farthest corner."""
+        lat, lon = self.cell_center(key)
+        half = self.cell_deg / 2
+        return 2 * float(max(haversine_km(lat, lon, lat + dy, lon + dx) for dy in (-half, half) for dx in (-half, half)))
+
+    # ---------- access ----------
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, value, centers, generation: int | None = None):
+        """Store `value`; skipped if an invalidation happened since `generation` was read."""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if key in self._entries:
+                self._drop(key)
+            centers = frozenset(centers)
+            self._entries[key] = (time.monotonic() + self.ttl, value, centers)
+            for center in centers:
+                self._by_center.setdefault(center, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        _, _, centers = self._entries.pop(key)
+        for center in centers:
+            keys = self._by_center.get(center)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_center[center]
+
+    # ---------- invalidation ----------
+    def invalidate_center(self, center: str):
+        with self._lock:
+            self._generation += 1
+            for key in list(self._by_center.get(center, ())):
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._by_center.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,203 @@
+import threading
+import numpy as np
+import pandas as pd
+
+MAX_TIMES = 64  # one uint64 word per (center, day)
+
+
+class SlotCalendar:
+    """Availability bitmaps per service center and day over a rolling horizon.
+
+    Bit t of `free[c, d]` is set when the slot at `times[t]` on day `d` at
+    center `c` is open; `reserve[c, d]` carries the high-risk reserve bits.
+    Times are kept sorted, so walking bits low-to-high walks the day in time
+    order: "earliest free slot" is a scan for the first non-zero word plus a
+    lowest-set-bit, and counting is a popcount. Words come from the
+    SlotTemplate and slot ids are template arithmetic, so memory is 16 bytes
+    per center-day whatever the slot count; stored deviations (bookings,
+    closures) are overlaid from the SlotStore and followed through `sync`.
+    """
+
+    def __init__(self, template, start, days: int):
+        if len(template.times) > MAX_TIMES:
+            raise ValueError(f"At most {MAX_TIMES} slot times per day are supported")
+        self.template = template
+        self.times = template.times
+        self.centers = template.centers
+        self._center_pos = {c: i for i, c in enumerate(self.centers)}
+        self.first_day = template.day_number(start)
+        self.free, self.reserve = template.bitmaps(self.first_day, days)
+        self.rev = 0
+        self.listeners = []  # objects with on_change(centers, days, delta) and on_roll()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_store(cls, template, store, start, days: int):
+        """Template horizon with every stored deviation applied."""
+        calendar = cls(template, start, days)
+        calendar.rev = store.max_rev()
+        calendar.apply(store.frame())
+        return calendar
+
+    # ---------- shape ----------
+    @property
+    def days(self) -> int:
+        return self.free.shape[1]
+
+    @property
+    def start(self) -> pd.Timestamp:
+        return self.template.date_of(self.first_day)
+
+    @property
+    def end(self) -> pd.Timestamp:
+        """Last day in the horizon."""
+        return self.template.date_of(self.first_day + self.days - 1)
+
+    def day_of(self, date) -> int:
+        return self.template.day_number(date) - self.first_day
+
+    def date_of(self, day: int) -> pd.Timestamp:
+        return self.template.date_of(self.first_day + day)
+
+    # ---------- updates ----------
+    def apply(self, df: pd.DataFrame):
+        """Overlay slot rows (slot_id, status, is_high_risk_reserve); rows outside the horizon are ignored."""
+        if df.empty:
+            return
+        centers, days, times = self.template.locate(df["slot_id"].to_numpy(dtype=np.int64))
+        days = days - self.first_day
+        inside = (days >= 0) & (days < self.days) & (centers < len(self.centers))
+        centers, days, times = centers[inside], days[inside], times[inside]
+        bits = np.left_shift(np.uint64(1), times.astype(np.uint64))
+        is_free = (df["status"] == "available").to_numpy()[inside]
+        is_reserve = df["is_high_risk_reserve"].astype(bool).to_numpy()[inside]
+        with self._lock:
+            was_free = (self.free[centers, days] & bits) != 0
+            for flags, target in ((is_free, self.free), (is_reserve, self.reserve)):
+                np.bitwise_and.at(target, (centers, days), ~bits)
+                np.bitwise_or.at(target, (centers[flags], days[flags]), bits[flags])
+        flipped = was_free != is_free
+        if flipped.any():
+            self._notify(centers[flipped], days[flipped], np.where(is_free[flipped], -1, 1))
+
+    def _notify(self, centers, days, delta):
+        """Tell listeners which (center, day) cells gained (+1) or lost (-1) a taken slot."""
+        for listener in self.listeners:
+            listener.on_change(centers, days, delta)
+
+    def set_free(self, slot_id: int, free: bool):
+        c, d, t = (int(v) for v in self.template.locate(slot_id))
+        d -= self.first_day
+        if not (0 <= d < self.days and c < len(self.centers)):
+            return
+        bit = np.uint64(1) << np.uint64(t)
+        with self._lock:
+            was_free = bool(self.free[c, d] & bit)
+            self.free[c, d] = (self.free[c, d] | bit) if free else (self.free[c, d] & ~bit)
+        if was_free != free:
+            self._notify(np.array([c]), np.array([d]), np.array([-1 if free else 1]))
+
+    def sync(self, store) -> pd.DataFrame | None:
+        """Apply slot changes other writers committed to `store` since the last sync.
+        Returns the changed rows, or None when nothing changed (one indexed MAX lookup).
+        """
+        if store.max_rev() <= self.rev:
+            return None
+        changes = store.changes_since(self.rev)
+        if changes.empty:
+            return None
+        self.apply(changes)
+        self.rev = int(changes["rev"].max())
+        return changes
+
+    def roll(self, start, store, days: int | None = None):
+        """Move the horizon to begin at `start`: past days are dropped, new days
+        come from the template plus whatever deviations the store holds for them.
+        """
+        days = days or self.days
+        first_day = self.template.day_number(start)
+        if first_day == self.first_day and days == self.days:
+            return
+        free, reserve = self.template.bitmaps(first_day, days)
+        lo, hi = max(first_day, self.first_day), min(first_day + days, self.first_day + self.days)
+        old_first, old_last = self.first_day, self.first_day + self.days
+        with self._lock:
+            if lo < hi:  # keep the overlapping days as they are
+                free[:, lo - first_day:hi - first_day] = self.free[:, lo - old_first:hi - old_first]
+                reserve[:, lo - first_day:hi - first_day] = self.reserve[:, lo - old_first:hi - old_first]
+            self.free, self.reserve, self.first_day = free, reserve, first_day
+        for listener in self.listeners:
+            listener.on_roll()  # rebuild from the new window; the deviations below arrive as changes
+
+        stored = store.between(self.start.strftime("%Y-%m-%d"), self.end.strftime("%Y-%m-%d"))
+        if not stored.empty:
+            day_numbers = self.template.locate(stored["slot_id"].to_numpy(dtype=np.int64))[1]
+            self.apply(stored[(day_numbers < old_first) | (day_numbers >= old_last)])
+        print(f"✅ Slot horizon rolled to {self.start:%Y-%m-%d} … {self.end:%Y-%m-%d}")
+
+    # ---------- queries ----------
+    def _words(self, rows, until=None, start=None, reserve=None, times=None, days=None):
+        """Free words of center row(s) `rows` between start and until, reserve-filtered.
+        `times` is a bit mask over slot times, `days` a boolean mask over horizon days.
+        Returns (words, template day number of the first word column).
+        """
+        with self._lock:  # roll swaps free/reserve/first_day together
+            free, reserve_words, first_day = self.free, self.reserve, self.first_day
+        n_days = free.shape[1]
+        first = max(0, self.template.day_number(start) - first_day) if start is not None else 0
+        last = min(n_days - 1, self.template.day_number(until) - first_day) if until is not None else n_days - 1
+        words = free[rows, first:last + 1]
+        if reserve is True:
+            words = words & reserve_words[rows, first:last + 1]
+        elif reserve is False:
+            words = words & ~reserve_words[rows, first:last + 1]
+        if times is not None:
+            words = words & np.uint64(times)
+        if days is not None:
+            words = np.where(days[first:last + 1], words, np.uint64(0))
+        return words, first_day + first
+
+    def _window(self, center, until=None, start=None, reserve=None, times=None, days=None):
+        c = self._center_pos.get(center)
+        if c is None:
+            return None, 0
+        return self._words(c, until, start, reserve, times, days)
+
+    def is_free(self, slot_id: int) -> bool:
+        c, d, t = (int(v) for v in self.template.locate(slot_id))
+        with self._lock:
+            free, first_day = self.free, self.first_day
+        d -= first_day
+        return 0 <= d < free.shape[1] and c < len(self.centers) and bool(free[c, d] & (np.uint64(1) << np.uint64(t)))
+
+    def count_available(self, center, until=None, start=None, reserve=None, times=None, days=None) -> int:
+        words, _ = self._window(center, until, start, reserve, times, days)
+        return 0 if words is None else int(np.bitwise_count(words).sum())
+
+    def counts(self, until=None, start=None, reserve=None, times=None, days=None) -> dict:
+        """Open-slot count for every center at once: {center: count}."""
+        words, _ = self._words(slice(None), until, start, reserve, times, days)
+        return dict(zip(self.centers, np.bitwise_count(words).sum(axis=1).tolist()))
+
+    def has_available(self, center, until=None, start=None, reserve=None, times=None, days=None) -> bool:
+        words, _ = self._window(center, until, start, reserve, times, days)
+        return words is not None and bool(words.any())
+
+    def iter_free(self, center, until=None, start=None, reserve=None, times=None, days=None):
+        """Yield (slot_id, date, time) of open slots at `center`, earliest first."""
+        words, first_day = self._window(center, until, start, reserve, times, days)
+        if words is None:
+            return
+        c = self._center_pos[center]
+        for offset in np.flatnonzero(words):
+            day = first_day + int(offset)
+            date = self.template.date_of(day)
+            word = int(words[offset])
+            while word:
+                low = word & -word
+                t = low.bit_length() - 1
+                yield int(self.template.ids(c, day, t)), date, self.times[t]
+                word ^= low
+
+    def earliest(self, center, until=None, start=None, reserve=None, times=None, days=None):
+        return next(self.iter_free(center, until, start, reserve, times, days), None)
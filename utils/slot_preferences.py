@@ -0,0 +1,90 @@
+import re
+import numpy as np
+import pandas as pd
+
+DAY_PARTS = {  # named time-of-day windows, [start, end)
+    "morning": ("00:00", "12:00"),
+    "afternoon": ("12:00", "16:00"),
+    "evening": ("16:00", "24:00"),
+}
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+WEEKDAY_GROUPS = {"weekday": range(5), "weekdays": range(5), "weekend": (5, 6), "weekends": (5, 6)}
+
+_SLOT_LABEL = re.compile(r"^(\d{4}-\d{2}-\d{2})[ T](\d{1,2}:\d{2})$")
+_DATE_LABEL = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_WINDOW_LABEL = re.compile(r"^(\d{1,2}:\d{2})\s*-\s*(\d{1,2}:\d{2})$")
+
+
+def _hhmm(value: str) -> str:
+    hours, minutes = value.split(":")
+    return f"{int(hours):02d}:{minutes}"
+
+
+class SlotPreferences:
+    """Structured booking preferences, evaluated directly on the calendar bitmaps.
+
+    `slots` are exact (date, time) choices tried in order, e.g. the
+    "YYYY-MM-DD HH:MM" labels the app offers. The other fields narrow the
+    search when none of those is free: time windows become a bit mask over
+    the day's slot times, weekdays/dates/after/before a mask over horizon
+    days, and centers/max_km pick which centers are searched. So matching is
+    AND-ing words and finding the first set bit, never a scan or a sort of slot rows.
+    """
+
+    def __init__(self, slots=(), windows=(), weekdays=(), dates=(), centers=(), max_km: float | None = None,
+                 location: tuple | None = None, after=None, before=None):
+        self.slots = [(pd.Timestamp(d).strftime("%Y-%m-%d"), _hhmm(t)) for d, t in slots]
+        self.windows = [(_hhmm(a), _hhmm(b)) for a, b in windows]
+        self.weekdays = {WEEKDAYS.index(w.lower()) if isinstance(w, str) else int(w) for w in weekdays}
+        self.dates = {pd.Timestamp(d).strftime("%Y-%m-%d") for d in dates}
+        self.centers = list(centers)
+        self.max_km = max_km
+        self.location = location
+        self.after = after
+        self.before = before
+
+    @classmethod
+    def parse(cls, preferences) -> "SlotPreferences":
+        """Build from a dict of the constructor's fields, or from free-text labels:
+        "2025-12-20 10:30", "2025-12-20", "morning"/"afternoon"/"evening",
+        "09:00-12:00", weekday names, "weekdays"/"weekends". Unknown labels are ignored.
+        """
+        if isinstance(preferences, cls):
+            return preferences
+        if isinstance(preferences, dict):
+            return cls(**preferences)
+        fields = {"slots": [], "windows": [], "weekdays": [], "dates": []}
+        for label in preferences or []:
+            text = str(label).strip().lower()
+            if match := _SLOT_LABEL.match(text):
+                fields["slots"].append(match.groups())
+            elif _DATE_LABEL.match(text):
+                fields["dates"].append(text)
+            elif match := _WINDOW_LABEL.match(text):
+                fields["windows"].append(match.groups())
+            elif text in DAY_PARTS:
+                fields["windows"].append(DAY_PARTS[text])
+            elif len(text) >= 3 and any(w.startswith(text) for w in WEEKDAYS):  # "sat", "saturday"
+                fields["weekdays"].append(next(w for w in WEEKDAYS if w.startswith(text)))
+            elif text in WEEKDAY_GROUPS:
+                fields["weekdays"].extend(WEEKDAY_GROUPS[text])
+        return cls(**fields)
+
+    # ---------- masks ----------
+    def time_mask(self, times) -> int | None:
+        """Bits of the slot `times` that fall in any window (None = all times)."""
+        if not self.windows:
+            return None
+        return sum(1 << t for t, slot_time in enumerate(times) if any(a <= slot_time < b for a, b in self.windows))
+
+    def day_mask(self, calendar) -> np.ndarray | None:
+        """Horizon days allowed by weekdays and dates (None = all days)."""
+        if not (self.weekdays or self.dates):
+            return None
+        days = pd.date_range(calendar.start, periods=calendar.days, freq="D")
+        mask = np.ones(calendar.days, dtype=bool)
+        if self.weekdays:
+            mask &= np.isin(days.weekday, list(self.weekdays))
+        if self.dates:
+            mask &= days.strftime("%Y-%m-%d").isin(self.dates)
+        return mask
@@ -0,0 +1,191 @@
+import sqlite3
+import threading
+import pandas as pd
+from pathlib import Path
+
+SLOT_DB_PATH = "data/slots.db"
+SLOT_COLUMNS = ["slot_id", "date", "time", "center", "vehicle_name", "status", "is_high_risk_reserve", "priority_level"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS slots (
+    slot_id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    center TEXT NOT NULL,
+    vehicle_name TEXT,
+    status TEXT NOT NULL DEFAULT 'available',
+    is_high_risk_reserve INTEGER NOT NULL DEFAULT 0,
+    priority_level TEXT,
+    updated_at TEXT,
+    rev INTEGER NOT NULL DEFAULT 0,
+    diagnosis TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_slots_status_date_center ON slots (status, date, center);
+CREATE INDEX IF NOT EXISTS idx_slots_rev ON slots (rev);
+CREATE INDEX IF NOT EXISTS idx_slots_date ON slots (date);
+"""
+_ADDED_COLUMNS = {"rev": "INTEGER NOT NULL DEFAULT 0", "diagnosis": "TEXT"}
+
+
+class SlotStore:
+    """Transactional slot table in SQLite (WAL mode).
+
+    Replaces the read-modify-rewrite of data/slots.csv: a booking is a single
+    indexed compare-and-set UPDATE (`... WHERE status = 'available'`), so two
+    Streamlit sessions or orchestrator runs racing for the same slot get exactly
+    one winner, and readers never block writers. Each thread gets its own
+    connection. Every status change bumps a store-wide `rev`, which lets
+    in-memory indexes catch up with `changes_since`.
+
+    With a SlotTemplate the table only holds deviations from it: a template
+    slot gets its row inserted the first time it is booked or closed.
+    """
+
+    def __init__(self, path: str = SLOT_DB_PATH, timeout: float = 5.0, template=None):
+        self.path = Path(path)
+        self.template = template
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        self._local = threading.local()
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'slots'").fetchone():
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(slots)")}
+            for name, decl in _ADDED_COLUMNS.items():  # databases created by older versions
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE slots ADD COLUMN {name} {decl}")
+        conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ---------- loading ----------
+    def is_empty(self) -> bool:
+        return self._conn().execute("SELECT 1 FROM slots LIMIT 1").fetchone() is None
+
+    def insert_many(self, df: pd.DataFrame):
+        """Bulk-insert slot rows (existing slot_ids are left untouched)."""
+        rows = df[SLOT_COLUMNS].copy()
+        rows["date"] = pd.to_datetime(rows["date"], errors="coerce").dt.strftime("%Y-%m-%d")
+        rows = rows.dropna(subset=["date"])
+        rows["is_high_risk_reserve"] = rows["is_high_risk_reserve"].astype(bool).astype(int)
+        rows["vehicle_name"] = rows["vehicle_name"].astype(object).where(rows["vehicle_name"].notna(), None)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows["rev"] = conn.execute("SELECT COALESCE(MAX(rev), 0) + 1 FROM slots").fetchone()[0]
+            conn.executemany(
+                f"INSERT OR IGNORE INTO slots ({', '.join(SLOT_COLUMNS)}, rev) VALUES ({', '.join('?' * (len(SLOT_COLUMNS) + 1))})",
+                rows.astype(object).itertuples(index=False, name=None),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    # ---------- queries ----------
+    def _frame(self, sql: str, params=()) -> pd.DataFrame:
+        df = pd.read_sql_query(sql, self._conn(), params=params)
+        df["date"] = pd.to_datetime(df["date"], errors="coerce")
+        df["is_high_risk_reserve"] = df["is_high_risk_reserve"].astype(bool)
+        return df
+
+    def frame(self) -> pd.DataFrame:
+        """All stored slot rows (with a template, only the deviations from it)."""
+        return self._frame(f"SELECT {', '.join(SLOT_COLUMNS)} FROM slots ORDER BY slot_id")
+
+    def max_rev(self) -> int:
+        return self._conn().execute("SELECT COALESCE(MAX(rev), 0) FROM slots").fetchone()[0]
+
+    def changes_since(self, rev: int) -> pd.DataFrame:
+        """Slots whose status changed after `rev` (with their own rev), oldest first."""
+        return self._frame(f"SELECT {', '.join(SLOT_COLUMNS)}, rev FROM slots WHERE rev > ? ORDER BY rev", (int(rev),))
+
+    def between(self, first_date: str, last_date: str) -> pd.DataFrame:
+        """Stored slots dated first_date..last_date (inclusive)."""
+        return self._frame(f"SELECT {', '.join(SLOT_COLUMNS)} FROM slots WHERE date BETWEEN ? AND ?", (first_date, last_date))
+
+    def get(self, slot_id: int) -> dict | None:
+        row = self._conn().execute("SELECT * FROM slots WHERE slot_id = ?", (int(slot_id),)).fetchone()
+        if row is None and self.template is not None and self.template.contains(slot_id):
+            return self.template.describe(slot_id)
+        return dict(row) if row else None
+
+    def _materialize(self, conn, slot_id: int):
+        """Insert the template row for `slot_id` unless it is already stored."""
+        if self.template is None or not self.template.contains(slot_id):
+            return
+        row = self.template.describe(slot_id)
+        row["is_high_risk_reserve"] = int(row["is_high_risk_reserve"])
+        conn.execute(
+            f"INSERT OR IGNORE INTO slots ({', '.join(SLOT_COLUMNS)}) VALUES ({', '.join('?' * len(SLOT_COLUMNS))})",
+            [row[c] for c in SLOT_COLUMNS],
+        )
+
+    # ---------- writes ----------
+    def book(self, slot_id: int, vehicle_name: str, priority_level: str, status: str = "booked") -> dict | None:
+        """Atomically claim an available slot (status="closed" closes it instead).
+        Returns the updated row, or None if the slot was not available.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._materialize(conn, slot_id)
+            cur = conn.execute(
+                "UPDATE slots SET status = ?, vehicle_name = ?, priority_level = ?, updated_at = datetime('now'), "
+                "rev = (SELECT COALESCE(MAX(rev), 0) + 1 FROM slots) "
+                "WHERE slot_id = ? AND status = 'available'",
+                (status, vehicle_name, priority_level, int(slot_id)),
+            )
+            row = conn.execute("SELECT * FROM slots WHERE slot_id = ?", (int(slot_id),)).fetchone() if cur.rowcount == 1 else None
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return dict(row) if row else None
+
+    def book_many(self, bookings: list) -> list:
+        """Claim many slots in one transaction. `bookings` holds (slot_id, vehicle_name, priority_level)
+        tuples; returns the booked row for each, or None where the slot was already taken.
+        """
+        conn = self._conn()
+        results = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rev = conn.execute("SELECT COALESCE(MAX(rev), 0) + 1 FROM slots").fetchone()[0]
+            for slot_id, vehicle_name, priority_level in bookings:
+                self._materialize(conn, slot_id)
+                cur = conn.execute(
+                    "UPDATE slots SET status = 'booked', vehicle_name = ?, priority_level = ?, updated_at = datetime('now'), rev = ? "
+                    "WHERE slot_id = ? AND status = 'available'",
+                    (vehicle_name, priority_level, rev, int(slot_id)),
+                )
+                row = conn.execute("SELECT * FROM slots WHERE slot_id = ?", (int(slot_id),)).fetchone() if cur.rowcount == 1 else None
+                results.append(dict(row) if row else None)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return results
+
+    def annotate(self, slot_id: int, diagnosis: str) -> bool:
+        """Attach follow-up results to a booking (does not change availability)."""
+        cur = self._conn().execute("UPDATE slots SET diagnosis = ? WHERE slot_id = ?", (diagnosis, int(slot_id)))
+        return cur.rowcount == 1
+
+    def release(self, slot_id: int) -> bool:
+        """Make a booked slot available again; closed slots stay closed."""
+        cur = self._conn().execute(
+            "UPDATE slots SET status = 'available', vehicle_name = NULL, diagnosis = NULL, updated_at = datetime('now'), "
+            "rev = (SELECT COALESCE(MAX(rev), 0) + 1 FROM slots), "
+            "priority_level = CASE WHEN is_high_risk_reserve THEN 'emergency' ELSE 'normal' END "
+            "WHERE slot_id = ? AND status = 'booked'",
+            (int(slot_id),),
+        )
+        return cur.rowcount == 1
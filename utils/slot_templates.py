@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+SLOT_TIMES = ["09:30", "10:30", "14:00", "15:30", "16:30"]
+SLOT_EPOCH = "2025-12-15"  # day 0 of the slot_id numbering (first date of the original slots.csv)
+RESERVE_MODULUS, RESERVE_SLOTS = 25, 10  # slot_id % 25 < 10 is a high-risk reserve slot
+SLOT_HORIZON_DAYS = 90  # days kept bookable in the calendar
+
+
+class SlotTemplate:
+    """Opening template shared by all service centers.
+
+    Every center offers the same daily time grid (minus `closed_weekdays`),
+    so a slot never has to be stored to exist: its id is arithmetic,
+    `slot_id = ((day * len(times) + time) * stride + center) + 1` with `day`
+    counted from SLOT_EPOCH. This is the same numbering slots.csv was generated
+    with. Only deviations from the template (bookings, closures, changed
+    reserves) go to the SlotStore. Center order is part of the id, so new
+    centers must be appended and `stride` must stay fixed once slots are booked.
+    """
+
+    def __init__(self, centers, times=SLOT_TIMES, epoch: str = SLOT_EPOCH, closed_weekdays=(), stride: int | None = None):
+        self.centers = list(centers)
+        self.times = sorted(times)
+        self.epoch = np.datetime64(epoch, "D")
+        self.closed_weekdays = set(closed_weekdays)  # 0 = Monday
+        self.stride = stride or len(self.centers)
+        if len(self.centers) > self.stride:
+            raise ValueError(f"{len(self.centers)} centers do not fit a slot_id stride of {self.stride}")
+        self._center_pos = {c: i for i, c in enumerate(self.centers)}
+        self._time_pos = {t: i for i, t in enumerate(self.times)}
+
+    # ---------- identity ----------
+    def day_number(self, date) -> int:
+        return int((np.datetime64(pd.Timestamp(date).date(), "D") - self.epoch).astype(int))
+
+    def date_of(self, day: int) -> pd.Timestamp:
+        return pd.Timestamp(self.epoch + np.timedelta64(int(day), "D"))
+
+    def ids(self, centers, days, times):
+        """Slot ids for center/day/time positions (arrays broadcast)."""
+        return (np.asarray(days, dtype=np.int64) * len(self.times) + times) * self.stride + centers + 1
+
+    def slot_id(self, center: str, date, time: str) -> int:
+        return int(self.ids(self._center_pos[center], self.day_number(date), self._time_pos[time]))
+
+    def locate(self, slot_ids):
+        """Inverse of `ids`: (center, day, time) position arrays."""
+        rest, centers = np.divmod(np.asarray(slot_ids, dtype=np.int64) - 1, self.stride)
+        days, times = np.divmod(rest, len(self.times))
+        return centers, days, times
+
+    def contains(self, slot_id) -> bool:
+        c, day, _ = self.locate(slot_id)
+        return bool(slot_id >= 1 and c < len(self.centers) and day >= 0)
+
+    def is_reserve(self, slot_ids):
+        return np.asarray(slot_ids) % RESERVE_MODULUS < RESERVE_SLOTS
+
+    # ---------- materialization ----------
+    def is_open(self, days) -> np.ndarray:
+        weekdays = (np.asarray(days) + int(pd.Timestamp(self.epoch).weekday())) % 7
+        return ~np.isin(weekdays, list(self.closed_weekdays))
+
+    def bitmaps(self, first_day: int, days: int):
+        """(free, reserve) uint64 words of shape (centers, days) as the template defines them."""
+        day_numbers = np.arange(first_day, first_day + days)
+        bits = np.left_shift(np.uint64(1), np.arange(len(self.times), dtype=np.uint64))
+        ids = self.ids(np.arange(len(self.centers))[:, None, None], day_numbers[None, :, None], np.arange(len(self.times))[None, None, :])
+        reserve = np.bitwise_or.reduce(np.where(self.is_reserve(ids), bits, np.uint64(0)), axis=2)
+        free = np.zeros((len(self.centers), days), dtype=np.uint64)
+        free[:, self.is_open(day_numbers)] = np.bitwise_or.reduce(bits)
+        return free, reserve.astype(np.uint64)
+
+    def describe(self, slot_id: int) -> dict:
+        """The template row for one slot, shaped like a slots.csv row."""
+        c, day, t = (int(v) for v in self.locate(slot_id))
+        reserve = bool(self.is_reserve(slot_id))
+        return {
+            "slot_id": int(slot_id),
+            "date": self.date_of(day).strftime("%Y-%m-%d"),
+            "time": self.times[t],
+            "center": self.centers[c],
+            "vehicle_name": None,
+            "status": "available" if self.is_open([day])[0] else "closed",
+            "is_high_risk_reserve": reserve,
+            "priority_level": "emergency" if reserve else "normal",
+        }
+
+    def frame(self, start, days: int) -> pd.DataFrame:
+        """Materialize `days` days of template rows from `start` (exports and inspection only)."""
+        first = self.day_number(start)
+        d, t, c = np.meshgrid(np.arange(first, first + days), np.arange(len(self.times)), np.arange(len(self.centers)), indexing="ij")
+        ids = self.ids(c, d, t).ravel()
+        reserve = self.is_reserve(ids)
+        return pd.DataFrame({
+            "slot_id": ids,
+            "date": pd.to_datetime(self.epoch + d.ravel().astype("timedelta64[D]")),
+            "time": np.array(self.times, dtype=object)[t.ravel()],
+            "center": np.array(self.centers, dtype=object)[c.ravel()],
+            "vehicle_name": None,
+            "status": np.where(self.is_open(d.ravel()), "available", "closed"),
+            "is_high_risk_reserve": reserve,
+            "priority_level": np.where(reserve, "emergency", "normal"),
+        })
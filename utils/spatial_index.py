@@ -0,0 +1,79 @@
+import numpy as np
+from sklearn.neighbors import BallTree
+
+EARTH_RADIUS_KM = 6371
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; every argument may be a scalar or an array."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class CenterIndex:
+    """Ball tree (haversine metric) over service-center coordinates.
+
+    Built once from the `{name: [lat, lon]}` mapping the scheduling agent uses,
+    so a "nearest centers" query costs O(k log n) instead of one distance per
+    slot row. `iter_nearest` hands out centers closest-first in growing batches,
+    letting callers stop as soon as they have collected enough availability.
+    """
+
+    def __init__(self, centers: dict, leaf_size: int = 40):
+        self.names = np.array(list(centers.keys()), dtype=object)
+        self.coords = np.array(list(centers.values()), dtype=float).reshape(-1, 2)
+        self._position = {name: i for i, name in enumerate(self.names)}
+        self._tree = BallTree(np.radians(self.coords), leaf_size=leaf_size, metric="haversine") if len(self.names) else None
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self._position
+
+    def distances(self, location: tuple, names) -> np.ndarray:
+        """Distance (km) from `location` to each named center, vectorized."""
+        return self._km(location, np.array([self._position[n] for n in names], dtype=int))
+
+    def iter_nearest(self, location: tuple, max_km: float | None = None, batch: int = 16):
+        """Yield (name, km) closest-first, optionally only within `max_km`."""
+        if self._tree is None:
+            return
+        point = np.radians([location])
+        if max_km is not None:
+            idx, _ = self._tree.query_radius(point, r=max_km / EARTH_RADIUS_KM, return_distance=True, sort_results=True)
+            idx = idx[0]
+            yield from zip(self.names[idx], self._km(location, idx))
+            return
+
+        done = 0
+        k = min(batch, len(self.names))
+        while done < len(self.names):
+            idx = self._tree.query(point, k=k, return_distance=False)[0][done:]
+            yield from zip(self.names[idx], self._km(location, idx))
+            done = k
+            k = min(k * 2, len(self.names))
+
+    def nearest(self, location: tuple, k: int = 5, max_km: float | None = None, where=None) -> list:
+        """The `k` nearest centers as (name, km), skipping those failing `where(name)`."""
+        found = []
+        for name, km in self.iter_nearest(location, max_km):
+            if where is None or where(name):
+                found.append((name, km))
+                if len(found) >= k:
+                    break
+        return found
+
+    def nearest_many(self, locations, k: int = 8):
+        """Batch k-nearest for many points: (center positions, km), both shaped (n, k), closest first."""
+        locations = np.asarray(locations, dtype=float).reshape(-1, 2)
+        if self._tree is None:
+            return np.empty((len(locations), 0), dtype=np.intp), np.empty((len(locations), 0))
+        k = min(k, len(self.names))
+        idx = self._tree.query(np.radians(locations), k=k, return_distance=False)
+        km = haversine_km(locations[:, :1], locations[:, 1:], self.coords[idx, 0], self.coords[idx, 1])
+        return idx, km
+
+    def _km(self, location, idx):
+        return haversine_km(location[0], location[1], self.coords[idx, 0], self.coords[idx, 1])
@@ -0,0 +1,158 @@
+"""Backfill months of daily/regional telematics dumps into the telematics store.
+
+    python -m utils.telematics_backfill data/dumps/*.csv --workers 8
+
+Each file is parsed and standardized in its own worker process, chunk by chunk,
+into a staging store; the parent then moves the staged parts into the live
+store (the one DiagnosisAgent reads, which builds its per-vehicle index from it
+at startup). Backfilled rows get negative seqs, one block per file, so they sort
+before the live Kaggle rows and stay out of incremental model updates. Every
+file keeps a byte watermark: re-running the command only parses rows appended
+since, and a file whose head changed replaces its earlier rows.
+
+Dates: rows with a full timestamp keep it. Clock-only rows ("HH:MM", like the
+Kaggle export) are dated from CLOCK_EPOCH per file, so every such dump starts
+on the same day. That is fine for regional dumps (different vehicles), but
+dumps of successive periods for the same vehicles overlap in time; give those
+full timestamps.
+"""
+import os
+import glob
+import time
+import shutil
+import argparse
+import pandas as pd
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils.telematics_engine import DEFAULT_CHUNKSIZE, IngestState
+from utils.telematics_store import FINGERPRINT_BYTES, SEQ_BITS, STORE_PATH, TelematicsStore, source_fingerprint
+
+STAGING_DIR = "_staging"
+MAX_FILES = 1 << 22  # seq blocks reserved for dumps, below the live rows
+
+
+def _seq_base(rank: int) -> int:
+    return (rank - MAX_FILES) << SEQ_BITS
+
+
+def _ingest_file(raw_path: str, rank: int, start, state: dict | None, staging_root: str,
+                 vehicle_ids: list, chunksize: int):
+    """Worker: standardize one dump from byte `start` into its own staging store.
+    Returns (staging_root, byte offset reached, ingest state)."""
+    staging = TelematicsStore(staging_root)
+    staging.reset()
+    state = IngestState(**state) if state else IngestState()
+    end = staging.ingest(raw_path, vehicle_ids, state, start=start, chunksize=chunksize, seq_base=_seq_base(rank))
+    staging.commit()
+    return staging_root, end, state.__dict__.copy()
+
+
+def _plan(store: TelematicsStore, paths: list, vehicle_ids: list) -> list:
+    """(path, rank, start, state) per file with new rows. A file whose head no longer
+    matches (replaced, truncated or another fleet) loses its old rows and starts over."""
+    done = store.manifest.setdefault("backfill", {"files": {}, "next_rank": 0})
+    jobs = []
+    for path in sorted(paths):
+        record = done["files"].get(os.path.abspath(path))
+        size = os.path.getsize(path)
+        if (
+            record is not None
+            and size >= record["byte_offset"]
+            and source_fingerprint(path, vehicle_ids, record["head_bytes"]) == record["fingerprint"]
+        ):
+            if size > record["byte_offset"]:
+                jobs.append((path, record["rank"], record["byte_offset"], record["state"]))
+            continue
+        if record is None:
+            rank = done["next_rank"]
+            done["next_rank"] += 1
+        else:
+            rank = record["rank"]
+            del done["files"][os.path.abspath(path)]
+            store.drop(min_seq=_seq_base(rank), max_seq=_seq_base(rank + 1))
+            print(f"⚠️ {Path(path).name} changed, replacing its backfilled rows")
+        jobs.append((path, rank, None, None))
+    store.commit()
+    return jobs
+
+
+def _record(store: TelematicsStore, path: str, rank: int, end: int, state: dict, vehicle_ids: list):
+    done = store.manifest.setdefault("backfill", {"files": {}, "next_rank": 0})
+    done["next_rank"] = max(done["next_rank"], rank + 1)
+    head_bytes = min(FINGERPRINT_BYTES, end)
+    done["files"][os.path.abspath(path)] = {
+        "fingerprint": source_fingerprint(path, vehicle_ids, head_bytes),
+        "head_bytes": head_bytes,
+        "byte_offset": end,
+        "rank": rank,
+        "state": state,
+    }
+
+
+def backfill(paths: list, store_root: str = STORE_PATH, workers: int | None = None,
+             chunksize: int = DEFAULT_CHUNKSIZE, vehicle_ids: list | None = None) -> dict:
+    """Ingest `paths` in parallel into the store at `store_root`; returns a summary."""
+    started = time.time()
+    if vehicle_ids is None:
+        vehicle_ids = pd.read_csv("data/vehicles.csv")["vehicle_id"].tolist()
+    store = TelematicsStore(store_root)
+    with store.locked():
+        store.refresh()
+        jobs = _plan(store, paths, vehicle_ids)
+
+    staging_base = store.root.with_name(store.root.name + STAGING_DIR)
+    raw_rows, failed = 0, []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(_ingest_file, path, rank, start, state, str(staging_base / f"{rank:06d}"),
+                            vehicle_ids, chunksize): (path, rank, state)
+                for path, rank, start, state in jobs
+            }
+            for future in as_completed(futures):
+                path, rank, before = futures[future]
+                try:
+                    staging_root, end, state = future.result()
+                except Exception as e:
+                    failed.append(path)
+                    shutil.rmtree(staging_base / f"{rank:06d}", ignore_errors=True)
+                    print(f"🚨 {Path(path).name} failed, will retry on the next run: {e}")
+                    continue
+                rows = state["rows_seen"] - (before["rows_seen"] if before else 0)
+                with store.locked():  # commit per file, so a crash keeps finished files
+                    store.refresh()
+                    store.merge(TelematicsStore(staging_root))
+                    _record(store, path, rank, end, state, vehicle_ids)
+                    store.commit()
+                shutil.rmtree(staging_root, ignore_errors=True)
+                raw_rows += rows
+                print(f"✅ {Path(path).name}: {rows} raw rows")
+    finally:
+        shutil.rmtree(staging_base, ignore_errors=True)
+
+    elapsed = time.time() - started
+    summary = {
+        "files": len(jobs) - len(failed),
+        "failed": len(failed),
+        "skipped": len(paths) - len(jobs),
+        "raw_rows": raw_rows,
+        "stored_rows": store.row_count,
+        "vehicles": len(store.manifest["partitions"]),
+        "seconds": round(elapsed, 2),
+        "rows_per_second": int(raw_rows / elapsed) if elapsed else 0,
+    }
+    print(f"✅ Backfill done: {summary}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill telematics dumps into a columnar store")
+    parser.add_argument("paths", nargs="+", help="CSV files or glob patterns")
+    parser.add_argument("--store", default=STORE_PATH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="rows per read; bounds worker memory")
+    args = parser.parse_args()
+
+    files = [f for pattern in args.paths for f in sorted(glob.glob(pattern))]
+    backfill(files, args.store, args.workers, args.chunksize)
@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+
+KAGGLE_PATH = "data/Telematicsdata.csv"
+
+# Only these columns of the Kaggle export are used; everything else is skipped at read time
+RAW_COLUMNS = ["timestamp", "variable", "value", "alarmClass"]
+# Used when present (e.g. regional dumps); otherwise rows are spread over the fleet
+OPTIONAL_COLUMNS = ["vehicle_id"]
+
+
+def wanted_column(name) -> bool:
+    return name in RAW_COLUMNS or name in OPTIONAL_COLUMNS
+
+TELEMATICS_FEATURES = [
+    "battery_voltage",
+    "alarm_level",
+    "towing_status",
+    "ignition_status",
+    "vibration",
+]
+
+DEFAULT_CHUNKSIZE = 250_000
+
+_NAN_LITERALS = ["nan", "+nan", "-nan"]
+
+# The Kaggle export only has a clock time ("HH:MM"); its rows are dated from this
+# day on, moving to the next day whenever the clock wraps past midnight
+CLOCK_EPOCH = np.datetime64("2021-01-01", "ns")
+_NS_PER_DAY = 86_400 * 10**9
+_CLOCK_WRAP_NS = _NS_PER_DAY // 2  # only a jump back of more than 12h is a new day, not interleaved devices
+
+
+@dataclass
+class IngestState:
+    """What one chunk hands over to the next so chunked reads match a single full read."""
+
+    rows_seen: int = 0
+    last_battery_internal: float = np.nan
+    last_battery_external: float = np.nan
+    clock_day: int = 0  # days the clock-only timestamps have wrapped so far
+    last_clock: int = -1  # time of day (ns) of the last clock-only row
+
+
+def parse_values(values: pd.Series) -> np.ndarray:
+    """Vectorized telematics value parser.
+    Numbers parse as floats, comma lists (GPS etc.) and junk become 0, missing stays NaN.
+    Accepts exactly what float() accepts; strings pd.to_numeric rejects but float()
+    takes ("1_000", non-ASCII digits) go through float() once per distinct value.
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=float, copy=True)
+
+    text = values.astype(str).str.strip()
+    parsed = pd.to_numeric(text, errors="coerce").to_numpy(dtype=float, copy=True)
+    missing = values.isna().to_numpy() | text.str.lower().isin(_NAN_LITERALS).to_numpy()
+    rejected = np.isnan(parsed) & ~missing
+    if rejected.any():
+        parsed[rejected] = text[rejected].map({v: _float_or_zero(v) for v in text[rejected].unique()}).to_numpy()
+    parsed[text.str.contains(",", regex=False, na=False).to_numpy()] = 0.0
+    return parsed
+
+
+def _float_or_zero(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return 0.0
+
+
+def parse_timestamps(values: pd.Series, state: IngestState) -> np.ndarray:
+    """datetime64[ns] per row. Full dates are taken as is; clock-only values
+    ("HH:MM") are dated from CLOCK_EPOCH, one day later each time the clock jumps
+    back by more than 12 hours (a midnight wrap), so rows spread over real days.
+    Junk stays NaT. `state` is updated in place.
+    """
+    text = values.astype(str).str.strip()
+    stamps = pd.to_datetime(text, format="ISO8601", errors="coerce").to_numpy(dtype="datetime64[ns]")
+    clock = pd.to_datetime(text + ":00", format="%H:%M:%S", errors="coerce")
+    clock_ns = (clock - clock.dt.normalize()).to_numpy(dtype="timedelta64[ns]").astype(np.int64)
+    is_clock = ~np.isnat(clock.to_numpy()) & np.isnat(stamps)
+    if not is_clock.any():
+        return stamps
+
+    times = clock_ns[is_clock]
+    previous = np.concatenate([[state.last_clock], times[:-1]])
+    days = state.clock_day + np.cumsum(previous - times > _CLOCK_WRAP_NS)
+    stamps[is_clock] = CLOCK_EPOCH + (days * _NS_PER_DAY + times).astype("timedelta64[ns]")
+    state.clock_day, state.last_clock = int(days[-1]), int(times[-1])
+    return stamps
+
+
+def parse_vehicle_ids(values: pd.Series) -> np.ndarray:
+    """Vehicle ids of a dump as floats. Anything that is not an integer (names,
+    blanks, 101.5) becomes NaN, so the row is dropped instead of breaking the int64 store column."""
+    ids = pd.to_numeric(values, errors="coerce").to_numpy(dtype=float, copy=True)
+    ids[~np.isfinite(ids) | (ids != np.round(ids))] = np.nan
+    return ids
+
+
+def _carry_ffill(values: np.ndarray, carry: float, default: float):
+    """Forward-fill continuing from the previous chunk; returns (filled, new_carry)."""
+    filled = pd.Series(values).ffill()
+    if not np.isnan(carry):
+        filled = filled.fillna(carry)
+    last_valid = filled.iloc[-1] if len(filled) else carry
+    return filled.fillna(default).to_numpy(), last_valid
+
+
+def standardize_chunk(raw: pd.DataFrame, vehicle_ids: list, state: IngestState) -> pd.DataFrame:
+    """Turn one block of long-form Kaggle rows into standardized telematics rows.
+
+    The variable/value pairs are split into feature columns with one mask per
+    variable, so the whole block is handled by a handful of array operations.
+    `state` is updated in place.
+    """
+    n = len(raw)
+    variable = raw["variable"].astype(str).to_numpy()
+    parsed = parse_values(raw["value"])
+
+    battery_internal, state.last_battery_internal = _carry_ffill(
+        np.where(variable == "INTERNAL BATTERY", parsed, np.nan),
+        state.last_battery_internal,
+        50,
+    )
+    battery_external, state.last_battery_external = _carry_ffill(
+        np.where(variable == "EXTERNAL BATTERY", parsed, np.nan),
+        state.last_battery_external,
+        36,
+    )
+    towing = np.where(variable == "TOWING", parsed, 0)
+    ignition = np.where(variable == "IGNITION_STATUS", parsed, 0)
+
+    if "vehicle_id" in raw.columns:
+        row_vehicle_ids = parse_vehicle_ids(raw["vehicle_id"])
+    else:
+        vehicle_ids = np.asarray(vehicle_ids)
+        row_vehicle_ids = vehicle_ids[(state.rows_seen + np.arange(n)) % len(vehicle_ids)]
+    state.rows_seen += n
+
+    alarm_class = raw["alarmClass"].to_numpy()
+
+    return pd.DataFrame(
+        {
+            "timestamp": parse_timestamps(raw["timestamp"], state),
+            "vehicle_id": row_vehicle_ids,
+            "battery_voltage": (battery_internal + battery_external) / 2,
+            "alarm_level": alarm_class,
+            "towing_status": towing,
+            "ignition_status": ignition,
+            "vibration": alarm_class * 0.5,
+        }
+    )
@@ -0,0 +1,130 @@
+import threading
+import numpy as np
+import pandas as pd
+
+from utils.telematics_engine import TELEMATICS_FEATURES
+
+DEFAULT_WINDOW = 50
+
+
+class TelematicsIndex:
+    """Latest `window` feature rows per vehicle, kept in fixed-size ring buffers.
+
+    All vehicles share one (capacity, window, n_features) array; a vehicle is a row
+    in it, found through a dict. Lookups and appends never touch other vehicles'
+    data, so their cost does not grow with fleet size or history length.
+    Appends (e.g. from StreamMonitor's thread) and reads share one lock, so a
+    reader never sees a half-written row or arrays swapped by `_grow`.
+    """
+
+    def __init__(self, features=TELEMATICS_FEATURES, window: int = DEFAULT_WINDOW, capacity: int = 64):
+        self.features = list(features)
+        self.window = window
+        self._slots = {}
+        self._values = np.zeros((capacity, window, len(self.features)))
+        self._timestamps = np.full((capacity, window), np.datetime64("NaT"), dtype="datetime64[ns]")
+        self._head = np.zeros(capacity, dtype=np.int64)  # next write position
+        self._count = np.zeros(capacity, dtype=np.int64)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, features=TELEMATICS_FEATURES, window: int = DEFAULT_WINDOW):
+        """Build from a standardized frame in arrival order, keeping each vehicle's tail."""
+        index = cls(features, window, capacity=max(frame["vehicle_id"].nunique(), 1))
+        tail = frame.groupby("vehicle_id", sort=False).tail(window)
+        if tail.empty:
+            return index
+
+        vids = tail["vehicle_id"].to_numpy()
+        slots = np.array([index._slot(int(v)) for v in vids])
+        positions = tail.groupby("vehicle_id", sort=False).cumcount().to_numpy()
+        index._values[slots, positions] = tail[index.features].to_numpy(dtype=float)
+        index._timestamps[slots, positions] = tail["timestamp"].to_numpy(dtype="datetime64[ns]")
+
+        counts = np.bincount(slots, minlength=len(index._slots))
+        index._count[: len(counts)] = counts
+        index._head[: len(counts)] = counts % window
+        return index
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, vehicle_id):
+        return int(vehicle_id) in self._slots
+
+    def vehicle_ids(self):
+        return list(self._slots)
+
+    def _slot(self, vehicle_id: int) -> int:
+        slot = self._slots.get(vehicle_id)
+        if slot is None:
+            slot = len(self._slots)
+            if slot == len(self._head):
+                self._grow()
+            self._slots[vehicle_id] = slot
+        return slot
+
+    def _grow(self):
+        # Double the capacity; amortized O(1) per new vehicle
+        self._values = np.concatenate([self._values, np.zeros_like(self._values)])
+        self._timestamps = np.concatenate(
+            [self._timestamps, np.full_like(self._timestamps, np.datetime64("NaT"))]
+        )
+        self._head = np.concatenate([self._head, np.zeros_like(self._head)])
+        self._count = np.concatenate([self._count, np.zeros_like(self._count)])
+
+    def append(self, vehicle_id, values, timestamp=None):
+        """Push one feature row (ordered like `features`) for a vehicle."""
+        with self._lock:
+            slot = self._slot(int(vehicle_id))
+            head = self._head[slot]
+            self._values[slot, head] = values
+            self._timestamps[slot, head] = np.datetime64("NaT") if timestamp is None else timestamp
+            self._head[slot] = (head + 1) % self.window
+            self._count[slot] = min(self._count[slot] + 1, self.window)
+
+    def window_of(self, vehicle_id, n: int | None = None):
+        """(timestamps, values) of the last n rows, oldest first; empty if unknown."""
+        with self._lock:
+            slot = self._slots.get(int(vehicle_id))
+            if slot is None:
+                return self._timestamps[:0, 0], self._values[:0, 0]
+            count = self._count[slot]
+            n = count if n is None else min(n, count)
+            order = (self._head[slot] - n + np.arange(n)) % self.window
+            return self._timestamps[slot, order], self._values[slot, order]
+
+    def latest_rows(self, vehicle_ids):
+        """Latest feature row for many vehicles as one (n, n_features) matrix.
+        Returns (values, has_data); rows of unknown or empty vehicles are zeros.
+        """
+        with self._lock:
+            slots = np.array([self._slots.get(int(v), -1) if v is not None else -1 for v in vehicle_ids], dtype=np.int64)
+            found = slots >= 0
+            has_data = np.zeros(len(slots), dtype=bool)
+            has_data[found] = self._count[slots[found]] > 0
+
+            values = np.zeros((len(slots), len(self.features)))
+            rows = slots[has_data]
+            values[has_data] = self._values[rows, (self._head[rows] - 1) % self.window]
+        return values, has_data
+
+
+class VehicleDirectory:
+    """Hash maps over vehicles.csv: name → id and id → status."""
+
+    def __init__(self, vehicles: pd.DataFrame):
+        self.id_by_name = {}
+        self.status_by_id = {}
+        for vid, name, status in zip(vehicles["vehicle_id"], vehicles["vehicle_name"], vehicles["status"]):
+            self.id_by_name.setdefault(name, int(vid))
+            self.status_by_id.setdefault(int(vid), status if isinstance(status, str) else "")
+
+    def resolve(self, vehicle):
+        """Numeric ids ('102') pass through, names ('Car B') are looked up; None if unknown."""
+        if str(vehicle).isdigit():
+            return int(vehicle)
+        return self.id_by_name.get(vehicle)
+
+    def status(self, vehicle_id) -> str:
+        return self.status_by_id.get(int(vehicle_id), "")
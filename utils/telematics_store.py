@@ -0,0 +1,385 @@
+import os
+import csv
+import json
+import hashlib
+import shutil
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from utils.file_lock import file_lock
+from utils.telematics_engine import (
+    DEFAULT_CHUNKSIZE,
+    IngestState,
+    standardize_chunk,
+    wanted_column,
+)
+
+STORE_PATH = "data/telematics_store"
+MANIFEST_NAME = "manifest.json"
+STORE_VERSION = 2  # 2: clock-only timestamps are dated instead of all landing on 1900-01-01
+
+# One .npy file per column inside every partition part
+STORE_SCHEMA = {
+    "seq": "int64",  # raw row number in its source, keeps the original order (see SEQ_BITS)
+    "timestamp": "datetime64[ns]",
+    "vehicle_id": "int64",
+    "battery_voltage": "float64",
+    "alarm_level": "float64",
+    "towing_status": "float64",
+    "ignition_status": "float64",
+    "vibration": "float64",
+}
+
+# seq >> SEQ_BITS identifies where rows came from: block 0 is the live Kaggle file,
+# negative blocks are backfilled dumps, so history sorts before live rows
+SEQ_BITS = 40
+FINGERPRINT_BYTES = 64 * 1024
+COMPACT_ROWS = 100_000  # parts smaller than this in the same vehicle/day are merged after a sync
+
+
+class _BoundedReader:
+    """File wrapper that stops at `limit` bytes, so rows appended mid-read wait for the next sync."""
+
+    def __init__(self, fh, limit: int):
+        self.fh = fh
+        self.remaining = limit
+
+    def read(self, size: int = -1):
+        if self.remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.fh.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def __iter__(self):
+        return iter(lambda: self.read(FINGERPRINT_BYTES), b"")
+
+
+def source_fingerprint(raw_path: str, vehicle_ids: list, head_bytes: int = FINGERPRINT_BYTES) -> str:
+    """Identifies a raw file by its first `head_bytes` plus the vehicle mapping.
+    Callers pass a head that is already ingested (at most the watermark), so
+    appending rows keeps the fingerprint; replacing the file or the fleet changes it.
+    """
+    h = hashlib.sha1()
+    with open(raw_path, "rb") as fh:
+        h.update(fh.read(head_bytes))
+    h.update(json.dumps([int(v) for v in vehicle_ids]).encode())
+    return h.hexdigest()
+
+
+def last_line_end(fh, start: int, end: int) -> int:
+    """Offset just past the last newline in [start, end); `start` if there is none,
+    so a row still being written is left for the next sync."""
+    pos = end
+    while pos > start:
+        block = min(FINGERPRINT_BYTES, pos - start)
+        fh.seek(pos - block)
+        i = fh.read(block).rfind(b"\n")
+        if i >= 0:
+            return pos - block + i + 1
+        pos -= block
+    return start
+
+
+class TelematicsStore:
+    """Persistent standardized telematics, partitioned by vehicle_id and day.
+
+    Layout: <root>/vehicle_id=<id>/day=<YYYY-MM-DD>/part-<n>/<column>.npy plus a
+    manifest holding the partitions and the raw-file watermark. Columns are
+    binary .npy files, so reopening the store does not parse any CSV. `read`
+    still loads the requested columns into RAM and orders them by seq (parts
+    are per vehicle and day, so the raw-row order needs a copy anyway, and a
+    map per part would hold a file descriptor each); `load_part` can still map
+    a single part read-only.
+    """
+
+    def __init__(self, root: str = STORE_PATH):
+        self.root = Path(root)
+        self.manifest = self._load_manifest()
+
+    # ---------- manifest ----------
+    def _empty_manifest(self):
+        return {
+            "version": STORE_VERSION,
+            "schema": STORE_SCHEMA,
+            "source": None,  # {"id", "fingerprint", "head_bytes"} of the raw file the watermark refers to
+            "watermark": None,
+            "next_part": 0,
+            "partitions": {},
+        }
+
+    def _load_manifest(self):
+        path = self.root / MANIFEST_NAME
+        if path.exists():
+            with open(path) as fh:
+                manifest = json.load(fh)
+            if manifest.get("version") == STORE_VERSION and manifest.get("schema") == STORE_SCHEMA:
+                return manifest
+            print("⚠️ Telematics store format changed, rebuilding")
+        return self._empty_manifest()
+
+    def commit(self):
+        """Persist the manifest; parts written since the last commit become visible to readers."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / (MANIFEST_NAME + ".tmp")
+        with open(tmp, "w") as fh:
+            json.dump(self.manifest, fh, indent=1)
+        os.replace(tmp, self.root / MANIFEST_NAME)
+
+    @property
+    def watermark(self):
+        return self.manifest["watermark"]
+
+    @property
+    def source_id(self):
+        """Stable id of the raw file the store was built from; only changes on a rebuild."""
+        source = self.manifest["source"]
+        return source["id"] if source else None
+
+    @property
+    def row_count(self) -> int:
+        return sum(p["rows"] for parts in self.manifest["partitions"].values() for p in parts)
+
+    def reset(self):
+        if self.root.exists():
+            shutil.rmtree(self.root)
+        self.manifest = self._empty_manifest()
+
+    def locked(self):
+        """Cross-process lock for read-modify-write of the manifest (syncs, backfills).
+        Callers reload the manifest inside it before changing anything."""
+        return file_lock(self.root.with_name(self.root.name + ".lock"))
+
+    def refresh(self):
+        """Re-read the manifest, picking up parts other processes committed."""
+        self.manifest = self._load_manifest()
+
+    # ---------- writes ----------
+    def append(self, frame: pd.DataFrame, watermark: dict | None = None):
+        """Write standardized rows (must carry `seq`) as new parts and commit the manifest."""
+        try:
+            self._write_parts(frame)
+            if watermark is not None:
+                self.manifest["watermark"] = watermark
+            self.commit()
+        except Exception:
+            self.manifest = self._load_manifest()
+            raise
+
+    def _write_parts(self, frame: pd.DataFrame):
+        if frame.empty:
+            return
+        days = frame["timestamp"].dt.floor("D")
+        for (vid, day), group in frame.groupby([frame["vehicle_id"], days], sort=False):
+            self._write_part(int(vid), day.strftime("%Y-%m-%d"), group)
+
+    def _write_part(self, vehicle_id: int, day: str, group: pd.DataFrame):
+        self.manifest["partitions"].setdefault(str(vehicle_id), []).append(self._store_part(vehicle_id, day, group))
+
+    def _store_part(self, vehicle_id: int, day: str, group: pd.DataFrame) -> dict:
+        """Write the column files of a new part; returns its manifest entry."""
+        rel = f"vehicle_id={vehicle_id}/day={day}/part-{self.manifest['next_part']:06d}"
+        self.manifest["next_part"] += 1
+        part_dir = self.root / rel
+        part_dir.mkdir(parents=True, exist_ok=True)
+        for col, dtype in STORE_SCHEMA.items():
+            np.save(part_dir / f"{col}.npy", group[col].to_numpy(dtype=dtype))
+
+        return {
+            "day": day,
+            "path": rel,
+            "rows": len(group),
+            "seq_min": int(group["seq"].min()),
+            "seq_max": int(group["seq"].max()),
+        }
+
+    def sync(self, raw_path: str, vehicle_ids: list, chunksize: int = DEFAULT_CHUNKSIZE) -> int:
+        """Bring the store up to date with a Kaggle raw file.
+
+        Only complete lines past the watermark are parsed. If the raw file was
+        replaced (different head or fleet) its rows are rebuilt; backfilled
+        history is kept. Parts are written chunk by chunk and committed with the
+        new watermark at the end, so an interrupted sync simply starts over from
+        the previous watermark; the small parts it leaves per vehicle/day are
+        then compacted. Returns new raw rows.
+        """
+        with self.locked():
+            self.refresh()
+            size = os.path.getsize(raw_path)
+            mark, source = self.watermark, self.manifest["source"]
+            if (
+                mark is None
+                or source is None
+                or size < mark["byte_offset"]
+                or source_fingerprint(raw_path, vehicle_ids, source["head_bytes"]) != source["fingerprint"]
+            ):
+                self._drop_live()
+                mark = None
+            elif size == mark["byte_offset"]:
+                return 0
+
+            state = IngestState(**mark["state"]) if mark else IngestState()
+            rows_before = state.rows_seen
+            start = mark["byte_offset"] if mark else None
+            try:
+                end = self.ingest(raw_path, vehicle_ids, state, start=start, end=size, chunksize=chunksize)
+            except Exception:
+                self.refresh()
+                raise
+            if mark and end == start:
+                return 0
+
+            head_bytes = min(FINGERPRINT_BYTES, end)
+            fingerprint = source_fingerprint(raw_path, vehicle_ids, head_bytes)
+            self.manifest["source"] = {
+                "id": (self.manifest["source"] or {}).get("id", fingerprint),
+                "fingerprint": fingerprint,
+                "head_bytes": head_bytes,
+            }
+            self.manifest["watermark"] = {"byte_offset": end, "state": state.__dict__.copy()}
+            self.commit()
+            self.compact()
+            return state.rows_seen - rows_before
+
+    def _drop_live(self):
+        """Forget the Kaggle rows (seq block 0) and their watermark; backfilled history stays."""
+        if not any(p["seq_min"] < 0 for p in self.partitions()):
+            self.reset()
+            return
+        self.manifest["source"] = self.manifest["watermark"] = None
+        self.drop(min_seq=0)
+
+    def ingest(self, raw_path: str, vehicle_ids: list, state: IngestState, start: int | None = None,
+               end: int | None = None, chunksize: int = DEFAULT_CHUNKSIZE, seq_base: int = 0) -> int:
+        """Parse the complete lines of `raw_path` between byte `start` (default: after
+        the header) and `end` (default: EOF) into new parts, continuing `state`; raw
+        row i gets seq `seq_base + i`. Returns the byte offset reached. Call commit().
+        """
+        with open(raw_path, "rb") as fh:
+            header = next(csv.reader([fh.readline().decode()]))
+            start = fh.tell() if start is None else start
+            end = last_line_end(fh, start, os.path.getsize(raw_path) if end is None else end)
+            if start < end:
+                self._ingest_range(fh, header, start, end, vehicle_ids, state, chunksize, seq_base)
+        return end
+
+    def _ingest_range(self, fh, header, offset, size, vehicle_ids, state, chunksize, seq_base=0):
+        fh.seek(offset)
+        reader = pd.read_csv(
+            _BoundedReader(fh, size - offset),
+            names=header,
+            header=None,
+            usecols=wanted_column,
+            dtype={"variable": "category"},
+            chunksize=chunksize,
+        )
+        for raw in reader:
+            start = seq_base + state.rows_seen
+            chunk = standardize_chunk(raw, vehicle_ids, state)
+            chunk.insert(0, "seq", np.arange(start, start + len(chunk)))
+            self._write_parts(chunk.dropna())
+
+    def merge(self, other: "TelematicsStore"):
+        """Move every part of `other` (e.g. a backfill staging store) into this store.
+        Parts are renumbered and moved, not copied; call commit() to persist.
+        """
+        for vid, parts in other.manifest["partitions"].items():
+            for part in parts:
+                rel = f"vehicle_id={vid}/day={part['day']}/part-{self.manifest['next_part']:06d}"
+                self.manifest["next_part"] += 1
+                (self.root / rel).parent.mkdir(parents=True, exist_ok=True)
+                os.replace(other.root / part["path"], self.root / rel)
+                self.manifest["partitions"].setdefault(vid, []).append({**part, "path": rel})
+
+    def drop(self, min_seq: int | None = None, max_seq: int | None = None) -> int:
+        """Delete the parts whose rows all lie in [min_seq, max_seq) and commit; returns parts removed."""
+        lo = -np.inf if min_seq is None else min_seq
+        hi = np.inf if max_seq is None else max_seq
+        removed = []
+        for vid, parts in self.manifest["partitions"].items():
+            gone = [p for p in parts if p["seq_min"] >= lo and p["seq_max"] < hi]
+            if gone:
+                self.manifest["partitions"][vid] = [p for p in parts if p not in gone]
+                removed.extend(p["path"] for p in gone)
+        self.commit()
+        for rel in removed:
+            shutil.rmtree(self.root / rel, ignore_errors=True)
+        return len(removed)
+
+    def compact(self, small_rows: int = COMPACT_ROWS) -> int:
+        """Merge the small parts of each vehicle/day and source (seq block) into one
+        part; returns how many parts were merged away. The new manifest is committed
+        before the old parts are deleted, so a crash at worst leaves unreferenced
+        directories behind."""
+        obsolete = []
+        try:
+            for vid, parts in self.manifest["partitions"].items():
+                by_day = {}
+                for part in parts:
+                    if part["rows"] < small_rows:
+                        by_day.setdefault((part["day"], part["seq_min"] >> SEQ_BITS), []).append(part)
+                groups = [group for group in by_day.values() if len(group) > 1]
+                if not groups:
+                    continue
+                merged = {p["path"] for group in groups for p in group}
+                kept = [p for p in parts if p["path"] not in merged]
+                for group in groups:
+                    loaded = [self.load_part(p, mmap=False) for p in group]
+                    frame = pd.DataFrame({c: np.concatenate([part[c] for part in loaded]) for c in STORE_SCHEMA})
+                    kept.append(self._store_part(int(vid), group[0]["day"], frame.sort_values("seq", kind="stable")))
+                self.manifest["partitions"][vid] = kept
+                obsolete.extend(merged)
+            if obsolete:
+                self.commit()
+        except Exception:
+            self.manifest = self._load_manifest()
+            raise
+        for rel in obsolete:
+            shutil.rmtree(self.root / rel, ignore_errors=True)
+        return len(obsolete)
+
+    # ---------- reads ----------
+    def partitions(self, vehicle_id=None):
+        if vehicle_id is not None:
+            return list(self.manifest["partitions"].get(str(int(vehicle_id)), []))
+        return [p for parts in self.manifest["partitions"].values() for p in parts]
+
+    def load_part(self, part: dict, columns=None, mmap: bool = True) -> dict:
+        """Column arrays of one part; memory-mapped read-only by default."""
+        part_dir = self.root / part["path"]
+        return {
+            col: np.load(part_dir / f"{col}.npy", mmap_mode="r" if mmap else None)
+            for col in (columns or STORE_SCHEMA)
+        }
+
+    @property
+    def rows_seen(self) -> int:
+        """Raw rows consumed so far; every stored row has seq below this."""
+        return self.watermark["state"]["rows_seen"] if self.watermark else 0
+
+    def read(self, vehicle_ids=None, columns=None, min_seq: int | None = None) -> pd.DataFrame:
+        """Standardized frame in original raw-row order (same shape as the CSV path),
+        backfilled history first. `min_seq` limits the read to rows ingested after an
+        earlier watermark (which also leaves out the history).
+        """
+        columns = list(columns or [c for c in STORE_SCHEMA if c != "seq"])
+        wanted = ["seq"] + [c for c in columns if c != "seq"]
+        if vehicle_ids is None:
+            parts = self.partitions()
+        else:
+            parts = [p for vid in vehicle_ids for p in self.partitions(vid)]
+        if min_seq is not None:
+            parts = [p for p in parts if p["seq_max"] >= min_seq]
+
+        if not parts:
+            return pd.DataFrame({c: pd.Series(dtype=STORE_SCHEMA[c]) for c in columns})
+
+        loaded = [self.load_part(p, wanted, mmap=False) for p in parts]  # copied below anyway; a map per file would hold an fd each
+        data = {c: np.concatenate([part[c] for part in loaded]) for c in wanted}
+        order = np.argsort(data["seq"], kind="stable")
+        if min_seq is not None:
+            order = order[data["seq"][order] >= min_seq]
+        return pd.DataFrame({c: data[c][order] for c in columns})
@@ -0,0 +1,277 @@
+import json
+import time
+import queue
+import socket
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from utils.telematics_engine import TELEMATICS_FEATURES, parse_values
+
+MAX_BATCH = 512
+POLL_TIMEOUT = 0.05  # seconds; bounds detection latency when the stream is quiet
+_RAW_VARIABLES = {"INTERNAL BATTERY": "internal", "EXTERNAL BATTERY": "external", "TOWING": "towing", "IGNITION_STATUS": "ignition"}
+
+
+def _number(value, default: float = np.nan) -> float:
+    """float(value); `default` for None, "" and NaN. Raises ValueError/TypeError for anything else."""
+    if value is None or value == "":
+        return default
+    value = float(value)
+    return default if np.isnan(value) else value
+
+
+def _timestamp(value):
+    """Naive timestamp of an event; NaT when missing or unparseable. Raises TypeError for lists and the like."""
+    stamp = pd.to_datetime(value, errors="coerce")
+    if stamp is None or stamp is pd.NaT:
+        return pd.NaT
+    if not isinstance(stamp, pd.Timestamp):
+        raise TypeError(f"not a timestamp: {value!r}")
+    return stamp.tz_convert(None) if stamp.tzinfo else stamp
+
+
+# ==================== SOURCES ====================
+# A source only has to implement poll(timeout) -> list of event dicts.
+
+class QueueSource:
+    """In-process source: producers put event dicts on `self.queue`."""
+
+    def __init__(self, maxsize: int = 100_000):
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    def put(self, event: dict):
+        self.queue.put(event)
+
+    def poll(self, timeout: float = POLL_TIMEOUT, max_batch: int = MAX_BATCH) -> list:
+        try:
+            events = [self.queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(events) < max_batch:
+            try:
+                events.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return events
+
+    def close(self):
+        pass
+
+
+class FileTailSource:
+    """Follows a JSON-lines file like `tail -f`; only complete lines are consumed."""
+
+    def __init__(self, path: str, from_start: bool = False):
+        self.path = Path(path)
+        self.path.touch(exist_ok=True)
+        self._fh = open(self.path, "r")
+        if not from_start:
+            self._fh.seek(0, 2)
+        self._partial = ""
+
+    def poll(self, timeout: float = POLL_TIMEOUT, max_batch: int = MAX_BATCH) -> list:
+        events = []
+        while len(events) < max_batch:
+            line = self._fh.readline()
+            if not line:
+                break
+            line = self._partial + line
+            if not line.endswith("\n"):
+                self._partial = line  # writer is mid-line
+                break
+            self._partial = ""
+            if line.strip():
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    print(f"⚠️ Dropped malformed telematics event: {line[:80]!r}")
+        if not events:
+            time.sleep(timeout)
+        return events
+
+    def close(self):
+        self._fh.close()
+
+
+class SocketSource(QueueSource):
+    """TCP listener: every client sends newline-delimited JSON events."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9099, maxsize: int = 100_000):
+        super().__init__(maxsize)
+        self._server = socket.create_server((host, port))
+        self.address = self._server.getsockname()
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._read_client, args=(conn,), daemon=True).start()
+
+    def _read_client(self, conn):
+        with conn, conn.makefile("r") as lines:
+            for line in lines:
+                if line.strip():
+                    try:
+                        self.put(json.loads(line))
+                    except json.JSONDecodeError:
+                        print(f"⚠️ Dropped malformed telematics event: {line[:80]!r}")
+
+    def close(self):
+        self._server.close()
+
+
+# ==================== MONITOR ====================
+
+class StreamMonitor:
+    """Scores live telematics and emits a diagnosis event when a vehicle's risk changes.
+
+    Events are either standardized rows (vehicle_id + TELEMATICS_FEATURES) or raw
+    Kaggle-style records (vehicle_id, variable, value, alarmClass). Each poll is
+    scored as one micro-batch with the shared model and rules, then walked in
+    arrival order so short-lived states (e.g. towing without ignition) are not
+    skipped. Per-vehicle memory is the agent's ring buffer plus a few scalars.
+    """
+
+    def __init__(self, agent, source, on_change=None, max_batch: int = MAX_BATCH):
+        self.agent = agent
+        self.source = source
+        self.on_change = on_change
+        self.max_batch = max_batch
+        self.changes = queue.Queue(maxsize=10_000)  # for consumers that prefer pulling
+        self.processed = 0
+        self.rejected = 0
+        self._raw_state = {}  # vehicle_id -> last raw readings (batteries, towing, ignition)
+        self._stop = threading.Event()
+        self._thread = None
+
+        baseline = agent.diagnose_many()
+        self._risk = dict(zip(baseline["vehicle_id"], baseline["risk_level"]))
+
+    # ---------- lifecycle ----------
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        self.source.close()
+
+    def run(self):
+        while not self._stop.is_set():
+            events = []
+            try:
+                events = self.source.poll(max_batch=self.max_batch)
+                if events:
+                    self.process(events, received_at=time.time())
+            except Exception as e:
+                print(f"⚠️ Skipped telematics batch of {len(events)} events: {e}")
+                self._stop.wait(POLL_TIMEOUT)  # don't spin if the source keeps failing
+
+    # ---------- processing ----------
+    def _standardize(self, vid: int, event: dict) -> dict | None:
+        """Feature row for one event, or None when it cannot be scored.
+        Raw readings without a usable value leave the vehicle's state as it was,
+        like the batch path's forward fill."""
+        if "variable" not in event:
+            row = {f: _number(event.get(f)) for f in TELEMATICS_FEATURES}
+            return row if all(np.isfinite(v) for v in row.values()) else None  # like the batch dropna
+
+        # Unlike the batch file, a live vehicle keeps its last towing/ignition state
+        state = self._raw_state.setdefault(vid, {"internal": 50.0, "external": 36.0, "towing": 0.0, "ignition": 0.0})
+        value = event.get("value")
+        value = np.nan if value is None or str(value).strip() == "" else parse_values(pd.Series([value], dtype=object))[0]
+        key = _RAW_VARIABLES.get(event["variable"])
+        alarm = _number(event.get("alarmClass"), default=0.0)
+        if not np.isfinite(alarm):
+            return None
+        if key is not None and np.isfinite(value):
+            state[key] = float(value)
+        return {
+            "battery_voltage": (state["internal"] + state["external"]) / 2,
+            "alarm_level": alarm,
+            "towing_status": state["towing"],
+            "ignition_status": state["ignition"],
+            "vibration": alarm * 0.5,
+        }
+
+    def process(self, events: list, received_at: float | None = None) -> list:
+        """Ingest one micro-batch; returns the risk-change events it produced.
+        Events that cannot be scored are dropped one by one (counted in `rejected`)."""
+        received_at = received_at or time.time()
+        rows = []
+        for event in events:
+            try:
+                vid = self.agent.directory.resolve(event.get("vehicle_id"))
+                if vid is None:
+                    continue
+                features = self._standardize(vid, event)
+                timestamp = _timestamp(event.get("timestamp"))
+            except (AttributeError, TypeError, ValueError):
+                features = None
+            if features is None:
+                self.rejected += 1
+                print(f"⚠️ Dropped malformed telematics event: {str(event)[:80]!r}")
+                continue
+            rows.append({"vehicle_id": vid, "timestamp": timestamp, **features})
+        if not rows:
+            return []
+
+        frame = pd.DataFrame(rows)
+        stamps = frame["timestamp"].to_numpy(dtype="datetime64[ns]")
+        for vid, ts, values in zip(frame["vehicle_id"], stamps, frame[TELEMATICS_FEATURES].to_numpy(dtype=float)):
+            self.agent.index.append(vid, values, ts)
+        labelled = self.agent.label_history(frame)
+        self.processed += len(frame)
+
+        changes = []
+        for row in labelled.itertuples(index=False):
+            previous = self._risk.get(row.vehicle_id)
+            if row.risk_level == previous:
+                continue
+            self._risk[row.vehicle_id] = row.risk_level
+            change = {
+                "vehicle_id": row.vehicle_id,
+                "previous_risk": previous,
+                "risk_level": row.risk_level,
+                "predicted_failure": row.predicted_failure,
+                "urgency": row.urgency,
+                "anomaly_score": float(row.anomaly_score),
+                "rule": row.rule,
+                "detected_at": time.time(),
+                "latency_ms": (time.time() - received_at) * 1000,
+            }
+            changes.append(change)
+            if self.on_change:
+                self.on_change(change)
+            try:
+                self.changes.put_nowait(change)
+            except queue.Full:
+                self.changes.get_nowait()  # drop the oldest, keep memory bounded
+                self.changes.put_nowait(change)
+        return changes
+
+
+if __name__ == "__main__":
+    from agents.diagnosis_agent import get_diagnosis_agent
+
+    parser = argparse.ArgumentParser(description="Stream telematics and print risk changes")
+    parser.add_argument("--tail", help="JSON-lines file to follow")
+    parser.add_argument("--port", type=int, help="listen for JSON-lines events on this TCP port")
+    args = parser.parse_args()
+
+    src = FileTailSource(args.tail) if args.tail else SocketSource(port=args.port or 9099)
+    monitor = StreamMonitor(get_diagnosis_agent(), src, on_change=lambda c: print(f"🚨 {c}"))
+    print("📡 Streaming telematics… Ctrl+C to stop")
+    try:
+        monitor.run()
+    except KeyboardInterrupt:
+        monitor.stop()